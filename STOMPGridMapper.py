@@ -0,0 +1,71 @@
+'''----------------------------------------------------------------------------------
+ Tool Name:   STOMP Grid Recharge Mapper
+ Source Name: STOMPGridMapper.py
+ Version:     ArcGIS 10.3
+ Author:      INTERA Inc.
+ Required Arguments:
+              One geodatabase:
+                  Site-specific recharge estimates (SiteSelection output)
+              One feature class:
+                  STOMP grid (cell polygons or cell centers)
+              Three Values:
+                  I and J index fields of the STOMP grid
+                  Top node K index
+              One directory:
+                  Output (path to STOMP boundary condition tables)
+ Optional Arguments:
+              Cell size (required when the STOMP grid is given as cell centers)
+              Simulation Start Year
+ Description: Maps the clipped recharge estimates of a model domain onto the STOMP grid. A sparse
+              cell x polygon area-weight matrix is computed once per distinct polygon set and each year's
+              recharge is mapped to all cells with one sparse matrix product. Outputs are a cell x year
+              recharge table and a STOMP top-surface Neumann boundary condition card.
+----------------------------------------------------------------------------------'''
+
+# Import modules
+from ret._arcpy import arcpy
+from ret.stomp import MapToStomp
+
+##############################################################################
+#Step 1. Read in SiteSelection output, STOMP grid and output folder
+def ReadParameters():
+    #Site-specific recharge estimates
+    in_gdb = arcpy.GetParameterAsText(0)
+    #STOMP grid
+    grid_input = arcpy.GetParameterAsText(1)
+    #I and J index fields
+    i_field = arcpy.GetParameterAsText(2)
+    j_field = arcpy.GetParameterAsText(3)
+    #Top node K index
+    k_input = arcpy.GetParameterAsText(4)
+    #Output directory
+    out_workspace = arcpy.GetParameterAsText(5)
+    #Cell size
+    cellsize_input = arcpy.GetParameterAsText(6)
+    #Simulation Start Year
+    simyear_input = arcpy.GetParameterAsText(7)
+
+    #Set default values if optional fields left blank
+    if not i_field:
+        i_field = 'I'
+    if not j_field:
+        j_field = 'J'
+    try:
+        k_top = int(k_input)
+    except:
+        k_top = 1
+    try:
+        cellsize = float(cellsize_input)
+    except:
+        cellsize = None
+    try:
+        simyear = int(simyear_input)
+    except:
+        simyear = None
+    return {'in_gdb': in_gdb, 'grid_input': grid_input, 'i_field': i_field, 'j_field': j_field, 'k_top': k_top,
+            'out_workspace': out_workspace, 'cellsize': cellsize, 'simyear': simyear}
+
+##############################################################################
+#Steps 2-5 live in the ret package (ret.stomp); this script only reads the tool parameters
+if __name__ == '__main__':
+    MapToStomp(**ReadParameters())
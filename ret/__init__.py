@@ -0,0 +1,9 @@
+'''----------------------------------------------------------------------------------
+ Source Name: ret
+ Description: Recharge Estimation Tool library. The RET, SiteSelection and STOMP grid mapper workflows as importable
+              stages driven by a run context. arcpy is imported lazily, so the package can be imported without
+              ArcGIS. The toolbox scripts (RET2017_v09_Batch.py, SiteSelection.py, STOMPGridMapper.py) and the
+              command line ("python -m ret") are thin entry points on top of it.
+----------------------------------------------------------------------------------'''
+
+from ret.context import RunContext, SiteSelectionContext, ParseScenarios
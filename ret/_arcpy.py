@@ -0,0 +1,34 @@
+'''----------------------------------------------------------------------------------
+ Source Name: _arcpy.py
+ Description: Lazy stand-ins for the arcpy and arcpy.mapping modules. The RET library refers to these instead of
+              importing arcpy, so it can be imported (and its pure-Python stages used) without ArcGIS. arcpy is only
+              imported the first time one of its attributes is used. While a workload is recorded (see
+              ret.recorder) the functions are returned wrapped by the recorder.
+----------------------------------------------------------------------------------'''
+
+import importlib
+from ret import recorder
+
+
+class LazyModule(object):
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        if self.__dict__['_module'] is None:
+            self.__dict__['_module'] = importlib.import_module(self.__dict__['_name'])
+        return self.__dict__['_module']
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        if recorder.IsRecording():
+            return recorder.Recorded(self.__dict__['_name'] + '.' + attr, value)
+        return value
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+
+arcpy = LazyModule('arcpy')
+mp = LazyModule('arcpy.mapping')
@@ -0,0 +1,135 @@
+'''----------------------------------------------------------------------------------
+ Source Name: aggregates.py
+ Description: Incremental temporal aggregates (mean, min and max recharge) over configurable windows of years, kept
+              as running per-polygon sums as the years complete, so no second pass over the year outputs is needed.
+              Windows ("name=first-last;...", either end may be left open, or a number N for consecutive N-year
+              windows) are written to Aggregates.gdb/Recharge_<name> once their last year is done. Alias years of
+              a planned run count once each. When the polygon set changes within a window, the running values
+              move to the new polygons from the old polygon covering most of each new polygon.
+----------------------------------------------------------------------------------'''
+
+import os
+import numpy as np
+from ret._arcpy import arcpy
+from ret.common import GeometrySignature
+
+aggregateFields = ['Mean_RechargeRate', 'Min_RechargeRate', 'Max_RechargeRate', 'Years']
+
+
+def ParseWindows(window_input, years):
+    """Parses aggregation windows ("name=first-last;..." or "N" for consecutive N-year windows)"""
+    windows = []
+    for item in [x.strip() for x in window_input.split(';') if x.strip() != '']:
+        if item.isdigit():
+            step = int(item)
+            for first in range(min(years), max(years) + 1, step):
+                last = min(first + step - 1, max(years))
+                windows.append({'name': '{0}_{1}'.format(first, last), 'first': first, 'last': last})
+            continue
+        name, span = item.split('=', 1)
+        first, last = span.split('-', 1)
+        windows.append({'name': name.strip().replace(' ', '_'),
+                        'first': int(first) if first.strip() else min(years),
+                        'last': int(last) if last.strip() else max(years)})
+    return windows
+
+def CreateAggregates(ctx):
+    aggregate_gdb = os.path.join(ctx.out_workspace, 'Aggregates.gdb')
+    if not arcpy.Exists(aggregate_gdb):
+        arcpy.CreateFileGDB_management(ctx.out_workspace, 'Aggregates.gdb')
+    windows = ParseWindows(ctx.aggregate_windows, ctx.in_YoI)
+    for window in windows:
+        window['stats'] = None
+        window['done'] = False
+    return {'gdb': aggregate_gdb, 'windows': windows, 'signature': None, 'features': None, 'oids': None}
+
+def EmptyStats(count):
+    return {'sum': np.zeros(count, dtype=np.float64), 'count': np.zeros(count, dtype=np.int64),
+            'min': np.zeros(count, dtype=np.float64) + np.inf, 'max': np.zeros(count, dtype=np.float64) - np.inf}
+
+def PolygonMapping(previous, RechargeFeatures, oids, previousOids):
+    # Index of the previous polygon covering most of every polygon (-1 if none)
+    coverage = arcpy.Intersect_analysis([previous, RechargeFeatures],
+                                        os.path.join(os.path.dirname(previous), 'AggregateCoverage'), 'ONLY_FID')
+    previousName = 'FID_' + arcpy.Describe(previous).name
+    name = 'FID_' + arcpy.Describe(RechargeFeatures).name
+    arr = arcpy.da.FeatureClassToNumPyArray(coverage, [previousName, name, 'SHAPE@AREA'])
+    arcpy.Delete_management(coverage)
+    mapping = np.zeros(len(oids), dtype=np.int64) - 1
+    if len(arr) == 0:
+        return mapping
+    fids = arr[name].astype(np.int64)
+    previousFids = arr[previousName].astype(np.int64)
+    order = np.lexsort((-arr['SHAPE@AREA'], fids))
+    first = order[np.concatenate(([True], fids[order][1:] != fids[order][:-1]))]
+    mapping[np.searchsorted(oids, fids[first])] = np.searchsorted(previousOids, previousFids[first])
+    return mapping
+
+def MapStats(stats, mapping):
+    mapped = EmptyStats(len(mapping))
+    found = mapping >= 0
+    for key in mapped:
+        mapped[key][found] = stats[key][mapping[found]]
+    return mapped
+
+def WriteAggregate(aggregateInfo, window, nodata=-9999):
+    stats = window['stats']
+    out_fc = os.path.join(aggregateInfo['gdb'], 'Recharge_' + window['name'])
+    arcpy.CopyFeatures_management(aggregateInfo['features'], out_fc)
+    valid = stats['count'] > 0
+    extension = np.zeros(len(aggregateInfo['oids']),
+                         dtype=[('ExtendOID', np.int32)] + [(f, np.float64) for f in aggregateFields[:3]] +
+                               [('Years', np.int32)])
+    # CopyFeatures keeps the feature order, so the n-th copied polygon is the n-th polygon of the year
+    copiedOids = np.sort(arcpy.da.FeatureClassToNumPyArray(out_fc, ['OID@'])['OID@'])
+    extension['ExtendOID'] = copiedOids
+    for field, values in [('Mean_RechargeRate', stats['sum'] / np.maximum(stats['count'], 1)),
+                          ('Min_RechargeRate', stats['min']), ('Max_RechargeRate', stats['max'])]:
+        extension[field] = np.where(valid, values, nodata)
+    extension['Years'] = stats['count']
+    arcpy.da.ExtendTable(out_fc, arcpy.Describe(out_fc).OIDFieldName, extension, 'ExtendOID')
+    window['done'] = True
+    return out_fc
+
+def AppendAggregateYear(aggregateInfo, years, RechargeFeatures, nodata=-9999):
+    """Adds a computed year (and the alias years it stands for) to the running aggregates. Returns the windows
+    written"""
+    arr = arcpy.da.FeatureClassToNumPyArray(RechargeFeatures, ['OID@', 'RechargeRate'],
+                                            null_value={'RechargeRate': nodata})
+    order = np.argsort(arr['OID@'])
+    oids = arr['OID@'][order]
+    rate = arr['RechargeRate'].astype(np.float64)[order]
+    valid = rate != nodata
+
+    signature = GeometrySignature(RechargeFeatures)
+    if signature != aggregateInfo['signature']:
+        active = [w for w in aggregateInfo['windows'] if w['stats'] is not None and not w['done']]
+        if active:
+            mapping = PolygonMapping(aggregateInfo['features'], RechargeFeatures, oids, aggregateInfo['oids'])
+            for window in active:
+                window['stats'] = MapStats(window['stats'], mapping)
+        aggregateInfo['signature'] = signature
+        aggregateInfo['oids'] = oids
+    aggregateInfo['features'] = arcpy.Describe(RechargeFeatures).catalogPath
+
+    written = []
+    for window in aggregateInfo['windows']:
+        if window['done']:
+            continue
+        count = len([y for y in years if window['first'] <= y <= window['last']])
+        if count:
+            if window['stats'] is None:
+                window['stats'] = EmptyStats(len(oids))
+            stats = window['stats']
+            stats['sum'][valid] += rate[valid] * count
+            stats['count'][valid] += count
+            stats['min'][valid] = np.minimum(stats['min'][valid], rate[valid])
+            stats['max'][valid] = np.maximum(stats['max'][valid], rate[valid])
+        if window['stats'] is not None and max(years) >= window['last']:
+            written.append(WriteAggregate(aggregateInfo, window))
+    return written
+
+def FinishAggregates(aggregateInfo):
+    """Writes the windows that end after the last year of the run"""
+    return [WriteAggregate(aggregateInfo, window) for window in aggregateInfo['windows']
+            if window['stats'] is not None and not window['done']]
@@ -0,0 +1,224 @@
+'''----------------------------------------------------------------------------------
+ Source Name: attributecube.py
+ Description: Memory-mapped polygon x year attribute cube (int8-coded CoverType/SurfCond, float32 RechargeRate),
+              run-length encoded along time. Every polygon set (years sharing a GeometrySignature) is stored once
+              in AttributeCube.gdb with a CubeRow field, and a run is only stored when the attributes of a polygon
+              change. The last run of a polygon is open-ended, so years after the last appended year (e.g. past the
+              last disposition date) need no storage.
+
+              AttributeCube/
+                  AttributeCube.hdr    header (rows, years, attribute codes, polygon sets)
+                  AttributeCube.gdb    Polygons_<set> feature classes
+                  Runs.npy             runs sorted by row & year (row, year, cover, surf, rate)
+                  RowOffsets.npy       first run of every row
+----------------------------------------------------------------------------------'''
+
+import os
+import numpy as np
+from ret._arcpy import arcpy
+from ret.common import GeometrySignature
+
+runDtype = np.dtype([('row', '<i4'), ('year', '<i4'), ('cover', 'i1'), ('surf', 'i1'), ('rate', '<f4')])
+
+
+def CubeCodes(codes, values):
+    # int8 codes of text values. New values are added to the code list, empty values are coded -1
+    uniqueValues, inverse = np.unique(values, return_inverse=True)
+    lookup = []
+    for value in uniqueValues.tolist():
+        if value == '':
+            lookup.append(-1)
+            continue
+        if value not in codes:
+            if len(codes) >= 127:
+                raise ValueError('More than 127 distinct values cannot be coded as int8: ' + value)
+            codes.append(value)
+        lookup.append(codes.index(value))
+    return np.array(lookup, dtype=np.int8)[inverse]
+
+def DecodeCubeCodes(codes, values):
+    return [codes[v] if v >= 0 else None for v in values.tolist()]
+
+def CreateAttributeCube(cube_dir):
+    if not os.path.exists(cube_dir):
+        os.makedirs(cube_dir)
+    cube_gdb = os.path.join(cube_dir, 'AttributeCube.gdb')
+    if not arcpy.Exists(cube_gdb):
+        arcpy.CreateFileGDB_management(cube_dir, 'AttributeCube.gdb')
+    runs_path = os.path.join(cube_dir, 'Runs.bin')
+    if os.path.exists(runs_path):
+        os.remove(runs_path)
+    return {'dir': cube_dir, 'gdb': cube_gdb, 'runs': runs_path, 'coverCodes': [], 'surfCodes': [],
+            'groups': [], 'years': [], 'nrows': 0, 'signature': None, 'rowIndex': None, 'current': None}
+
+def AddCubePolygons(cubeInfo, RechargeFeatures, year):
+    # Stores a new polygon set. CopyFeatures keeps the feature order, so the n-th copied polygon is row first + n
+    first = cubeInfo['nrows']
+    oids = arcpy.da.FeatureClassToNumPyArray(RechargeFeatures, ['OID@'])['OID@']
+    features = os.path.join(cubeInfo['gdb'], 'Polygons_{0}'.format(len(cubeInfo['groups'])))
+    arcpy.CopyFeatures_management(RechargeFeatures, features)
+    arcpy.AddField_management(features, 'CubeRow', 'LONG')
+    with arcpy.da.UpdateCursor(features, ['CubeRow']) as rows:
+        for index, row in enumerate(rows):
+            row[0] = first + index
+            rows.updateRow(row)
+
+    rowIndex = np.zeros(oids.max() + 1 if len(oids) else 1, dtype=np.int64) - 1
+    rowIndex[oids] = first + np.arange(len(oids))
+    cubeInfo['groups'].append({'first': first, 'count': len(oids), 'year': year, 'features': features})
+    cubeInfo['nrows'] = first + len(oids)
+    cubeInfo['rowIndex'] = rowIndex
+
+def WriteRuns(cubeInfo, rows, year, cover, surf, rate):
+    runs = np.zeros(len(rows), dtype=runDtype)
+    runs['row'] = rows
+    runs['year'] = year
+    runs['cover'] = cover
+    runs['surf'] = surf
+    runs['rate'] = rate
+    with open(cubeInfo['runs'], 'ab') as f:
+        runs.tofile(f)
+
+def AppendAttributeCubeYear(cubeInfo, year, RechargeFeatures, nodata=-9999):
+    """Adds a year to the cube. Only polygons whose attributes changed since the previous year are stored"""
+    if cubeInfo['years'] and year <= cubeInfo['years'][-1]:
+        raise ValueError('Years must be added to the attribute cube in increasing order: {0}'.format(year))
+    signature = GeometrySignature(RechargeFeatures)
+    if signature != cubeInfo['signature']:
+        # Polygons of the previous set end with a nodata run
+        if cubeInfo['current'] is not None:
+            group = cubeInfo['groups'][-1]
+            count = group['count']
+            WriteRuns(cubeInfo, group['first'] + np.arange(count), year, np.zeros(count) - 1, np.zeros(count) - 1,
+                      np.zeros(count) + nodata)
+        AddCubePolygons(cubeInfo, RechargeFeatures, year)
+        cubeInfo['signature'] = signature
+        cubeInfo['current'] = None
+
+    arr = arcpy.da.FeatureClassToNumPyArray(RechargeFeatures, ['OID@', 'CoverType', 'SurfCond', 'RechargeRate'],
+                                            null_value={'CoverType': '', 'SurfCond': '', 'RechargeRate': nodata})
+    group = cubeInfo['groups'][-1]
+    rows = cubeInfo['rowIndex'][arr['OID@']]
+    cover = CubeCodes(cubeInfo['coverCodes'], arr['CoverType'].astype(np.unicode_))
+    surf = CubeCodes(cubeInfo['surfCodes'], arr['SurfCond'].astype(np.unicode_))
+    rate = arr['RechargeRate'].astype(np.float32)
+
+    current = cubeInfo['current']
+    if current is None:
+        current = {'cover': np.zeros(group['count'], dtype=np.int8) - 2,
+                   'surf': np.zeros(group['count'], dtype=np.int8) - 2,
+                   'rate': np.zeros(group['count'], dtype=np.float32) + nodata}
+        changed = np.ones(len(rows), dtype=bool)
+    else:
+        local = rows - group['first']
+        changed = (current['cover'][local] != cover) | (current['surf'][local] != surf) | \
+                  (current['rate'][local] != rate)
+    WriteRuns(cubeInfo, rows[changed], year, cover[changed], surf[changed], rate[changed])
+
+    local = rows - group['first']
+    current['cover'][local] = cover
+    current['surf'][local] = surf
+    current['rate'][local] = rate
+    cubeInfo['current'] = current
+    cubeInfo['years'].append(year)
+    return int(changed.sum())
+
+def WriteAttributeCubeHeader(cubeInfo):
+    header = ['rows = {0}'.format(cubeInfo['nrows']),
+              'years = {{{0}}}'.format(', '.join([str(y) for y in cubeInfo['years']]))]
+    for code, value in enumerate(cubeInfo['coverCodes']):
+        header.append(u'cover_{0} = {1}'.format(code, value))
+    for code, value in enumerate(cubeInfo['surfCodes']):
+        header.append(u'surf_{0} = {1}'.format(code, value))
+    for index, group in enumerate(cubeInfo['groups']):
+        header.append('group_{0} = {1}, {2}, {3}, {4}'.format(index, group['first'], group['count'], group['year'],
+                                                              os.path.basename(group['features'])))
+    with open(os.path.join(cubeInfo['dir'], 'AttributeCube.hdr'), 'wb') as f:
+        f.write(u'\n'.join(header).encode('utf-8') + b'\n')
+
+def CloseAttributeCube(cubeInfo):
+    """Sorts the runs by row & year into Runs.npy and writes the row offsets and header"""
+    if os.path.exists(cubeInfo['runs']):
+        runs = np.fromfile(cubeInfo['runs'], dtype=runDtype)
+    else:
+        runs = np.zeros(0, dtype=runDtype)
+    order = np.lexsort((runs['year'], runs['row']))
+    sortedRuns = np.lib.format.open_memmap(os.path.join(cubeInfo['dir'], 'Runs.npy'), mode='w+', dtype=runDtype,
+                                           shape=(len(runs),))
+    sortedRuns[:] = runs[order]
+    offsets = np.searchsorted(sortedRuns['row'], np.arange(cubeInfo['nrows'] + 1)).astype(np.int64)
+    del sortedRuns
+    np.save(os.path.join(cubeInfo['dir'], 'RowOffsets.npy'), offsets)
+    WriteAttributeCubeHeader(cubeInfo)
+    if os.path.exists(cubeInfo['runs']):
+        os.remove(cubeInfo['runs'])
+
+def OpenAttributeCube(cube_dir):
+    """Memory-mapped attribute cube written by CloseAttributeCube"""
+    cube = {'dir': cube_dir, 'gdb': os.path.join(cube_dir, 'AttributeCube.gdb'), 'coverCodes': [], 'surfCodes': [],
+            'groups': []}
+    header = {}
+    with open(os.path.join(cube_dir, 'AttributeCube.hdr'), 'rb') as f:
+        for line in f.read().decode('utf-8').splitlines():
+            if '=' in line:
+                key, value = line.split('=', 1)
+                header[key.strip()] = value.strip()
+    cube['nrows'] = int(header['rows'])
+    cube['years'] = [int(y) for y in header['years'].strip('{}').split(',') if y.strip() != '']
+    for prefix, codes in [('cover_', cube['coverCodes']), ('surf_', cube['surfCodes'])]:
+        code = 0
+        while prefix + str(code) in header:
+            codes.append(header[prefix + str(code)])
+            code += 1
+    index = 0
+    while 'group_' + str(index) in header:
+        first, count, year, features = [x.strip() for x in header['group_' + str(index)].split(',')]
+        cube['groups'].append({'first': int(first), 'count': int(count), 'year': int(year),
+                               'features': os.path.join(cube['gdb'], features)})
+        index += 1
+    cube['runs'] = np.load(os.path.join(cube_dir, 'Runs.npy'), mmap_mode='r')
+    cube['offsets'] = np.load(os.path.join(cube_dir, 'RowOffsets.npy'))
+    return cube
+
+def AttributeCubeValues(cube, year, rows=None, nodata=-9999):
+    """CoverType/SurfCond codes and RechargeRate of the rows for a year. Years after the last year of the cube keep
+    the last run of every row"""
+    runs = cube['runs']
+    # Runs are sorted by year within a row, so the run in effect is the last run starting on or before the year
+    count = np.bincount(runs['row'][runs['year'] <= year], minlength=cube['nrows'])
+    if rows is None:
+        rows = np.arange(cube['nrows'])
+    rows = np.asarray(rows, dtype=np.int64)
+    index = cube['offsets'][rows] + count[rows] - 1
+    valid = count[rows] > 0
+    cover = np.zeros(len(rows), dtype=np.int8) - 1
+    surf = np.zeros(len(rows), dtype=np.int8) - 1
+    rate = np.zeros(len(rows), dtype=np.float32) + nodata
+    cover[valid] = runs['cover'][index[valid]]
+    surf[valid] = runs['surf'][index[valid]]
+    rate[valid] = runs['rate'][index[valid]]
+    return cover, surf, rate
+
+def AttributeCubeSeries(cube, row):
+    """Run-length time series (start years, cover codes, surf codes, rates) of one row"""
+    runs = cube['runs'][cube['offsets'][row]:cube['offsets'][row + 1]]
+    return runs['year'], runs['cover'], runs['surf'], runs['rate']
+
+def CubeGroupAt(cube, year):
+    # Polygon set in effect for a year
+    group = None
+    for candidate in cube['groups']:
+        if candidate['year'] <= year:
+            group = candidate
+    return group
+
+def CubeChangeYears(cube, first, last, rows=None):
+    """Years within first..last at which any of the rows changes, starting with first"""
+    runs = cube['runs']
+    years = runs['year']
+    if rows is not None:
+        mask = np.zeros(cube['nrows'], dtype=bool)
+        mask[np.asarray(rows, dtype=np.int64)] = True
+        years = years[mask[runs['row']]]
+    years = np.unique(years[(years > first) & (years <= last)])
+    return [first] + years.tolist()
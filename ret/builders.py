@@ -0,0 +1,1101 @@
+'''----------------------------------------------------------------------------------
+ Source Name: builders.py
+ Description: Builds the cover type and surface condition features of a year (BRMP, AAC 1943, NAIP 2011, CVP,
+              ehsit, bggenexs, bggensit). Every builder takes the run context as its first argument.
+----------------------------------------------------------------------------------'''
+
+import os
+from ret._arcpy import arcpy, mp
+from ret.lookupstore import StoredLookup
+from ret.common import DeleteSurfconAndCoverType, AddSource, AddSurfconAndCover, AddLineage
+
+
+def setLookupDicts(ctx, disposition_lookup):
+    # Read from the table compiled once per run when available (see ret.lookupstore)
+    coverDict = StoredLookup(ctx.lookupStore, disposition_lookup, ["Disposition"], "Cover_Type")
+    if coverDict is not None:
+        ctx.coverDict = coverDict
+        ctx.surfCondDict = StoredLookup(ctx.lookupStore, disposition_lookup, ["Disposition"], "SurfCond")
+        if ctx.dispositionDict is None:
+            ctx.dispositionDict = StoredLookup(ctx.lookupStore, disposition_lookup, ["Disposition"],
+                                               {'SurfCond': 'SurfCond', 'CoverType': 'Cover_Type'}, lower=True)
+        return
+    dispositionLookup = arcpy.MakeTableView_management(disposition_lookup, 'dispositionLookup')
+    # Calculate surface condition from disposition via cover type
+    with arcpy.da.SearchCursor(dispositionLookup, ["Disposition", "Cover_Type", "SurfCond"]) as rows:
+        stored = [row for row in rows]
+    for row in stored:
+        ctx.coverDict[row[0]] = row[1]
+        ctx.surfCondDict[row[0]] = row[2]
+    if ctx.dispositionDict is None:
+        ctx.dispositionDict = {}
+        for row in stored:
+            if row[0] is not None and row[0].lower() not in ctx.dispositionDict:
+                ctx.dispositionDict[row[0].lower()] = {'SurfCond': row[2], 'CoverType': row[1]}
+
+def siteDispositionDict(ctx, disposition_input):
+    # Disposition -> condition of the Disposition table for the bggenexs & bggensit sites, read once per run. Matched
+    # like the per-site cursors did: exact disposition, the last row wins, Cover_Type read as the SurfCond and SurfCond
+    # as the CoverType
+    if ctx.siteDispositionDict is None:
+        ctx.siteDispositionDict = StoredLookup(ctx.lookupStore, disposition_input, ['Disposition'],
+                                               {'SurfCond': 'Cover_Type', 'CoverType': 'SurfCond'})
+    if ctx.siteDispositionDict is None:
+        ctx.siteDispositionDict = {}
+        with arcpy.da.SearchCursor(disposition_input, ['Disposition', 'Cover_Type', 'SurfCond']) as rows:
+            for row in rows:
+                ctx.siteDispositionDict[row[0]] = {'SurfCond': row[1], 'CoverType': row[2]}
+    return ctx.siteDispositionDict
+
+###############################TODO##########################Remove Calculate Succession from the RET Calculation ####
+def CalculateSuccession(ctx, condition, beginDate):
+#    modelYear = modelYear
+    if ctx.modelYear < int(beginDate) + 5 or condition == r'default':
+        return condition
+
+    successionStage = 0
+    if condition == 'Bare':
+        successionStage = 0
+    elif condition == 'Cheatgrass':
+        successionStage = 5
+    elif condition == 'Developing':
+        successionStage = 10
+    elif condition == 'Mature':
+        successionStage = 40
+
+    successionDuration = ctx.modelYear - beginDate
+    successionStage +=  successionDuration
+
+    if successionStage < 5:
+        result = 'Bare'
+    elif successionStage < 10:
+        result = 'Cheatgrass'
+    elif successionStage < 40:
+        result = 'Developing'
+    elif successionStage >= 40:
+        result = 'Mature'
+    else:
+        result = 'FLAG'
+
+    return result
+
+def KeywordCondition(ersType, keywords, dispositions, dispositionDict):
+    # Condition of an ACTIVE/INACTIVE ehsit site for a set of keywords and their dispositions
+    condition = None
+    for i in range(len(keywords)):
+        key = keywords[i]
+        disp = dispositions[i]
+        if key == '' or disp == '':
+            condition = {'SurfCond': 'Bare', 'CoverType': 'Disturbed'}
+        elif key.lower() in ersType.lower():
+            if disp.lower() in dispositionDict:
+                condition = dict(dispositionDict[disp.lower()])
+        else:
+            condition = {'SurfCond': 'Bare', 'CoverType': 'Disturbed'}
+    return condition
+
+def FeatureSuccessionForCVP(ctx, features, opYearField = 'cvpYear' ):
+    SurfCond = 'SurfCond'
+#    Cover = 'CoverType'
+
+    StartDisposition = "StartDisp"
+    arcpy.AddField_management (features,  StartDisposition, "TEXT", field_length = 75)
+
+    LastKnownCondition = "LastKnownCond"
+    arcpy.AddField_management (features,  LastKnownCondition, "TEXT", field_length = 75)
+
+    #Calculate Last Known Condition
+    lastKnownField =  "LastKnownCond"
+    opCondExpression = "!{0}!".format(SurfCond) #"[{0}]".format(SurfCond)
+
+    arcpy.CalculateField_management(features, lastKnownField, opCondExpression, "PYTHON_9.3")
+
+    surfCondValues = []
+    coverValues = []
+    startCond = []
+    
+    with arcpy.da.SearchCursor(features, [lastKnownField, opYearField]) as rows:
+        for row in rows:
+            lastKnown = row[0].strip()
+            if lastKnown in ctx.surfCondDict:
+                curSurfCond = ctx.surfCondDict[lastKnown]
+                curCover = ctx.coverDict[lastKnown]
+            elif lastKnown == '':
+                curSurfCond = ctx.surfCondDict["default"]
+                curCover = ctx.coverDict["default"]
+            else:
+                curSurfCond = 'undefined'
+                curCover = 'undefined'
+                
+            if int(row[1]) == 98:
+                startYear = '1998'
+            elif int(row[1]) == 99:
+                startYear = '1999'
+            else:
+                startYear = row[1]
+                
+            startCond.append(curSurfCond)            
+            
+            resultCondition = CalculateSuccession(ctx, curSurfCond, int(startYear))
+            coverValues.append(curCover)
+            surfCondValues.append(resultCondition)
+
+    surfConField = 'SurfCond'
+    coverField = 'CoverType'
+    lastKnownField =  "LastKnownCond"
+    startDispField =  "StartDisp"
+
+    with arcpy.da.UpdateCursor(features, [lastKnownField, surfConField, coverField, startDispField ]) as rows:
+        x = 0
+        for row in rows:
+            row[1] = surfCondValues[x]
+            row[2] = coverValues[x]
+            row[3] = startCond[x]
+
+            rows.updateRow(row)
+            x += 1
+    return
+
+def Build_BRMP(ctx, interim_dir, BRMP_input, recharge_lookup):
+    # Final Fields
+    Source = "Source"#'Source'
+#    SurfCond = 'SurfCond'
+    Cover = "CoverType" #'CoverType'
+
+    BRMP_temp = arcpy.CopyFeatures_management(BRMP_input, os.path.join(interim_dir, 'BRMP_'+ctx.yearString))
+
+    AddSurfconAndCover(BRMP_temp)
+    AddLineage(BRMP_temp)
+    arcpy.AddField_management (BRMP_temp, Source, "TEXT")
+
+    expression = '"BRMP_2011"' #''' "BRMP_2011" '''
+    arcpy.CalculateField_management(BRMP_temp,Source, expression,"PYTHON_9.3")
+
+    CoverExpression = "changeBRMPIndValue(!Cover_Type!)"#'''changeBRMPIndValue(!Cover_Type!) '''
+
+    cover_codeblock =  """
+def changeBRMPIndValue(brmp):
+    if brmp == r"Gravel/Industrial/Non-Vegetated/Agricultural/Exotic Weed":
+        result = r"Gravel/Industrial/Non-Vegetated/Exotic Weed"
+    elif brmp == r"Barrier-MinRchrg":
+        result = r"Barrier/MinRchrg"
+    else:
+        result = brmp
+
+    return result """
+
+    arcpy.CalculateField_management(BRMP_temp,Cover, CoverExpression, "PYTHON_9.3", cover_codeblock)
+
+    surfcon_lookup = recharge_lookup
+    surfconLookup = arcpy.MakeTableView_management(surfcon_lookup,  'surfconLookup')
+
+    # Calculate surface condition from disposition via cover type
+    surfCondDict = {}
+    with arcpy.da.SearchCursor(surfconLookup, ["Cover_Type", "SurfCond"]) as rows:
+        for row in rows:
+            surfCondDict[row[0]] = row[1]
+
+    surfConField = 'SurfCond'
+    coverField = 'CoverType'
+
+
+    with arcpy.da.UpdateCursor(BRMP_temp, [ coverField, surfConField]) as rows:
+        for row in rows:
+            row[1] = surfCondDict[row[0]]
+            rows.updateRow(row)
+
+    DeleteSurfconAndCoverType(BRMP_temp)
+    return BRMP_temp
+
+def Build_AAC1943(ctx, interim_dir, aac_1943_input):
+    #Final Fields
+    Source = "Source" #'Source'
+    SurfCond = "SurfCond"#'SurfCond'
+    Cover = "CoverType"#'CoverType'
+
+    aac_1943_temp = arcpy.CopyFeatures_management(aac_1943_input, os.path.join(interim_dir, 'AAC_1943_'+ctx.yearString))
+
+    AddSurfconAndCover(aac_1943_temp)
+    AddLineage(aac_1943_temp)
+    arcpy.AddField_management (aac_1943_temp, Source, "TEXT")
+
+    expression = '"AAC_1943"'#''' "AAC_1943" '''
+    arcpy.CalculateField_management(aac_1943_temp,Source, expression, "PYTHON_9.3")
+
+    # Set Surfcon
+    SurfConExpression = "get_siteid(!"+ 'SurfCon' +"!)"
+    surfcon_codeblock =  """
+def get_siteid(surfcon):
+    if surfcon == 'Cheatgrass':
+        result =  'Irrigated'
+    else:
+        result = surfcon
+    return result"""
+    arcpy.CalculateField_management(aac_1943_temp,SurfCond, SurfConExpression, "PYTHON_9.3", surfcon_codeblock)
+
+    CoverExpression = "get_siteid(!"+ 'Cover' +"!)"
+    cover_codeblock =  """
+def get_siteid(Cover):
+    if Cover == 'Abandoned Fields':
+        result =  'Agricultural / Orchard'
+    else:
+        result = Cover
+    return result"""
+    arcpy.CalculateField_management(aac_1943_temp,Cover, CoverExpression, "PYTHON_9.3", cover_codeblock)
+
+    DeleteSurfconAndCoverType(aac_1943_temp)
+    return aac_1943_temp
+
+def Build_Post_AAC1943(ctx, interim_dir, aac_1943_input):
+    #Final Fields
+    Source = "Source" #'Source'
+    SurfCond = "SurfCond" #'SurfCond'
+    Cover = "CoverType" #'CoverType'
+
+    aac_1943_temp = arcpy.CopyFeatures_management(aac_1943_input, os.path.join(interim_dir, 'AAC_1943_'+ctx.yearString))
+
+    AddSurfconAndCover(aac_1943_temp)
+    AddLineage(aac_1943_temp)
+    arcpy.AddField_management (aac_1943_temp, Source, "TEXT")
+
+    expression = '"AAC_1943"' #''' "NAIP_1943" '''
+    arcpy.CalculateField_management(aac_1943_temp,Source, expression, "PYTHON_9.3")
+
+    SurfConExpression = "!SurfCon!" #''' [SurfCon] '''
+    arcpy.CalculateField_management(aac_1943_temp,SurfCond, SurfConExpression, "PYTHON_9.3")
+
+    CoverExpression = "!Cover!" #''' [Cover] '''
+    arcpy.CalculateField_management(aac_1943_temp,Cover, CoverExpression, "PYTHON_9.3")
+
+    DeleteSurfconAndCoverType(aac_1943_temp)
+    return aac_1943_temp
+
+def Build_NAIP2011(ctx, interim_dir, NAIP_2011_input):
+    #Final Fields
+    Source = "Source" #Source'
+    SurfCond = "SurfCond" #'SurfCond'
+    Cover = "CoverType" #'CoverType'
+
+    NAIP_2011_temp = arcpy.CopyFeatures_management(NAIP_2011_input, os.path.join(interim_dir, 'NAIP_2011_'+ctx.yearString))
+
+    AddSurfconAndCover(NAIP_2011_temp)
+    AddLineage(NAIP_2011_temp)
+    arcpy.AddField_management(NAIP_2011_temp, Source, "TEXT")
+
+    expression = '"NAIP_2011"' #''' "AAC_2011" '''
+    arcpy.CalculateField_management(NAIP_2011_temp,Source, expression, "PYTHON_9.3")
+
+    SurfConExpression = "!SurfCon!" #''' [SurfCon]'''
+    arcpy.CalculateField_management(NAIP_2011_temp,SurfCond, SurfConExpression, "PYTHON_9.3")
+
+    CoverExpression = "!Cover!" #''' [Cover] '''
+    arcpy.CalculateField_management(NAIP_2011_temp,Cover, CoverExpression, "PYTHON_9.3")
+
+    DeleteSurfconAndCoverType(NAIP_2011_temp)
+
+    arcpy.AddField_management(NAIP_2011_temp, 'NAIP_ID', "TEXT")
+    arcpy.CalculateField_management(NAIP_2011_temp, 'NAIP_ID', "!OBJECTID!", "PYTHON_9.3")
+
+    # This section of code will create a union for: NAIP, bggenexs, bggensit, ehsit. The purpose of the union is to only
+    # apply the NAIP conditions for those polygons which intersect/overlap sites/buildings that actually exist. In other
+    # terms, the problem we're correcting with this section of code is that a region should only show up as 'disturbed'
+    # if the area actually had any construction on the site. For instance, in 1943 (initial conditions) there should
+    # only be vegetative cover with no man-made disturbance as defined by the NAIP coverage. However, when a site is
+    # built then the overlapping polygon should reflect the disturbance to the soil for that particular site/region.
+
+    # Create a master dictionary to identify which year will coincide with an active NAIP coverage. Need to do this only
+    # once. If done, then apply the correct conditions based on this analysis
+    if ctx.naip_activity_dict is None:
+        ctx.naip_activity_dict = {}
+
+        infeatures = [ctx.bggenexs_temp, ctx.bggensit_temp, ctx.ehsit_temp, ctx.brmp_temp]
+        outdir = os.path.join(ctx.out_gdb, 'naip_union')
+        naip_union = NAIP_2011_temp
+        for i in range(len(infeatures)):
+            naip_union = arcpy.Union_analysis([naip_union,infeatures[i]],
+                                               str(outdir + '_' + arcpy.Describe(infeatures[i]).name),
+                                               'ALL')
+
+        fields = ['Year_Built', 'First_Remediation', 'Closure_Year', 'Year_Built_1', 'First_Remediation_1',
+                  'Closure_Year_1','Start_Ops','End_Ops','First_Action','Final_Action', 'SurfCond_12_13_14',
+                  'CoverType_12_13_14', 'FID_BRMP_' + str(ctx.qry_year), 'NAIP_ID']
+        with arcpy.da.SearchCursor(naip_union, fields) as rows:
+            for row in rows:
+                row = list(row)
+                if row[-1] == '':
+                    pass
+                elif row[-1] == ' ':
+                    pass
+                elif row[-1] == '-1':
+                    pass
+                elif row[-1] is not None:
+                    naip_id = row.pop()
+                    brmp_id = row.pop()
+                    brmp_cover = row.pop()
+                    brmp_surface = row.pop()
+                    years = row
+                    if str(naip_id) == '573':
+                        pass
+                    if naip_id not in ctx.naip_activity_dict:
+                        ctx.naip_activity_dict[naip_id] = {
+                            'Disturbed': '',
+                            brmp_id: {
+                                'years': years,
+                                'BRMP_SurfCond': brmp_surface,
+                                'BRMP_Cover': brmp_cover
+                            }
+                        }
+                    else:
+                        ctx.naip_activity_dict[naip_id][brmp_id] = {
+                            'years': years,
+                            'BRMP_SurfCond': brmp_surface,
+                            'BRMP_Cover': brmp_cover
+                        }
+    elif ctx.qry_year >= 1989:
+        return NAIP_2011_temp
+
+    for id in ctx.naip_activity_dict:
+        if str(id) == '573':
+            pass
+        if str(id) == '212':
+            pass
+        for brmp in ctx.naip_activity_dict[id]:
+            if ctx.naip_activity_dict[id]['Disturbed'] == True:
+                pass
+            elif brmp == 'Disturbed':
+                pass
+            else:
+                for year in ctx.naip_activity_dict[id][brmp]['years']:
+                    if year is None:
+                        ctx.naip_activity_dict[id]['Disturbed'] = 'ignore'
+                    elif year == '':
+                        ctx.naip_activity_dict[id]['Disturbed'] = 'ignore'
+                    elif year == ' ':
+                        ctx.naip_activity_dict[id]['Disturbed'] = 'ignore'
+                    elif year == '-1':
+                        ctx.naip_activity_dict[id]['Disturbed'] = 'ignore'
+                    elif year == 0:
+                        ctx.naip_activity_dict[id]['Disturbed'] = 'ignore'
+                    else:
+                        year = int(year)
+                        if year > ctx.qry_year:
+                            ctx.naip_activity_dict[id]['Disturbed'] = False
+                        else:
+                            ctx.naip_activity_dict[id]['Disturbed'] = True
+                            break
+    NAIP_2011_temp = arcpy.Intersect_analysis([NAIP_2011_temp, ctx.brmp_temp],
+                                              os.path.join(ctx.out_gdb, 'NAIP_result_' + str(ctx.qry_year)),
+                                              'ALL')
+    with arcpy.da.UpdateCursor(NAIP_2011_temp,
+                               ['NAIP_ID',                          # row[0]
+                                'FID_BRMP_{0}'.format(ctx.yearString),  # row[1]
+                                'SurfCond',                         # row[2]
+                                'CoverType'                         # row[3]
+                                ]
+     ) as rows:
+        for row in rows:
+            naip_id = row[0]
+            brmp_id = row[1]
+            if str(naip_id) == '573':
+                pass
+            if ctx.naip_activity_dict[naip_id]['Disturbed'] == 'ignore':
+                pass
+            elif not ctx.naip_activity_dict[naip_id]['Disturbed']:
+                row[2] = ctx.naip_activity_dict[naip_id][brmp_id]['BRMP_SurfCond']
+                row[3] = ctx.naip_activity_dict[naip_id][brmp_id]['BRMP_Cover']
+                rows.updateRow(row)
+
+    return NAIP_2011_temp
+
+def Build_CVP(ctx, interim_dir, CVP_input):
+    qry_year = ctx.modelYear
+    # Does not work right now
+    # Does not need to be joined to Marie's data
+    # Final Fields
+    # Source = 'Source'
+    SurfCond = 'SurfCond'
+    Cover = 'CoverType'
+
+    # CVP Features
+    # creates a copy of the original data to be used in processing
+    temp_feats = arcpy.CopyFeatures_management(CVP_input, os.path.join(interim_dir, 'cvp_'+ ctx.yearString))
+
+    # adds field cvp_year and enters the year value for each field
+    cvpYearField = "cvp_year"
+    arcpy.AddField_management(temp_feats,cvpYearField,"DOUBLE")
+    expression = "get_year(!Key_WSRF!)"
+    codeblock =  """
+import re
+def get_year(year):
+    y = re.compile('^\d+')
+    actual = y.match(year)
+    if actual is not None:
+        result_string = actual.group()
+        result = int(result_string)
+        return result
+    else:
+        return 00"""
+    arcpy.CalculateField_management(temp_feats,cvpYearField, expression, "PYTHON_9.3", codeblock)
+
+    # adds field year_valid and assigns "valid" or "not valid"
+    yearValidField =  "year_valid"
+    arcpy.AddField_management(temp_feats,yearValidField,"TEXT")
+    expression = "is_year(!"+cvpYearField +"!)"
+    valid_codeblock =  """
+def is_year(year):
+    year_num = int(year)
+    if year_num >= 2000 and year_num <= {0}:
+        return "valid"
+    elif year_num >= 98 and year_num < 100:
+        return "valid"
+    else:
+        return "not valid" """.format(qry_year)
+    arcpy.CalculateField_management(temp_feats,yearValidField, expression, "PYTHON_9.3", valid_codeblock)
+
+    # creates a layer from the temp features
+    temp_cvp_layer = "temp_cvp_layer"
+    arcpy.MakeFeatureLayer_management(temp_feats, temp_cvp_layer)
+
+    # selects valid features from temp and copies them to "CVP_valid"
+    arcpy.SelectLayerByAttribute_management(temp_cvp_layer,"NEW_SELECTION", ''' "year_valid" = 'valid' ''')
+    CVP_valid = arcpy.CopyFeatures_management(temp_cvp_layer, os.path.join(interim_dir, 'CVP_valid'))
+
+    #Add fields
+    cvp_expression = '"cvp"'        #''' "cvp" '''
+    length = 6
+    AddSource(CVP_valid, cvp_expression, length)
+    AddSurfconAndCover(CVP_valid)
+    AddLineage(CVP_valid)
+    arcpy.CalculateField_management(CVP_valid, 'Lineage', '"cvp:" + str(!wids_sitec!)', "PYTHON_9.3")
+
+    SurfConExpression = '"Developing"'  #''' "Developing" '''
+    arcpy.CalculateField_management(CVP_valid,SurfCond, SurfConExpression, "PYTHON_9.3")
+
+    CoverExpression = '"Artificial Regeneration"'   #''' "Artificial Regeneration" '''
+    arcpy.CalculateField_management(CVP_valid,Cover, CoverExpression, "PYTHON_9.3")
+
+    FeatureSuccessionForCVP(ctx, CVP_valid, cvpYearField)
+    DeleteSurfconAndCoverType(CVP_valid)
+    return CVP_valid
+
+def Build_Ehsites(ctx, interim_dir, ehsit_input, disposition_input, disposition_lookup):
+    # ENVIRONMENTAL SITES
+    if ctx.scenario_ehsit is None:
+        ctx.scenario_ehsit = dict([(scenario['name'], {}) for scenario in ctx.scenarios])
+
+    # add wastesite table into map
+    dispositionTable = mp.TableView(disposition_input)
+    ehsitBase = "ehsit_{0}.".format(ctx.yearString)
+
+    # declare environmental hazardous sites as a map layer
+    ehsit_temp = arcpy.CopyFeatures_management(ehsit_input, os.path.join(interim_dir, 'ehsit_' + ctx.yearString + '_temp'))
+    ehsit_lyrName = 'ehsit_temp'
+    ehsit = arcpy.MakeFeatureLayer_management(ehsit_temp, ehsit_lyrName)
+
+    # delete poop site
+    with arcpy.da.UpdateCursor(ehsit, ["HAZSITE_ID"]) as rows:
+        for row in rows:
+            if row[0] == 2732:
+                rows.deleteRow()
+
+    #***** add fields before joining (avoids naming dilemna) *****#
+    ehsit_expression = '"ehsit"'    #''' "ehsit" '''
+    length = 6
+    AddSource(ehsit_temp, ehsit_expression, length)
+
+    fields_to_add = {'TEXT': [['Site_ID', 25], ['SurfCond', 100], ['CoverType', 100], ['Status', 12], ['Lineage', 100]],
+                     'LONG': ['Start_Ops', 'End_Ops', 'First_Action', 'Final_Action']}
+
+    for field in fields_to_add['TEXT']:
+        arcpy.AddField_management(ehsit_temp, field[0], "TEXT", field_length=field[1])
+    for field in fields_to_add['LONG']:
+        arcpy.AddField_management(ehsit_temp, field, "LONG")
+
+    # declare key fields
+    eh_NumField = "SITE_NUM"
+
+    # Calculate SiteID
+    eh_keyField = 'Site_ID'
+    siteExpression = "get_siteid(!"+eh_NumField +"!)"
+    siteid_codeblock =  """
+def get_siteid(site):
+    return site.split(';')[0] """
+    arcpy.CalculateField_management(ehsit_temp,eh_keyField, siteExpression, "PYTHON_9.3", siteid_codeblock)
+
+    # Intersect ehsit with BRMP
+    outdir = os.path.join(arcpy.Describe(ehsit_temp).path, ehsitBase.replace('.', ''))
+    ehsit_temp = arcpy.Intersect_analysis([ehsit_temp, ctx.brmp_temp], outdir, 'ALL')
+    ehsit = arcpy.MakeFeatureLayer_management(ehsit_temp, ehsitBase.replace('.', ''))
+
+    # Join ehsites to disposition table
+    disposition_keyField = 'Site_ID'
+    arcpy.AddJoin_management(ehsit,eh_keyField,dispositionTable,disposition_keyField)
+
+    # Calculate Start_Ops, End_Ops, Disposition, Future Disposition
+    dispDate = 'Date_Disposition'       # 'Disposition$.Date_Disposition' #GLT
+    begDate = 'Date_Begin'              # 'Disposition$.Date_Begin' #JBF
+    endDate = 'Date_End'                # 'Disposition$.Date_End' #JBF
+    futureDate = 'Disposition_TPA_Date' # 'Disposition$.Disposition_TPA_Date' #GLT
+
+    # opYearExpression = "get_opYear(!{0}!,!{1}!)".format(futureDate, dispDate)
+    opYear_codeblock = """
+def get_opYear(date_field,default):
+    if date_field is None:
+        opYear = default
+    elif date_field:
+        opYear = int(date_field)
+    else:
+        opYear = default
+    return opYear """
+    opYearExpression = "get_opYear(!{0}!,None)".format(begDate)
+    opYearField = [ehsitBase + fields_to_add['LONG'][0]]
+    arcpy.CalculateField_management(ehsit, opYearField[-1], opYearExpression, "PYTHON_9.3", opYear_codeblock)
+    opYearExpression = "get_opYear(!{0}!,None)".format(endDate)
+    opYearField += [ehsitBase + fields_to_add['LONG'][1]]
+    arcpy.CalculateField_management(ehsit, opYearField[-1], opYearExpression, "PYTHON_9.3", opYear_codeblock)
+    opYearExpression = "get_opYear(!{0}!,None)".format(dispDate)
+    opYearField += [ehsitBase + fields_to_add['LONG'][2]]
+    arcpy.CalculateField_management(ehsit, opYearField[-1], opYearExpression, "PYTHON_9.3", opYear_codeblock)
+    opYearExpression = "get_opYear(!{0}!,2042)".format(futureDate)
+    opYearField += [ehsitBase + fields_to_add['LONG'][3]]
+    arcpy.CalculateField_management(ehsit, opYearField[-1], opYearExpression, "PYTHON_9.3", opYear_codeblock)
+
+    #***** Calculate the appropriate condition *****#
+    # The first step of this is to determine which disposition is correct for the modelYear in question for each site.
+    # Perform a loop to evaluate which state the waste site is currently in and flag where values are NULL
+    # Options for the site status are the following:
+    #       Nonexistent = Has not yet come into existence, has not accepted waste according to historical data
+    #       Active = Either begun to accept waste or has been disturbed by construction
+    #       Inactive = The waste site exists but no longer accepts waste, will regrow vegetation
+    #       Intermediate = The waste site is between inactivity and full closure
+    #       Final = All planned/active remediation efforts have been concluded
+    #       FLAG = There is some error that needs to be addressed, most likely a missing year
+
+    status = ehsitBase + 'Status'
+    opCondExpression = "get_opCond({0},!{1}!,!{2}!,!{3}!,!{4}!)".format(ctx.modelYear,
+                                                                        ehsitBase + fields_to_add['LONG'][0],
+                                                                        ehsitBase + fields_to_add['LONG'][1],
+                                                                        ehsitBase + fields_to_add['LONG'][2],
+                                                                        ehsitBase + fields_to_add['LONG'][3])
+
+    opCond_codeblock =  """
+def get_opCond(modelYear,startOps,endOps,currDisp,finDisp):
+    opCond = 'FLAG'
+    if startOps is not None:
+        if modelYear < startOps:
+            opCond = 'NONEXISTENT'
+        elif endOps is not None:
+            if modelYear >= startOps and modelYear <= endOps:
+                opCond = 'ACTIVE'
+            elif currDisp is not None:
+                if modelYear > endOps and modelYear < currDisp:
+                    opCond = 'INACTIVE'
+                elif finDisp is not None:
+                    if modelYear >= currDisp and modelYear < finDisp:
+                        opCond = 'INTERMEDIATE'
+                    elif modelYear >= finDisp:
+                        opCond = 'FINAL'
+        elif currDisp is not None and finDisp is not None:
+            if modelYear >= currDisp and modelYear < finDisp:
+                opCond = 'INTERMEDIATE'
+            elif modelYear >= finDisp:
+                opCond = 'FINAL'
+        elif finDisp is not None:
+            if modelYear >= finDisp:
+                opCond = 'FINAL'
+    elif endOps is not None and currDisp is not None:
+        if modelYear > endOps and modelYear < currDisp:
+            opCond = 'INACTIVE'
+        elif finDisp is not None:
+            if modelYear >= currDisp and modelYear < finDisp:
+                opCond = 'INTERMEDIATE'
+            elif modelYear >= finDisp:
+                opCond = 'FINAL'
+    elif currDisp is not None and finDisp is not None:
+        if modelYear >= currDisp and modelYear < finDisp:
+            opCond = 'INTERMEDIATE'
+        elif modelYear >= finDisp:
+            opCond = 'FINAL'
+    elif finDisp is not None:
+        if modelYear >= finDisp:
+            opCond = 'FINAL'
+    return opCond """
+    arcpy.CalculateField_management(ehsit, status, opCondExpression, "PYTHON_9.3", opCond_codeblock)
+
+    # Create dictionary using ehsit_[year] and BRMP_[year] to assign to each waste site a cover type and condition
+    # The psuedo method for this is:
+    #   Union(ehsit_[year],BRMP_[year],output) --> Summary Statistics(Sum of Area(s) by Site Number)
+    #   Create Python Dictionary for each waste site that contains in detail the vegetation that makes up each site
+    # Will only be performed if the BRMP shapefile is valid (valid years defined in earlier section of code)
+    if ctx.brmpIsValid and ctx.ehsit_brmp_dict is None:
+        outdir = os.path.join(ctx.out_gdb, 'ehsit_brmp_union_{0}'.format(ctx.yearString))
+        ehsit_brmp_union = arcpy.Union_analysis([ehsit, ctx.brmp_temp], outdir, join_attributes="ALL")
+
+        # Create dictionary of the ehsit_brmp_table if it does not exist
+        fields = [ehsitBase.replace('.','') + '_Site_ID',   # row[0]
+                  'FID_BRMP_{0}'.format(ctx.yearString),        # row[1]
+                  'SurfCond',                               # row[2]
+                  'CoverType']                              # row[3]
+        ctx.ehsit_brmp_dict = {}
+        with arcpy.da.SearchCursor(ehsit_brmp_union, fields) as rows:
+            count = 0
+            for row in rows:
+                count += 1
+                if row[0] is None:
+                    pass
+                elif row[0] == '':
+                    pass
+                elif row[0] == ' ':
+                    pass
+                elif str(str(row[0]) + '_' + str(row[1])) not in ctx.ehsit_brmp_dict:
+                    siteID = str(str(row[0]) + '_' + str(row[1]))
+                    ctx.ehsit_brmp_dict[siteID] = {'SurfCond': row[2], 'CoverType':row[3]}
+                else:
+                    pass
+
+    # Calculate surface condition based on vegetation succession
+    inter_disp = 'Disposition.Actual_Disposition'   # 'Disposition$.Actual_Disposition' #JBF
+    future_disp = 'Disposition.TPA_Disposition'     # 'Disposition$.TPA_Disposition' #JBF
+
+    cur_year = {}
+    scenario_cur_year = dict([(scenario['name'], {}) for scenario in ctx.scenarios])
+    dispositionDict = ctx.dispositionDict
+
+    fields = [status,                                           # row[0]
+              'ehsit_{0}.Site_ID'.format(str(ctx.qry_year)),        # row[1]
+              ehsitBase + 'FID_BRMP_{0}'.format(str(ctx.qry_year)), # row[2]
+              inter_disp,                                       # row[3]
+              future_disp,                                      # row[4]
+              ehsitBase + 'ERS_TYPE_D',                         # row[5]
+              ]
+
+    with arcpy.da.SearchCursor(ehsit, fields)as rows:
+        for row in rows:
+            disposition = row[0].strip()
+            if str(row[1]) == '241-BX-101':
+                pass
+            id = str(str(row[1]) + '_' + str(row[2]))
+            # Check that the current year being calculated is the first. If the first, then apply BRMP SurfConds to all
+            # sites. ***IMPORTANT*** The year range must start with an earlier year than the first waste site startOps
+            # date. The first known startOps date currently is 1944
+            if int(ctx.yearString) == ctx.in_YoI[0]:
+                cur_year[id] = {'SurfCond': ctx.ehsit_brmp_dict[id]['SurfCond'],
+                                    'CoverType': ctx.ehsit_brmp_dict[id]['CoverType']}
+            # If Nonexistent, apply SurfConds from BRMP shapefile as natural vegetation/background state
+            elif disposition.lower() == 'nonexistent':
+                cur_year[id] = {'SurfCond': ctx.ehsit_brmp_dict[id]['SurfCond'],
+                                'CoverType': ctx.ehsit_brmp_dict[id]['CoverType']}
+            # If Active, use 'Bare-Disturbed' conditions
+            elif disposition.lower() == 'active' or disposition.lower() == 'inactive':
+                for i in range(len(ctx.keywords)):
+                    key = ctx.keywords[i]
+                    disp = ctx.dispositions[i]
+                    if key == '' or disp == '':
+                        cur_year[id] = {'SurfCond': 'Bare', 'CoverType': 'Disturbed'}
+                    elif key.lower() in row[5].lower():
+                        if disp.lower() in dispositionDict:
+                            cur_year[id] = dict(dispositionDict[disp.lower()])
+                    else:
+                        cur_year[id] = {'SurfCond': 'Bare', 'CoverType': 'Disturbed'}
+            elif disposition.lower() == 'intermediate':
+                if row[3] is not None and row[3] != '':
+                    if row[3].lower() in dispositionDict:
+                        cur_year[id] = dict(dispositionDict[row[3].lower()])
+                else:
+                    cur_year[id] = {'SurfCond': ctx.prev_year_ehsit[id]['SurfCond'],
+                                        'CoverType': ctx.prev_year_ehsit[id]['CoverType']}
+            elif disposition.lower() == 'final':
+                if row[4] is not None and row[4] != '':
+                    if row[4].lower() in dispositionDict:
+                        cur_year[id] = dict(dispositionDict[row[4].lower()])
+                else:
+                    cur_year[id] = {'SurfCond': ctx.prev_year_ehsit[id]['SurfCond'],
+                                        'CoverType': ctx.prev_year_ehsit[id]['CoverType']}
+            else:
+                cur_year[id] = {'SurfCond': ctx.prev_year_ehsit[id]['SurfCond'],
+                                    'CoverType': ctx.prev_year_ehsit[id]['CoverType']}
+
+            # Scenarios only differ where the keywords apply or where the previous year's condition is carried over
+            for scenario in ctx.scenarios:
+                scenario_cur = scenario_cur_year[scenario['name']]
+                if int(ctx.yearString) == ctx.in_YoI[0] or disposition.lower() == 'nonexistent':
+                    scenario_cur[id] = cur_year[id]
+                elif disposition.lower() == 'active' or disposition.lower() == 'inactive':
+                    condition = KeywordCondition(row[5], scenario['keywords'], scenario['dispositions'],
+                                                 dispositionDict)
+                    if condition is None:
+                        # Keyword matched a disposition missing from the lookup: the run's condition applies
+                        condition = dict(cur_year.get(id, {'SurfCond': 'Bare', 'CoverType': 'Disturbed'}))
+                    scenario_cur[id] = condition
+                elif disposition.lower() == 'intermediate' and row[3] is not None and row[3] != '':
+                    if id in cur_year:
+                        scenario_cur[id] = cur_year[id]
+                elif disposition.lower() == 'final' and row[4] is not None and row[4] != '':
+                    if id in cur_year:
+                        scenario_cur[id] = cur_year[id]
+                elif id in ctx.scenario_ehsit[scenario['name']]:
+                    scenario_cur[id] = dict(ctx.scenario_ehsit[scenario['name']][id])
+                elif id in cur_year:
+                    scenario_cur[id] = dict(cur_year[id])
+
+    #remove joins
+    arcpy.RemoveJoin_management(ehsit)
+
+    surfConField = 'SurfCond'
+    coverTypeField = 'CoverType'
+
+    ctx.prev_year_ehsit = {}
+    ctx.scenario_ehsit = scenario_cur_year
+
+    with arcpy.da.UpdateCursor(ehsit, ['Site_ID',
+                                       'FID_BRMP_{0}'.format(str(ctx.qry_year)),
+                                       surfConField,
+                                       coverTypeField,
+                                       'Lineage'
+                                       ]
+    ) as rows:
+        for row in rows:
+            id = str(str(row[0]) + '_' + str(row[1]))
+            ctx.prev_year_ehsit[id] = cur_year[id]
+            row[2] = cur_year[id]['SurfCond']
+            row[3] = cur_year[id]['CoverType']
+            row[4] = 'ehsit:' + id
+
+            rows.updateRow(row)
+
+    return ehsit
+
+def Build_Bggenexs(ctx, interim_dir, bggenexs_input, disposition_input):
+    # BUILDINGS
+
+    # Variables
+    bdg_base = 'bggenexs_{0}.'.format(ctx.yearString)
+
+    dispositionTable = mp.TableView(disposition_input)
+    bggenexs_temp = arcpy.Intersect_analysis([bggenexs_input,ctx.brmp_input], os.path.join(interim_dir, 'bggenexs_' + ctx.yearString), 'ALL')
+
+
+    # Make building layers
+    bggenexs = arcpy.MakeFeatureLayer_management(bggenexs_temp, 'bggenexs_temp')
+
+    bggenexs_expression = '"bggenexs"' #''' "bggenexs" '''
+    length = 8
+
+    #Add fields
+    AddSource(bggenexs_temp, bggenexs_expression, length)
+    AddSurfconAndCover(bggenexs_temp)
+    AddLineage(bggenexs_temp)
+
+    # Add field for Year_Built, Closure_Year (meaning final act of remediation in place), Status
+    build = 'Year_Built'
+    actual = 'First_Remediation'
+    close = 'Closure_Year'
+    status = 'Current_Status'
+
+    arcpy.AddField_management(bggenexs, build, 'TEXT', 4)
+    arcpy.AddField_management(bggenexs, actual, 'TEXT', 4)
+    arcpy.AddField_management(bggenexs, close, 'TEXT', 4)
+    arcpy.AddField_management(bggenexs, status, 'TEXT', 11)
+
+    # Join the disposition table with the bggenexs table
+    fields = ['Date_Begin', 'Date_Disposition', 'Disposition_TPA_Date', 'Actual_Disposition', 'TPA_Disposition']
+    arcpy.JoinField_management(bggenexs, 'Site_ID', dispositionTable, 'Site_ID', fields)
+
+    # Calculate the year fields
+    expression = "!{0}!".format(fields[0])
+    arcpy.CalculateField_management(bggenexs, build, expression, "PYTHON_9.3")
+    expression = "!{0}!".format(fields[1])
+    arcpy.CalculateField_management(bggenexs, actual, expression, "PYTHON_9.3")
+    expression = "!{0}!".format(fields[2])
+    arcpy.CalculateField_management(bggenexs, close, expression, "PYTHON_9.3")
+
+    # Calculate the building status. 'FLAG' if the years are missing for the analysis
+    expression = 'get_opCond({0}, !{1}!, !{2}!, !{3}!)'.format(ctx.modelYear, build, actual, close)
+    code_block = """
+def get_opCond(modelYear, begin, actual, closure):
+    status = 'FLAG'
+    if modelYear < 1943:
+        status = 'NONEXISTENT'
+    elif begin is not None:
+        if modelYear < begin:
+            status = 'NONEXISTENT'
+        elif actual is not None:
+            if modelYear >= begin and modelYear < actual:
+                status = 'ACTIVE'
+            elif closure is not None:
+                if modelYear >= actual and modelYear < closure:
+                    status = 'INTERMEDIATE'
+                elif modelYear >= closure:
+                    status = 'FINAL'
+        elif closure is not None:
+            if modelYear >= begin and modelYear < closure:
+                status = 'ACTIVE'
+            elif modelYear >= closure:
+                status = 'FINAL'
+        elif modelYear == begin:
+            status = 'ACTIVE'
+    elif actual is not None:
+        if modelYear >= actual:
+            if closure is not None:
+                if modelYear < closure:
+                    status = 'INTERMEDIATE'
+                else:
+                    status = 'FINAL'
+            else:
+                status = 'INTERMEDIATE'
+    elif closure is not None:
+        if modelYear >= closure:
+            status = 'FINAL'
+    return status"""
+    arcpy.CalculateField_management(bggenexs, status, expression, "PYTHON_9.3", code_block)
+
+    # Create dictionary using bggenexs_[year] and BRMP_[year] to assign to each waste site a cover type and condition
+    # The psuedo method for this is:
+    #   Union(bggenexs_[year],BRMP_[year],output) --> Summary Statistics(Sum of Area(s) by Site Number)
+    #   Create Python Dictionary for each waste site that contains in detail the vegetation that makes up each site
+    # Will only be performed if the BRMP shapefile is valid (valid years defined in earlier section of code)
+    if ctx.brmpIsValid and ctx.bggenexs_brmp_dict is None:
+        outdir = os.path.join(ctx.out_gdb, 'bggenexs_brmp_union_{0}'.format(ctx.yearString))
+        bggenexs_brmp_union = arcpy.Union_analysis([bggenexs, ctx.brmp_temp], outdir, join_attributes="ALL")
+
+        # Create dictionary of the bggenexs_brmp_table if it does not exist
+        fields = ['Site_ID',                                # row[0]
+                  'FID_BRMP_{0}'.format(ctx.yearString),        # row[1]
+                  'SurfCond_1',                               # row[2]
+                  'CoverType_1']                              # row[3]
+        ctx.bggenexs_brmp_dict = {}
+        with arcpy.da.SearchCursor(bggenexs_brmp_union, fields) as rows:
+            for row in rows:
+                if row[0] is None:
+                    pass
+                elif row[0] == '':
+                    pass
+                elif row[0] == ' ':
+                    pass
+                elif str(str(row[0]) + '_' + str(row[1])) not in ctx.bggenexs_brmp_dict:
+                    siteID = str(str(row[0]) + '_' + str(row[1]))
+                    if siteID == '241BX_1843':
+                        pass
+                    ctx.bggenexs_brmp_dict[siteID] = {'SurfCond': row[2], 'CoverType':row[3]}
+                else:
+                    pass
+
+    cur_year = {}
+    siteDispositions = siteDispositionDict(ctx, disposition_input)
+    # Populate the Surface Condition and Covert Type fields based on the status field
+    with arcpy.da.SearchCursor(bggenexs, ['Site_ID',                # row[0]
+                                          'FID_BRMP',               # row[1]
+                                          status,                   # row[2]
+                                          'Actual_Disposition',     # row[3]
+                                          'TPA_Disposition',        # row[4]
+                                          ]
+    )as rows:
+        for row in rows:
+            id = str(str(row[0]) + '_' + str(row[1]))
+            if id == '241BX_1843':
+                pass
+            cur_status = row[2]
+            if int(ctx.yearString) == ctx.in_YoI[0]:
+                cur_year[id] = {'SurfCond': ctx.bggenexs_brmp_dict[id]['SurfCond'],
+                                    'CoverType': ctx.bggenexs_brmp_dict[id]['CoverType']}
+            elif cur_status.lower() == 'flag' or cur_status.lower() == 'nonexistent':
+                cur_year[id] = ctx.prev_year_bggenexs[id]
+            elif cur_status.lower() == 'active':
+                cur_year[id] = {'SurfCond': 'Barrier/MinRchrg', 'CoverType': 'Barrier'}
+            elif cur_status.lower() == 'intermediate':
+                if row[3] is not None:
+                    if row[3] in siteDispositions:
+                        cur_year[id] = dict(siteDispositions[row[3]])
+                else:
+                    cur_year[id] = ctx.prev_year_bggenexs[id]
+            elif cur_status.lower() == 'final':
+                if row[4] is not None:
+                    if row[4] in siteDispositions:
+                        cur_year[id] = dict(siteDispositions[row[4]])
+                else:
+                    cur_year[id] = ctx.prev_year_bggenexs[id]
+
+    surfConField = 'SurfCond'
+    coverTypeField = 'CoverType'
+
+    ctx.prev_year_bggenexs = {}
+
+    with arcpy.da.UpdateCursor(bggenexs, ['Site_ID', 'FID_BRMP', surfConField, coverTypeField, 'Lineage']) as rows:
+        for row in rows:
+            id = str(str(row[0]) + '_' + str(row[1]))
+            if id == '241BX_1843':
+                pass
+            ctx.prev_year_bggenexs[id] = cur_year[id]
+            row[2] = cur_year[id]['SurfCond']
+            row[3] = cur_year[id]['CoverType']
+            row[4] = 'bggenexs:' + id
+
+            rows.updateRow(row)
+
+    return bggenexs
+
+def Build_Bggensit(ctx, interim_dir, bggensit_input, disposition_input):
+    # BUILDINGS
+
+    dispositionTable = mp.TableView(disposition_input)
+    bggensit_temp = arcpy.Intersect_analysis([bggensit_input, ctx.brmp_input],
+                                             os.path.join(interim_dir, 'bggensit_' + ctx.yearString), 'ALL')
+
+    # Make building layers
+    bggensit = arcpy.MakeFeatureLayer_management(bggensit_temp, 'bggensit_temp')
+
+    bggensit_expression = '"bggensit"'  # ''' "bggensit" '''
+    length = 8
+
+    # Add fields
+    AddSource(bggensit_temp, bggensit_expression, length)
+    AddSurfconAndCover(bggensit_temp)
+    AddLineage(bggensit_temp)
+
+    # Add field for Year_Built, Closure_Year (meaning final act of remediation in place), Status
+    build = 'Year_Built'
+    actual = 'First_Remediation'
+    close = 'Closure_Year'
+    status = 'Current_Status'
+
+    arcpy.AddField_management(bggensit, build, 'TEXT', 4)
+    arcpy.AddField_management(bggensit, actual, 'TEXT', 4)
+    arcpy.AddField_management(bggensit, close, 'TEXT', 4)
+    arcpy.AddField_management(bggensit, status, 'TEXT', 11)
+
+    # Join the disposition table with the bggensit table
+    fields = ['Date_Begin', 'Date_Disposition', 'Disposition_TPA_Date', 'Actual_Disposition', 'TPA_Disposition']
+    arcpy.JoinField_management(bggensit, 'Site_ID', dispositionTable, 'Site_ID', fields)
+
+    # Calculate the year fields
+    expression = "!{0}!".format(fields[0])
+    arcpy.CalculateField_management(bggensit, build, expression, "PYTHON_9.3")
+    expression = "!{0}!".format(fields[1])
+    arcpy.CalculateField_management(bggensit, actual, expression, "PYTHON_9.3")
+    expression = "!{0}!".format(fields[2])
+    arcpy.CalculateField_management(bggensit, close, expression, "PYTHON_9.3")
+
+    # Calculate the building status. 'FLAG' if the years are missing for the analysis
+    expression = 'get_opCond({0}, !{1}!, !{2}!, !{3}!)'.format(ctx.modelYear, build, actual, close)
+    code_block = """
+def get_opCond(modelYear, begin, actual, closure):
+    status = 'FLAG'
+    if modelYear < 1943:
+        status = 'NONEXISTENT'
+    elif begin is not None:
+        if modelYear < begin:
+            status = 'NONEXISTENT'
+        elif actual is not None:
+            if modelYear >= begin and modelYear < actual:
+                status = 'ACTIVE'
+            elif closure is not None:
+                if modelYear >= actual and modelYear < closure:
+                    status = 'INTERMEDIATE'
+                elif modelYear >= closure:
+                    status = 'FINAL'
+        elif closure is not None:
+            if modelYear >= begin and modelYear < closure:
+                status = 'ACTIVE'
+            elif modelYear >= closure:
+                status = 'FINAL'
+        elif modelYear == begin:
+            status = 'ACTIVE'
+    elif actual is not None:
+        if modelYear >= actual:
+            if closure is not None:
+                if modelYear < closure:
+                    status = 'INTERMEDIATE'
+                else:
+                    status = 'FINAL'
+            else:
+                status = 'INTERMEDIATE'
+    elif closure is not None:
+        if modelYear >= closure:
+            status = 'FINAL'
+    return status"""
+    arcpy.CalculateField_management(bggensit, status, expression, "PYTHON_9.3", code_block)
+
+    # Create dictionary using bggensit_[year] and BRMP_[year] to assign to each waste site a cover type and condition
+    # The psuedo method for this is:
+    #   Union(bggensit_[year],BRMP_[year],output) --> Summary Statistics(Sum of Area(s) by Site Number)
+    #   Create Python Dictionary for each waste site that contains in detail the vegetation that makes up each site
+    # Will only be performed if the BRMP shapefile is valid (valid years defined in earlier section of code)
+    if ctx.brmpIsValid and ctx.bggensit_brmp_dict is None:
+        outdir = os.path.join(ctx.out_gdb, 'bggensit_brmp_union_{0}'.format(ctx.yearString))
+        bggensit_brmp_union = arcpy.Union_analysis([bggensit, ctx.brmp_temp], outdir, join_attributes="ALL")
+
+        # Create dictionary of the bggensit_brmp_table if it does not exist
+        fields = ['Site_ID',  # row[0]
+                  'FID_BRMP_{0}'.format(ctx.yearString),  # row[1]
+                  'SurfCond_1',  # row[2]
+                  'CoverType_1']  # row[3]
+        ctx.bggensit_brmp_dict = {}
+        with arcpy.da.SearchCursor(bggensit_brmp_union, fields) as rows:
+            for row in rows:
+                if row[0] is None:
+                    pass
+                elif row[0] == '':
+                    pass
+                elif row[0] == ' ':
+                    pass
+                elif str(str(row[0]) + '_' + str(row[1])) not in ctx.bggensit_brmp_dict:
+                    siteID = str(str(row[0]) + '_' + str(row[1]))
+                    if siteID == '241BX_1843':
+                        pass
+                    ctx.bggensit_brmp_dict[siteID] = {'SurfCond': row[2], 'CoverType': row[3]}
+                else:
+                    pass
+
+    cur_year = {}
+    siteDispositions = siteDispositionDict(ctx, disposition_input)
+    # Populate the Surface Condition and Covert Type fields based on the status field
+    with arcpy.da.SearchCursor(bggensit, ['Site_ID',  # row[0]
+                                          'FID_BRMP',  # row[1]
+                                          status,  # row[2]
+                                          'Actual_Disposition',  # row[3]
+                                          'TPA_Disposition',  # row[4]
+                                          ]
+                               )as rows:
+        for row in rows:
+            id = str(str(row[0]) + '_' + str(row[1]))
+            if id == '241BX_1843':
+                pass
+            cur_status = row[2]
+            if int(ctx.yearString) == ctx.in_YoI[0]:
+                cur_year[id] = {'SurfCond': ctx.bggensit_brmp_dict[id]['SurfCond'],
+                                'CoverType': ctx.bggensit_brmp_dict[id]['CoverType']}
+            elif cur_status.lower() == 'flag' or cur_status.lower() == 'nonexistent':
+                cur_year[id] = ctx.prev_year_bggensit[id]
+            elif cur_status.lower() == 'active':
+                cur_year[id] = {'SurfCond': 'Barrier/MinRchrg', 'CoverType': 'Barrier'}
+            elif cur_status.lower() == 'intermediate':
+                if row[3] is not None:
+                    if row[3] in siteDispositions:
+                        cur_year[id] = dict(siteDispositions[row[3]])
+                else:
+                    cur_year[id] = ctx.prev_year_bggensit[id]
+            elif cur_status.lower() == 'final':
+                if row[4] is not None:
+                    if row[4] in siteDispositions:
+                        cur_year[id] = dict(siteDispositions[row[4]])
+                else:
+                    cur_year[id] = ctx.prev_year_bggensit[id]
+
+    surfConField = 'SurfCond'
+    coverTypeField = 'CoverType'
+
+    ctx.prev_year_bggensit = {}
+
+    with arcpy.da.UpdateCursor(bggensit, ['Site_ID', 'FID_BRMP', surfConField, coverTypeField, 'Lineage']) as rows:
+        for row in rows:
+            id = str(str(row[0]) + '_' + str(row[1]))
+            if id == '241BX_1843':
+                pass
+            ctx.prev_year_bggensit[id] = cur_year[id]
+            row[2] = cur_year[id]['SurfCond']
+            row[3] = cur_year[id]['CoverType']
+            row[4] = 'bggensit:' + id
+
+            rows.updateRow(row)
+
+    return bggensit
@@ -0,0 +1,189 @@
+'''----------------------------------------------------------------------------------
+ Source Name: cli.py
+ Description: Command line entry point of the RET library ("python -m ret <command>"). Commands:
+                  run            - RET recharge estimates for the years of interest
+                  siteselection  - clip & summarize RET outputs for a model domain
+                  stomp          - map site-specific recharge onto a STOMP grid
+                  clip           - parallel clipping workers (used by siteselection)
+                  tile           - one tile of a tiled run (used by run --tiles)
+                  montecarlo     - Monte Carlo realization chunks of a year (used by run --mc_workers)
+                  replay         - replay a recorded geoprocessing workload with synthetic data
+                  compare        - golden-output comparison of two RET output trees or SiteSelection gdbs
+----------------------------------------------------------------------------------'''
+
+import argparse
+import multiprocessing
+
+
+def _years(value):
+    # "1943-2041" or "1943,1950,1960"
+    if '-' in value:
+        first, last = value.split('-')
+        return list(range(int(first), int(last) + 1))
+    return [int(x) for x in value.split(',')]
+
+def _list(value, sep=','):
+    return [x.strip() for x in value.split(sep) if x.strip() != '']
+
+def RunCommand(args):
+    from ret.context import RunContext, ParseScenarios
+    from ret.pipeline import Run
+    extent = [float(x) for x in args.cube_extent.split()] if args.cube_extent else None
+    tiles = tuple([int(x) for x in args.tiles.split()]) if args.tiles else None
+    ctx = RunContext(args.in_workspace, args.out_workspace, in_YoI=args.years, keywords=_list(args.keywords),
+                     dispositions=_list(args.dispositions), scenarios=ParseScenarios(args.scenarios),
+                     cube_cellsize=args.cube_cellsize, cube_extent=extent,
+                     alt_lookups=_list(args.alt_lookups, ';'), alt_summary=not args.no_alt_summary,
+                     snap_resolution=args.snap_resolution, sliver_area=args.sliver_area, tiles=tiles,
+                     tile_overlap=args.tile_overlap, tile_workers=args.tile_workers,
+                     attribute_cube=args.attribute_cube, change_years=args.change_years,
+                     site_index=args.site_index,
+                     mc_lookup=args.mc_lookup or None, mc_realizations=args.mc_realizations,
+                     mc_ensemble=args.mc_ensemble, mc_workers=args.mc_workers, mc_seed=args.mc_seed,
+                     aggregate_windows=args.aggregate_windows, keep_intermediates=args.keep_intermediates,
+                     incremental=args.incremental, aoi=args.aoi or None, aoi_buffer=args.aoi_buffer,
+                     demand_years=_years(args.demand) if args.demand else None, memo_store=args.memo_store)
+    Run(ctx)
+
+def SiteSelectionCommand(args):
+    from ret.context import SiteSelectionContext
+    from ret.siteselection import Run
+    Run(SiteSelectionContext(args.aoi, args.simyear, args.simduration, args.source_gdb, args.in_workspace,
+                             args.out_workspace, m_name=args.m_name, workers=args.workers,
+                             domain_field=args.domain_field or None))
+
+def StompCommand(args):
+    from ret.stomp import MapToStomp
+    MapToStomp(args.in_gdb, args.grid, args.i_field, args.j_field, args.k_top, args.out_workspace, args.cellsize,
+               args.simyear)
+
+def ClipCommand(args):
+    from ret.clipworkers import ClipYearsParallel
+    ClipYearsParallel(args.years.split(','), args.in_workspace, args.aoi, args.out_gdb, args.workers)
+
+def TileCommand(args):
+    import pickle
+    from ret.tiling import RunTile
+    with open(args.spec, 'rb') as f:
+        RunTile(pickle.load(f))
+
+def MonteCarloCommand(args):
+    from ret.montecarlo import RealizationChunksParallel
+    RealizationChunksParallel(args.spec, args.workers)
+
+def ReplayCommand(args):
+    from ret.replay import ReplayRecording
+    for stats in ReplayRecording(args.recording, args.report, args.repeat):
+        print('{0}: {1} calls, {2:.2f}s recorded, {3:.2f}s replayed'.format(
+            stats['Tool'], stats['Calls'], stats['Recorded_Seconds'], stats['Replayed_Seconds']))
+
+def CompareCommand(args):
+    from ret.compare import CompareOutputs
+    years = _years(args.years) if args.years else None
+    results = CompareOutputs(args.output_a, args.output_b, args.report, years, args.decimals, args.area_tolerance)
+    failed = [r['Year'] for r in results if r['Status'] not in ('IDENTICAL', 'EQUIVALENT')]
+    print('{0} years compared, {1} not equivalent: {2}'.format(len(results), len(failed), failed))
+    return 1 if failed else 0
+
+def BuildParser():
+    parser = argparse.ArgumentParser(prog='ret', description='Recharge Estimation Tool')
+    commands = parser.add_subparsers(dest='command')
+
+    run = commands.add_parser('run', help='Calculate recharge estimates for the years of interest')
+    run.add_argument('--in_workspace', required=True)
+    run.add_argument('--out_workspace', required=True)
+    run.add_argument('--years', type=_years, default=None, help='"1943-2041" or "1943,1950"')
+    run.add_argument('--keywords', default='Tank')
+    run.add_argument('--dispositions', default='Barrier')
+    run.add_argument('--scenarios', default='', help='"name=keyword,keyword:disposition,disposition;..."')
+    run.add_argument('--cube_cellsize', type=float, default=None)
+    run.add_argument('--cube_extent', default='', help='"xmin ymin xmax ymax"')
+    run.add_argument('--alt_lookups', default='', help='Semicolon separated Recharge Lookup tables')
+    run.add_argument('--no_alt_summary', action='store_true')
+    run.add_argument('--snap_resolution', default='', help='e.g. "0.01 Meters"')
+    run.add_argument('--sliver_area', type=float, default=None)
+    run.add_argument('--tiles', default='', help='"nx ny" tiles for a tiled run')
+    run.add_argument('--tile_overlap', type=float, default=0.0)
+    run.add_argument('--tile_workers', type=int, default=multiprocessing.cpu_count())
+    run.add_argument('--attribute_cube', action='store_true', help='Write the polygon x year attribute cube')
+    run.add_argument('--change_years', action='store_true', help='Only compute the years at which conditions change')
+    run.add_argument('--site_index', action='store_true', help='Write the site index & per-site recharge table')
+    run.add_argument('--mc_lookup', default='', help='Lognormal sigma table laid out like the Recharge Lookup table')
+    run.add_argument('--mc_realizations', type=int, default=0)
+    run.add_argument('--mc_ensemble', action='store_true', help='Write the polygons x realizations rates per year')
+    run.add_argument('--mc_workers', type=int, default=1)
+    run.add_argument('--mc_seed', type=int, default=0)
+    run.add_argument('--aggregate_windows', default='',
+                     help='Mean/min/max recharge windows, "name=first-last;..." or "10" for decades')
+    run.add_argument('--keep_intermediates', action='store_true', help='Keep the scratch datasets of every year')
+    run.add_argument('--incremental', action='store_true',
+                     help='Only recompute the years affected by Disposition table edits since the previous run')
+    run.add_argument('--aoi', default='', help='Model domain feature class the inputs are restricted to')
+    run.add_argument('--aoi_buffer', default='', help='Buffer of the model domain, e.g. "500 Meters"')
+    run.add_argument('--demand', default='', help='Only produce these years ("1990,2005" or "1990-1995")')
+    run.add_argument('--memo_store', default='', help='Memo store of demand-driven runs (default <out>/MemoStore)')
+    run.set_defaults(func=RunCommand)
+
+    site = commands.add_parser('siteselection', help='Clip & summarize RET outputs for a model domain')
+    site.add_argument('--aoi', required=True,
+                      help='Model domain, or several as "nickname=feature class;..." or with --domain_field')
+    site.add_argument('--simyear', type=int, default=1943)
+    site.add_argument('--simduration', type=int, default=2000)
+    site.add_argument('--source_gdb', required=True)
+    site.add_argument('--in_workspace', required=True)
+    site.add_argument('--out_workspace', required=True)
+    site.add_argument('--m_name', default=None)
+    site.add_argument('--workers', type=int, default=1)
+    site.add_argument('--domain_field', default='', help='Field of the AoI feature class with the domain nicknames')
+    site.set_defaults(func=SiteSelectionCommand)
+
+    stomp = commands.add_parser('stomp', help='Map site-specific recharge onto a STOMP grid')
+    stomp.add_argument('--in_gdb', required=True)
+    stomp.add_argument('--grid', required=True)
+    stomp.add_argument('--i_field', default='I')
+    stomp.add_argument('--j_field', default='J')
+    stomp.add_argument('--k_top', type=int, default=1)
+    stomp.add_argument('--out_workspace', default=None)
+    stomp.add_argument('--cellsize', type=float, default=None)
+    stomp.add_argument('--simyear', type=int, default=None)
+    stomp.set_defaults(func=StompCommand)
+
+    clip = commands.add_parser('clip', help='Clip RET outputs for the years of interest in parallel')
+    clip.add_argument('--years', required=True)
+    clip.add_argument('--in_workspace', required=True)
+    clip.add_argument('--aoi', required=True)
+    clip.add_argument('--out_gdb', required=True)
+    clip.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    clip.set_defaults(func=ClipCommand)
+
+    tile = commands.add_parser('tile', help='Run one tile of a tiled run')
+    tile.add_argument('spec', help='Pickled tile run context')
+    tile.set_defaults(func=TileCommand)
+
+    montecarlo = commands.add_parser('montecarlo', help='Monte Carlo realization chunks of a year (used by run)')
+    montecarlo.add_argument('spec', help='Pickled realization chunks')
+    montecarlo.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    montecarlo.set_defaults(func=MonteCarloCommand)
+
+    replay = commands.add_parser('replay', help='Replay a recorded geoprocessing workload (RET_RECORD) without ArcGIS')
+    replay.add_argument('recording', nargs='+', help='Recording of a run and of its worker processes')
+    replay.add_argument('--report', default=None, help='Per-tool replay CSV')
+    replay.add_argument('--repeat', type=int, default=1, help='Replays of every call')
+    replay.set_defaults(func=ReplayCommand)
+
+    compare = commands.add_parser('compare', help='Compare two RET output trees or SiteSelection gdbs year by year')
+    compare.add_argument('output_a')
+    compare.add_argument('output_b')
+    compare.add_argument('--report', default=None, help='Per-year comparison CSV')
+    compare.add_argument('--years', default=None, help='"1943-2041" or "1943,1950"')
+    compare.add_argument('--decimals', type=int, default=2, help='Centroid/area rounding')
+    compare.add_argument('--area_tolerance', type=float, default=1e-6, help='Relative area tolerance')
+    compare.set_defaults(func=CompareCommand)
+    return parser
+
+def main(argv=None):
+    args = BuildParser().parse_args(argv)
+    if not hasattr(args, 'func'):
+        BuildParser().print_help()
+        return 2
+    return args.func(args) or 0
@@ -0,0 +1,74 @@
+'''----------------------------------------------------------------------------------
+ Source Name: clipworkers.py
+ Description: Clips the RET outputs for the years of interest to the model domain with a bounded pool of worker
+              processes. Each worker clips into its own scratch geodatabase, and the clipped years are then
+              consolidated into the output geodatabase. Run as a separate process ("python -m ret clip") by
+              SiteSelection so the workers never re-import the calling toolbox script.
+----------------------------------------------------------------------------------'''
+
+import os
+import sys
+import subprocess
+import multiprocessing
+from ret._arcpy import arcpy
+
+
+def ClipYear(args):
+    in_workspace, scratch_dir, AoI, y = args
+    arcpy.env.overwriteOutput = True
+
+    # One scratch geodatabase per year, so workers never write to the same geodatabase
+    scratch_name = 'scratch_' + y + '.gdb'
+    scratch_gdb = os.path.join(scratch_dir, scratch_name)
+    if not arcpy.Exists(scratch_gdb):
+        arcpy.CreateFileGDB_management(scratch_dir, scratch_name)
+
+    # Layer names are per year so they never collide with "Recharge_lyr" or with another year
+    in_gdb = os.path.join(in_workspace, y + ".gdb", "RechargeEstimates_" + y)
+    lyr_name = "Recharge_lyr_" + y
+    Recharge_lyr = arcpy.MakeFeatureLayer_management(in_gdb, lyr_name)
+    Output_lyr = os.path.join(scratch_gdb, 'Recharge_' + y)
+    arcpy.Clip_analysis(Recharge_lyr, AoI, Output_lyr)
+    arcpy.Delete_management(lyr_name)
+    return y, Output_lyr
+
+def ClipYearsParallel(years, in_workspace, AoI, out_gdb, workers):
+    multiprocessing.set_executable(PythonExecutable())
+    scratch_dir = os.path.splitext(out_gdb)[0] + '_scratch'
+    if not os.path.exists(scratch_dir):
+        os.makedirs(scratch_dir)
+
+    # Bound the pool by the number of cores and years
+    workers = max(1, min(workers, multiprocessing.cpu_count(), len(years)))
+    arcpy.AddMessage('Clipping {0} years with {1} workers'.format(len(years), workers))
+    pool = multiprocessing.Pool(workers)
+    try:
+        results = pool.map(ClipYear, [(in_workspace, scratch_dir, AoI, y) for y in years], chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    # Consolidate the clipped years into the output geodatabase & remove the scratch geodatabases
+    for y, clipped in sorted(results):
+        arcpy.FeatureClassToFeatureClass_conversion(clipped, out_gdb, 'Recharge_' + y)
+        arcpy.Delete_management(os.path.dirname(clipped))
+        arcpy.AddMessage('Consolidated year: {0}'.format(y))
+    if not os.listdir(scratch_dir):
+        os.rmdir(scratch_dir)
+
+def PythonExecutable():
+    # Inside ArcMap sys.executable is the application, so start workers with the bundled interpreter
+    executable = sys.executable
+    if not os.path.basename(executable).lower().startswith('python'):
+        executable = os.path.join(sys.exec_prefix, 'python.exe')
+    return executable
+
+def RunClipWorkers(years, in_workspace, AoI, out_gdb, workers):
+    """Runs ClipYearsParallel in a separate interpreter so worker processes only import the ret package"""
+    package_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    subprocess.check_call([PythonExecutable(), '-m', 'ret', 'clip',
+                           '--years', ','.join(years),
+                           '--in_workspace', in_workspace,
+                           '--aoi', AoI,
+                           '--out_gdb', out_gdb,
+                           '--workers', str(workers)], cwd=package_dir)
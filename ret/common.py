@@ -0,0 +1,68 @@
+'''----------------------------------------------------------------------------------
+ Source Name: common.py
+ Description: Field, csv and geometry helpers shared by the RET builders and tools.
+----------------------------------------------------------------------------------'''
+
+import sys
+import hashlib
+import numpy as np
+from ret._arcpy import arcpy
+
+
+def DeleteSurfconAndCoverType(featureClass):
+    fieldNames = [x.name for x in arcpy.ListFields(featureClass)]
+
+    if 'SurfCon' in fieldNames:
+        arcpy.DeleteField_management(featureClass, 'SurfCon')
+
+    if 'Cover_Type' in fieldNames:
+        arcpy.DeleteField_management(featureClass, 'Cover_Type')
+
+    if 'Cover' in fieldNames:
+        arcpy.DeleteField_management(featureClass, 'Cover')
+
+def AddSource(featureClass, sourceExpression, length):
+    """Adds Source Field to feature class"""
+    Source = "Source" #'Source'
+    if 'length' in locals():
+        arcpy.AddField_management (featureClass, Source, "TEXT", field_length = length)
+    else:
+        arcpy.AddField_management(featureClass, Source, "TEXT")
+    arcpy.CalculateField_management(featureClass,Source, sourceExpression, "PYTHON_9.3")
+
+def AddTextField(featureClass, fieldName, length):
+    # Adds a text field to the feature class
+    arcpy.AddField_management(featureClass, fieldName, "TEXT", field_length=length)
+
+def AddSurfconAndCover(featureClass):
+    # Adds two fields needed for update
+    AddTextField(featureClass, 'SurfCond', 100)
+    AddTextField(featureClass, 'CoverType', 100)
+
+def AddLineage(featureClass):
+    # Identifies the site a polygon came from. Carried through the update chain to the recharge estimates
+    AddTextField(featureClass, 'Lineage', 100)
+
+def OpenCsv(path, mode):
+    # csv needs binary files on Python 2 (ArcGIS Desktop) and newline='' on Python 3 (ArcGIS Pro)
+    if sys.version_info[0] < 3:
+        return open(path, mode + 'b')
+    return open(path, mode, newline='')
+
+def CsvText(value):
+    # Text values are written as UTF-8 by the Python 2 csv module
+    if sys.version_info[0] < 3 and isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+def FeatureCount(featureClass):
+    return int(arcpy.GetCount_management(featureClass).getOutput(0))
+
+def GeometrySignature(featureClass):
+    """Fingerprint of the polygon set of a feature class (OID order, areas and centroids)"""
+    arr = arcpy.da.FeatureClassToNumPyArray(featureClass, ['OID@', 'SHAPE@AREA', 'SHAPE@XY'])
+    signature = hashlib.md5()
+    signature.update(np.ascontiguousarray(arr['OID@'], dtype=np.int64))
+    signature.update(np.ascontiguousarray(np.round(arr['SHAPE@AREA'], 2)))
+    signature.update(np.ascontiguousarray(np.round(arr['SHAPE@XY'], 2)))
+    return signature.hexdigest()
@@ -0,0 +1,150 @@
+'''----------------------------------------------------------------------------------
+ Source Name: compare.py
+ Description: Golden-output comparison of two RET output trees (<year>.gdb/RechargeEstimates_<year>) or two
+              SiteSelection geodatabases (Recharge_<year>). Each year is first compared by a hash of its sorted
+              polygon table; only years whose hashes differ are matched polygon by polygon (centroid and area
+              tolerance) and by area per CoverType/SurfCond/RechargeRate combination.
+----------------------------------------------------------------------------------'''
+
+import os
+import csv
+import hashlib
+import numpy as np
+from ret._arcpy import arcpy
+from ret.common import OpenCsv
+from ret.planner import ReadYearCatalog
+
+compareFields = ['CoverType', 'SurfCond', 'RechargeRate']
+reportFields = ['Year', 'Status', 'Polygons_A', 'Polygons_B', 'Unmatched_A', 'Unmatched_B', 'CoverType_Mismatches',
+                'SurfCond_Mismatches', 'RechargeRate_Mismatches', 'Total_Area_A', 'Total_Area_B', 'Delta_Total_Area',
+                'Attribute_Area_Mismatch']
+
+
+def ListOutputYears(output):
+    """Year -> recharge feature class of a RET output directory or a SiteSelection geodatabase. Alias years of a
+    planned RET run resolve to their computed year"""
+    years = {}
+    if output.lower().endswith('.gdb'):
+        arcpy.env.workspace = output
+        for fc in arcpy.ListFeatureClasses('Recharge_*'):
+            years[int(fc.replace('Recharge_', ''))] = os.path.join(output, fc)
+    else:
+        for database in os.listdir(output):
+            y = database.replace('.gdb', '')
+            if database.lower().endswith('.gdb') and y.isdigit():
+                years[int(y)] = os.path.join(output, database, 'RechargeEstimates_' + y)
+        catalog = ReadYearCatalog(output)
+        if catalog is not None:
+            for y in catalog:
+                if y not in years and catalog[y] in years:
+                    years[y] = years[catalog[y]]
+    return years
+
+def PolygonTable(featureClass, decimals=2, nodata=-9999):
+    # Polygon areas, centroids and compared attributes, sorted by centroid & area so the table does not depend on
+    # the OID order
+    arr = arcpy.da.FeatureClassToNumPyArray(featureClass, ['SHAPE@AREA', 'SHAPE@XY'] + compareFields,
+                                            null_value={'CoverType': '', 'SurfCond': '', 'RechargeRate': nodata})
+    xy = np.round(arr['SHAPE@XY'].astype(np.float64), decimals)
+    area = arr['SHAPE@AREA'].astype(np.float64)
+    order = np.lexsort((np.round(area, decimals), xy[:, 1], xy[:, 0]))
+    return {'x': xy[order, 0],
+            'y': xy[order, 1],
+            'area': area[order],
+            'CoverType': arr['CoverType'].astype(np.unicode_)[order],
+            'SurfCond': arr['SurfCond'].astype(np.unicode_)[order],
+            'RechargeRate': np.round(arr['RechargeRate'].astype(np.float64), 6)[order]}
+
+def TableDigest(table, decimals=2):
+    digest = hashlib.md5()
+    for key in ['x', 'y']:
+        digest.update(np.ascontiguousarray(table[key]))
+    digest.update(np.ascontiguousarray(np.round(table['area'], decimals)))
+    digest.update(np.ascontiguousarray(table['RechargeRate']))
+    digest.update(u'\n'.join(table['CoverType'].tolist()).encode('utf-8'))
+    digest.update(u'\n'.join(table['SurfCond'].tolist()).encode('utf-8'))
+    return digest.hexdigest()
+
+def AttributeAreas(table):
+    # Total area of every CoverType/SurfCond/RechargeRate combination. Independent of how polygons are split
+    if len(table['area']) == 0:
+        return {}
+    keys = np.char.add(np.char.add(np.char.add(np.char.add(table['CoverType'], u'\t'), table['SurfCond']), u'\t'),
+                       table['RechargeRate'].astype(np.unicode_))
+    uniqueKeys, inverse = np.unique(keys, return_inverse=True)
+    return dict(zip(uniqueKeys.tolist(), np.bincount(inverse, weights=table['area']).tolist()))
+
+def MatchPolygons(tableA, tableB, area_tolerance):
+    # Pairs polygons with the same rounded centroid whose areas agree within the relative tolerance
+    candidates = {}
+    for index, key in enumerate(zip(tableB['x'].tolist(), tableB['y'].tolist())):
+        candidates.setdefault(key, []).append(index)
+    pairsA = []
+    pairsB = []
+    for index, key in enumerate(zip(tableA['x'].tolist(), tableA['y'].tolist())):
+        for candidate in candidates.get(key, []):
+            if abs(tableA['area'][index] - tableB['area'][candidate]) <= area_tolerance * max(tableA['area'][index], 1.0):
+                pairsA.append(index)
+                pairsB.append(candidate)
+                candidates[key].remove(candidate)
+                break
+    return np.array(pairsA, dtype=np.int64), np.array(pairsB, dtype=np.int64)
+
+def CompareYear(featureClassA, featureClassB, decimals=2, area_tolerance=1e-6):
+    """Per-year comparison of two recharge feature classes"""
+    tableA = PolygonTable(featureClassA, decimals)
+    tableB = PolygonTable(featureClassB, decimals)
+    areaA = tableA['area'].sum()
+    areaB = tableB['area'].sum()
+    result = {'Polygons_A': len(tableA['area']), 'Polygons_B': len(tableB['area']),
+              'Unmatched_A': 0, 'Unmatched_B': 0, 'CoverType_Mismatches': 0, 'SurfCond_Mismatches': 0,
+              'RechargeRate_Mismatches': 0, 'Total_Area_A': areaA, 'Total_Area_B': areaB,
+              'Delta_Total_Area': areaB - areaA, 'Attribute_Area_Mismatch': 0.0}
+    if TableDigest(tableA, decimals) == TableDigest(tableB, decimals):
+        result['Status'] = 'IDENTICAL'
+        return result
+
+    pairsA, pairsB = MatchPolygons(tableA, tableB, area_tolerance)
+    result['Unmatched_A'] = result['Polygons_A'] - len(pairsA)
+    result['Unmatched_B'] = result['Polygons_B'] - len(pairsB)
+    for field in compareFields:
+        result[field + '_Mismatches'] = int((tableA[field][pairsA] != tableB[field][pairsB]).sum())
+
+    attributeAreasA = AttributeAreas(tableA)
+    attributeAreasB = AttributeAreas(tableB)
+    result['Attribute_Area_Mismatch'] = sum([abs(attributeAreasA.get(key, 0.0) - attributeAreasB.get(key, 0.0))
+                                             for key in set(attributeAreasA) | set(attributeAreasB)])
+
+    # Polygons split differently (e.g. along tile seams) still match if every attribute combination covers the same area
+    areaTolerance = area_tolerance * max(areaA, areaB, 1.0)
+    if result['Attribute_Area_Mismatch'] <= areaTolerance and abs(areaB - areaA) <= areaTolerance:
+        result['Status'] = 'EQUIVALENT'
+    else:
+        result['Status'] = 'MISMATCH'
+    return result
+
+def CompareOutputs(outputA, outputB, report_csv=None, years=None, decimals=2, area_tolerance=1e-6):
+    """Compares two RET output trees or SiteSelection geodatabases year by year. Returns the per-year results"""
+    yearsA = ListOutputYears(outputA)
+    yearsB = ListOutputYears(outputB)
+    if years is None:
+        years = sorted(set(yearsA) | set(yearsB))
+
+    results = []
+    for y in years:
+        if y not in yearsA or y not in yearsB:
+            result = dict([(f, '') for f in reportFields])
+            result['Status'] = 'MISSING_A' if y not in yearsA else 'MISSING_B'
+        else:
+            result = CompareYear(yearsA[y], yearsB[y], decimals, area_tolerance)
+        result['Year'] = y
+        results.append(result)
+        arcpy.AddMessage('{0}: {1}'.format(y, result['Status']))
+
+    if report_csv:
+        with OpenCsv(report_csv, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(reportFields)
+            for result in results:
+                writer.writerow([result[f] for f in reportFields])
+    return results
@@ -0,0 +1,237 @@
+'''----------------------------------------------------------------------------------
+ Source Name: context.py
+ Description: Run-context objects for RET and SiteSelection. They hold the run parameters, the input paths, the
+              state of the year being calculated and the state carried over from year to year, so the workflow
+              stages can be called individually (e.g. from worker processes) instead of relying on globals.
+----------------------------------------------------------------------------------'''
+
+import os
+from datetime import datetime
+
+
+def ParseScenarios(scenario_input):
+    """Parses keyword/disposition scenarios ("name=keyword,keyword:disposition,disposition;...")"""
+    scenarios = []
+    for index, scenario in enumerate([x for x in scenario_input.split(';') if x.strip() != '']):
+        if '=' in scenario:
+            scenario_name, scenario = scenario.split('=', 1)
+        else:
+            scenario_name = 'Scenario' + str(index + 1)
+        scenario_keywords, scenario_dispositions = scenario.split(':')
+        scenarios.append({'name': scenario_name.strip().replace(' ', '_'),
+                          'keywords': [x.strip() for x in scenario_keywords.split(',')],
+                          'dispositions': [x.strip() for x in scenario_dispositions.split(',')]})
+    return scenarios
+
+
+class RunContext(object):
+    """State of a RET run"""
+
+    def __init__(self, in_workspace, out_workspace, in_YoI=None, keywords=None, dispositions=None, scenarios=None,
+                 cube_cellsize=None, cube_extent=None, alt_lookups=None, alt_summary=True, snap_resolution='',
+                 sliver_area=None, tiles=None, tile_overlap=0.0, tile_workers=1, attribute_cube=False,
+                 change_years=False, site_index=False,
+                 mc_lookup=None, mc_realizations=0, mc_ensemble=False, mc_workers=1, mc_seed=0,
+                 aggregate_windows='', keep_intermediates=False,
+                 incremental=False, aoi=None, aoi_buffer='', demand_years=None, memo_store=''):
+        # Years of Interest
+        self.in_YoI = list(in_YoI) if in_YoI else list(range(1943, 2042))
+        # Years actually computed & the years each computed year stands for (see ret.planner)
+        self.change_years = change_years
+        self.run_years = list(self.in_YoI)
+        self.yearAliases = dict([(y, []) for y in self.in_YoI])
+        self.out_workspace = out_workspace
+        self.in_workspace = in_workspace
+        # Keyword(s) & Disposition(s) for Keyword(s)
+        self.keywords = keywords if keywords else ['Tank']
+        self.dispositions = dispositions if dispositions else ['Barrier']
+        self.scenarios = scenarios if scenarios else []
+        # Recharge cube, Recharge Lookup sensitivity, snapping and sliver options
+        self.cube_cellsize = cube_cellsize
+        self.cube_extent = cube_extent
+        self.alt_lookups = alt_lookups if alt_lookups else []
+        self.alt_summary = alt_summary
+        self.snap_resolution = snap_resolution
+        self.sliver_area = sliver_area
+        # Tiled runs: (nx, ny) tiles, overlap in map units and number of tile processes
+        self.tiles = tiles
+        self.tile_overlap = tile_overlap
+        self.tile_workers = tile_workers
+        self.tile = None
+        # Polygon x year attribute cube
+        self.attribute_cube = attribute_cube
+        self.attributeCubeInfo = None
+        # Site inverted index & per-site x year recharge table
+        self.site_index = site_index
+        self.siteIndexInfo = None
+        # Monte Carlo realizations from the lognormal sigma table mc_lookup (see ret.montecarlo)
+        self.mc_lookup = mc_lookup
+        self.mc_realizations = mc_realizations if mc_lookup else 0
+        self.mc_ensemble = mc_ensemble
+        self.mc_workers = mc_workers
+        self.mc_seed = mc_seed
+        self.mcInfo = None
+        # Temporal aggregation windows ("name=first-last;..." or "N", see ret.aggregates)
+        self.aggregate_windows = aggregate_windows
+        self.aggregateInfo = None
+        # Stage timing & critical path report (see ret.stages)
+        self.stage_csv = None
+        # Scratch lifecycle of the year geodatabases (see ret.scratch)
+        self.keep_intermediates = keep_intermediates
+        self.scratchInfo = None
+        self.scratch_csv = None
+        # Only recompute the years affected by Disposition table edits (see ret.incremental)
+        self.incremental = incremental
+        # Model domain the inputs are restricted to, with a buffer distance (see ret.prefilter)
+        self.aoi = aoi
+        self.aoi_buffer = aoi_buffer
+        # Only the requested years & the years they depend on, memoized in memo_store (see ret.memo)
+        self.demand_years = list(demand_years) if demand_years else None
+        self.memo_store = memo_store
+        self.memoInfo = None
+        # Table path -> lookup table compiled for all processes of the run (see ret.lookupstore)
+        self.lookupStore = None
+        # Disposition snapshot & carried-over state of every year are saved for incremental runs (see ret.incremental)
+        self.saveRunState = False
+        # Lower-case disposition -> first SurfCond/CoverType of the DispositionLookup, read once per run
+        self.dispositionDict = None
+        # Disposition -> condition of the Disposition table for the bggenexs & bggensit sites, read once per run
+        self.siteDispositionDict = None
+        self.cubeInfo = None
+        self.sensitivity_csv = None
+        self.sliver_csv = None
+        self.SetInputs(in_workspace)
+        self.start = datetime.now()
+
+        # State carried over from year to year
+        self.naip_activity_dict = None
+        self.ehsit_brmp_dict = None
+        self.bggenexs_brmp_dict = None
+        self.bggensit_brmp_dict = None
+        self.prev_year_ehsit = {}
+        self.prev_year_bggenexs = {}
+        self.prev_year_bggensit = {}
+        self.scenario_ehsit = None
+
+        # State of the year being calculated
+        self.qry_year = None
+        self.modelYear = None
+        self.yearString = None
+        self.out_gdb = None
+
+    def SetInputs(self, in_workspace):
+        #Features
+        self.SoilFeatures = os.path.join(in_workspace, 'Soils') # Soil Features
+        self.brmp_input = os.path.join(in_workspace, 'BRMP') # BRMP Cover Type
+        self.aac_1943_input = os.path.join(in_workspace, 'AAC1943') # AAC 1943 Cover Type
+        self.naip_2011_input = os.path.join(in_workspace, 'NAIP2011') # 2011 NAIP
+        self.cvp_input = os.path.join(in_workspace, 'CVP') # Cleanup Verification Package
+        self.ehsit_input = os.path.join(in_workspace, 'ehsit') # Environmental Hazardous Waste Site
+        self.bggenexs_input = os.path.join(in_workspace, 'bggenexs') # Existing Buildings
+        self.bggensit_input = os.path.join(in_workspace, 'bggensit') # Existing SItes
+        #Tables
+        self.disposition_input = os.path.join(in_workspace, 'Disposition') # Disposition Table
+        self.lookup_input = os.path.join(in_workspace, 'DispositionLookup') # Disposition Lookup Table
+        self.RechargeLookup = os.path.join(in_workspace, 'RechargeLookup') # Recharge Lookup Table
+
+    def FeatureInputs(self):
+        return [self.SoilFeatures, self.brmp_input, self.aac_1943_input, self.naip_2011_input, self.cvp_input,
+                self.ehsit_input, self.bggenexs_input, self.bggensit_input]
+
+    def SetFeatureInputs(self, featureClasses):
+        self.SoilFeatures, self.brmp_input, self.aac_1943_input, self.naip_2011_input, self.cvp_input, \
+            self.ehsit_input, self.bggenexs_input, self.bggensit_input = featureClasses
+
+    def BeginYear(self, qry_year):
+        self.qry_year = qry_year
+        self.disposition_lookup = self.lookup_input
+
+        # Output geodatabase of the year
+        self.out_name = str(qry_year) + ".gdb"
+        self.out_gdb = os.path.join(self.out_workspace, self.out_name)
+
+        # Set valid feature variables
+        self.brmpIsValid = False
+        self.naip2011IsValid = False
+        self.aac1943IsValid = False
+        self.aac1943IsFallow = False
+        self.cvpIsValid = False
+        # Waste sites and facilities should always be calculated
+        self.ehsitIsValid = True
+        self.facilitiesIsValid = True
+
+        # Check for valid years for data
+        qry_yearNum = int(qry_year)
+        if qry_yearNum >= 1880:
+            self.brmpIsValid = True
+
+        if qry_yearNum >= 1880 and qry_yearNum <= 1943:
+            self.aac1943IsValid = True
+
+        if qry_yearNum > 1943: # and  qry_yearNum <= 2050: #GLT - STOMP runs past 2050
+            self.naip2011IsValid = True
+            self.aac1943IsFallow = True
+
+        if qry_yearNum >= 1998:
+            self.cvpIsValid = True
+
+        self.modelYear = qry_yearNum
+        self.yearString = str(qry_yearNum)
+        self.validClasses = []
+        self.coverDict = {}
+        self.surfCondDict = {}
+
+        # Features built for the year
+        self.brmp_temp = None
+        self.aac_1943_temp = None
+        self.naip_2011_temp = None
+        self.cvp_temp = None
+        self.bggenexs_temp = None
+        self.bggensit_temp = None
+        self.ehsit_temp = None
+
+    def Log(self, message):
+        print(str(datetime.now() - self.start) + "- " + message)
+
+
+class SiteSelectionContext(object):
+    """State of a SiteSelection run"""
+
+    def __init__(self, AoI, simyear, simduration, source_gdb, in_workspace, out_workspace, m_name=None, workers=1,
+                 domain_field=None):
+        self.AoI = AoI
+        # Field of the AoI feature class holding the nickname of every model domain (see ret.domains)
+        self.domain_field = domain_field
+        self.simyear = simyear
+        self.simduration = simduration
+        self.simend = simyear + simduration
+        self.source_gdb = source_gdb
+        self.in_workspace = in_workspace
+        self.out_workspace = out_workspace
+        if not m_name:
+            m_name = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.m_name = m_name
+        self.workers = workers
+        self.out_name = str(m_name) + ".gdb"
+        self.out_gdb = os.path.join(out_workspace, self.out_name)
+        self.start = datetime.now()
+
+        # Relevant features to intersect with AoI
+        self.cvp_input = os.path.join(source_gdb, 'CVP')
+        self.ehsit_input = os.path.join(source_gdb, 'ehsit')
+        self.bggenexs_input = os.path.join(source_gdb, 'bggenexs')
+        self.bggensit_input = os.path.join(source_gdb, 'bggensit')
+        self.naip_2011_input = os.path.join(source_gdb, 'NAIP2011')
+        # Disposition dates of the sites, for the years of interest
+        self.disposition_input = os.path.join(source_gdb, 'Disposition')
+
+        # Filled by the workflow steps
+        self.SiteID_AoI = []
+        # (Lineage source, Site_ID) of the selected sites, as keyed in the RET site index
+        self.SiteKeys_AoI = []
+        self.YoI_AoI_Final = []
+        # Attribute cube of the RET outputs, if RET wrote one
+        self.cube = None
+
+    def Log(self, message):
+        print(str(datetime.now() - self.start) + "- " + message)
@@ -0,0 +1,130 @@
+'''----------------------------------------------------------------------------------
+ Source Name: cube.py
+ Description: Memory-mapped year x rows x cols recharge cube (raw float32 band-sequential with an ENVI header,
+              readable by np.memmap and GDAL).
+----------------------------------------------------------------------------------'''
+
+import os
+import math
+import numpy as np
+from ret._arcpy import arcpy
+from ret.common import GeometrySignature
+
+
+def WriteCubeHeader(cube_path, years, nrows, ncols, cellsize, extent, spatial_reference, nodata=-9999):
+    # ENVI header for the raw band-sequential float32 cube so GDAL can read it as a multi-band raster
+    header = ['ENVI',
+              'description = {RET recharge estimates (mm/yr), one band per year}',
+              'samples = {0}'.format(ncols),
+              'lines = {0}'.format(nrows),
+              'bands = {0}'.format(len(years)),
+              'header offset = 0',
+              'file type = ENVI Standard',
+              'data type = 4',
+              'interleave = bsq',
+              'byte order = 0',
+              'map info = {{Arbitrary, 1, 1, {0}, {1}, {2}, {2}, 0, North}}'.format(extent[0], extent[3], cellsize),
+              'coordinate system string = {{{0}}}'.format(spatial_reference),
+              'band names = {{{0}}}'.format(', '.join([str(y) for y in years])),
+              'data ignore value = {0}'.format(nodata)]
+    with open(os.path.splitext(cube_path)[0] + '.hdr', 'w') as f:
+        f.write('\n'.join(header) + '\n')
+
+def ReadCubeHeader(cube_path):
+    header = {}
+    with open(os.path.splitext(cube_path)[0] + '.hdr') as f:
+        for line in f:
+            if '=' in line:
+                key, value = line.split('=', 1)
+                header[key.strip()] = value.strip()
+    mapInfo = [x.strip() for x in header['map info'].strip('{}').split(',')]
+    return {'years': [int(y) for y in header['band names'].strip('{}').split(',')],
+            'nrows': int(header['lines']),
+            'ncols': int(header['samples']),
+            'xmin': float(mapInfo[3]),
+            'ymax': float(mapInfo[4]),
+            'cellsize': float(mapInfo[5]),
+            'nodata': float(header['data ignore value'])}
+
+def CreateRechargeCube(ctx, cube_dir, years, cellsize, extent):
+    # Fishnet of cube cells, and the memory-mapped year x rows x cols cube initialized to nodata
+    if extent is None:
+        soilExtent = arcpy.Describe(ctx.SoilFeatures).extent
+        extent = [soilExtent.XMin, soilExtent.YMin, soilExtent.XMax, soilExtent.YMax]
+    ncols = int(math.ceil((extent[2] - extent[0]) / cellsize))
+    nrows = int(math.ceil((extent[3] - extent[1]) / cellsize))
+    extent = [extent[0], extent[3] - nrows * cellsize, extent[0] + ncols * cellsize, extent[3]]
+
+    if not arcpy.Exists(cube_dir):
+        arcpy.CreateFileGDB_management(os.path.dirname(cube_dir), os.path.basename(cube_dir))
+    spatialReference = arcpy.Describe(ctx.SoilFeatures).spatialReference
+    fishnet = os.path.join(cube_dir, 'CubeFishnet')
+    arcpy.CreateFishnet_management(fishnet, '{0} {1}'.format(extent[0], extent[1]),
+                                   '{0} {1}'.format(extent[0], extent[1] + cellsize),
+                                   cellsize, cellsize, nrows, ncols, '#', 'NO_LABELS', '#', 'POLYGON')
+    arcpy.DefineProjection_management(fishnet, spatialReference)
+
+    # Flat cell index (row-major from the upper left) for every fishnet polygon
+    arr = arcpy.da.FeatureClassToNumPyArray(fishnet, ['OID@', 'SHAPE@XY'])
+    cols = np.floor((arr['SHAPE@XY'][:, 0] - extent[0]) / cellsize).astype(np.int64)
+    rows = np.floor((extent[3] - arr['SHAPE@XY'][:, 1]) / cellsize).astype(np.int64)
+    cellIndex = np.zeros(arr['OID@'].max() + 1, dtype=np.int64)
+    cellIndex[arr['OID@']] = rows * ncols + cols
+
+    cube_path = os.path.join(os.path.dirname(cube_dir), 'RechargeCube.bsq')
+    cube = np.memmap(cube_path, dtype=np.float32, mode='w+', shape=(len(years), nrows, ncols))
+    cube[:] = -9999
+    cube.flush()
+    WriteCubeHeader(cube_path, years, nrows, ncols, cellsize, extent, spatialReference.exportToString())
+    return {'path': cube_path, 'cube': cube, 'fishnet': fishnet, 'cellIndex': cellIndex,
+            'nrows': nrows, 'ncols': ncols, 'weights': {}}
+
+def CubeCoverageWeights(cubeInfo, RechargeFeatures):
+    # Polygon-to-cell coverage areas. Only computed when the polygon set differs from one already seen, so years
+    # sharing geometry reuse the same weights
+    signature = GeometrySignature(RechargeFeatures)
+    if signature not in cubeInfo['weights']:
+        rechargeName = arcpy.Describe(RechargeFeatures).name
+        coverage = arcpy.Intersect_analysis([cubeInfo['fishnet'], RechargeFeatures],
+                                            os.path.join(os.path.dirname(cubeInfo['fishnet']), 'CubeCoverage'),
+                                            'ONLY_FID')
+        arr = arcpy.da.FeatureClassToNumPyArray(coverage, ['FID_CubeFishnet', 'FID_' + rechargeName, 'SHAPE@AREA'])
+        cubeInfo['weights'][signature] = (cubeInfo['cellIndex'][arr['FID_CubeFishnet']],
+                                          arr['FID_' + rechargeName].astype(np.int64),
+                                          arr['SHAPE@AREA'].astype(np.float64))
+        arcpy.Delete_management(coverage)
+    return cubeInfo['weights'][signature]
+
+def WriteRechargeCubeYear(cubeInfo, RechargeFeatures, band, nodata=-9999):
+    cells, oids, areas = CubeCoverageWeights(cubeInfo, RechargeFeatures)
+    arr = arcpy.da.FeatureClassToNumPyArray(RechargeFeatures, ['OID@', 'RechargeRate'],
+                                            null_value={'RechargeRate': nodata})
+    rateByOid = np.zeros(arr['OID@'].max() + 1, dtype=np.float64) + nodata
+    rateByOid[arr['OID@']] = arr['RechargeRate']
+    rates = rateByOid[oids]
+
+    # Area-weighted mean of the polygons covering each cell, ignoring polygons without a recharge rate
+    valid = rates != nodata
+    ncells = cubeInfo['nrows'] * cubeInfo['ncols']
+    weightedSum = np.bincount(cells[valid], weights=rates[valid] * areas[valid], minlength=ncells)
+    coveredArea = np.bincount(cells[valid], weights=areas[valid], minlength=ncells)
+    values = np.zeros(ncells, dtype=np.float64) + nodata
+    covered = coveredArea > 0
+    values[covered] = weightedSum[covered] / coveredArea[covered]
+    cubeInfo['cube'][band] = values.reshape(cubeInfo['nrows'], cubeInfo['ncols']).astype(np.float32)
+    cubeInfo['cube'].flush()
+
+def SliceRechargeCube(cube_path, extent, years=None):
+    """Memory-mapped view of the cube clipped to a model domain extent (xmin, ymin, xmax, ymax)"""
+    header = ReadCubeHeader(cube_path)
+    cube = np.memmap(cube_path, dtype=np.float32, mode='r',
+                     shape=(len(header['years']), header['nrows'], header['ncols']))
+    col0 = max(int(math.floor((extent[0] - header['xmin']) / header['cellsize'])), 0)
+    col1 = min(int(math.ceil((extent[2] - header['xmin']) / header['cellsize'])), header['ncols'])
+    row0 = max(int(math.floor((header['ymax'] - extent[3]) / header['cellsize'])), 0)
+    row1 = min(int(math.ceil((header['ymax'] - extent[1]) / header['cellsize'])), header['nrows'])
+    if years is None:
+        bands = slice(None)
+    else:
+        bands = [header['years'].index(int(y)) for y in years]
+    return cube[bands, row0:row1, col0:col1]
@@ -0,0 +1,141 @@
+'''----------------------------------------------------------------------------------
+ Source Name: domains.py
+ Description: SiteSelection for several model domains in one pass. The domains ("nickname=feature class;..." or a
+              feature class with the nickname of every domain in a field) are merged into one Domains feature class.
+              Every year of interest of any domain is read once and intersected with all domains at once, and each
+              domain's clipped year is an attribute selection of the shared overlay. Per domain the outputs are
+              those of a SiteSelection run with the nickname as model name (<nickname>.gdb and CSVs); the shared
+              Domains feature class and overlays are kept in the batch geodatabase.
+----------------------------------------------------------------------------------'''
+
+import os
+import re
+from ret._arcpy import arcpy
+from ret.context import SiteSelectionContext
+from ret.siteselection import PrepareSelection, SelectSites, YearsOfInterest, WriteYearMap, WriteSummaries, \
+    WriteSiteSummaries, CubeYearValues, SetCubeAttributes
+from ret.attributecube import CubeGroupAt
+
+domainField = 'Domain_Name'
+
+
+def DomainNickname(name):
+    # Nicknames name the output geodatabase of the domain
+    return re.sub(r'\W', '_', str(name).strip())
+
+def ParseDomains(AoI, domain_field=None):
+    """Nickname, feature class and where clause of every model domain"""
+    if domain_field:
+        field = arcpy.ListFields(AoI, domain_field)[0]
+        names = set()
+        with arcpy.da.SearchCursor(AoI, [domain_field]) as rows:
+            for row in rows:
+                names.add(row[0])
+        delimited = arcpy.AddFieldDelimiters(AoI, domain_field)
+        quote = "'" if field.type == 'String' else ''
+        return [(DomainNickname(name), AoI, u"{0} = {1}{2}{1}".format(delimited, quote, name))
+                for name in sorted(names)]
+    domains = []
+    for item in [x.strip() for x in AoI.split(';') if x.strip() != '']:
+        if '=' in item:
+            name, featureClass = item.split('=', 1)
+        else:
+            name, featureClass = os.path.splitext(os.path.basename(item))[0], item
+        domains.append((DomainNickname(name), featureClass.strip().strip("'"), None))
+    return domains
+
+def BuildDomains(domains, batch_gdb):
+    # One (multipart) polygon per domain, in the spatial reference of the first domain
+    spatialReference = arcpy.Describe(domains[0][1]).spatialReference
+    domains_fc = os.path.join(batch_gdb, 'Domains')
+    arcpy.CreateFeatureclass_management(batch_gdb, 'Domains', 'POLYGON', spatial_reference=spatialReference)
+    arcpy.AddField_management(domains_fc, domainField, 'TEXT', field_length=64)
+    with arcpy.da.InsertCursor(domains_fc, ['SHAPE@', domainField]) as cursor:
+        for name, featureClass, where in domains:
+            shape = None
+            with arcpy.da.SearchCursor(featureClass, ['SHAPE@'], where, spatialReference) as rows:
+                for row in rows:
+                    shape = row[0] if shape is None else shape.union(row[0])
+            cursor.insertRow([shape, name])
+    return domains_fc
+
+def DomainContexts(ctx, domains, domains_fc):
+    """SiteSelection context of every domain, with its domain polygon as AoI"""
+    contexts = []
+    for name, featureClass, where in domains:
+        domainCtx = SiteSelectionContext(os.path.join(ctx.out_gdb, 'AoI_' + name), ctx.simyear, ctx.simduration,
+                                         ctx.source_gdb, ctx.in_workspace, ctx.out_workspace, name)
+        arcpy.Select_analysis(domains_fc, domainCtx.AoI, "{0} = '{1}'".format(domainField, name))
+        contexts.append(domainCtx)
+    return contexts
+
+def OverlayFieldMappings(overlay, source):
+    # Fields of the overlay that a Clip of the source would have written
+    sourceNames = set([f.name.lower() for f in arcpy.ListFields(source)])
+    fieldMappings = arcpy.FieldMappings()
+    fieldMappings.addTable(overlay)
+    for field in arcpy.ListFields(overlay):
+        if field.name.lower() not in sourceNames:
+            index = fieldMappings.findFieldMapIndex(field.name)
+            if index >= 0:
+                fieldMappings.removeFieldMap(index)
+    return fieldMappings
+
+def OverlayYear(batch_gdb, source, domains_fc, y):
+    overlay = os.path.join(batch_gdb, 'Overlay_' + y)
+    arcpy.Intersect_analysis([source, domains_fc], overlay)
+    return overlay, OverlayFieldMappings(overlay, source)
+
+def ClipDomainYears(ctx, contexts, domains_fc):
+    """Clips every year of interest of any domain once for all domains"""
+    years = sorted(set([y for domainCtx in contexts for y in domainCtx.YoI_AoI_Final]), key=int)
+    cube = contexts[0].cube
+    overlays = {}
+    for y in years:
+        selected = [domainCtx for domainCtx in contexts if y in domainCtx.YoI_AoI_Final]
+        arcpy.AddMessage('Evaluating year: {0} ({1} domains)'.format(y, len(selected)))
+        if cube is not None:
+            # Cube polygon sets are shared by many years, so their overlays are kept until the end
+            source = CubeGroupAt(cube, int(y))['features']
+            if source not in overlays:
+                overlays[source] = OverlayYear(ctx.out_gdb, source, domains_fc, y)
+            overlay, fieldMappings = overlays[source]
+            rows = arcpy.da.FeatureClassToNumPyArray(overlay, ['CubeRow'])['CubeRow']
+            values = CubeYearValues(cube, y, rows)
+        else:
+            source = os.path.join(ctx.in_workspace, y + '.gdb', 'RechargeEstimates_' + y)
+            overlay, fieldMappings = OverlayYear(ctx.out_gdb, source, domains_fc, y)
+
+        for domainCtx in selected:
+            arcpy.FeatureClassToFeatureClass_conversion(overlay, domainCtx.out_gdb, 'Recharge_' + y,
+                                                        "{0} = '{1}'".format(domainField, domainCtx.m_name),
+                                                        fieldMappings)
+            if cube is not None:
+                SetCubeAttributes(os.path.join(domainCtx.out_gdb, 'Recharge_' + y), values)
+        if cube is None:
+            arcpy.Delete_management(overlay)
+    for overlay, fieldMappings in overlays.values():
+        arcpy.Delete_management(overlay)
+    return years
+
+def RunDomains(ctx):
+    """SiteSelection of every model domain of ctx.AoI. The batch geodatabase is ctx.out_gdb"""
+    PrepareSelection(ctx)
+    domains = ParseDomains(ctx.AoI, ctx.domain_field)
+    arcpy.AddMessage('Model domains: {0}'.format(', '.join([d[0] for d in domains])))
+    domains_fc = BuildDomains(domains, ctx.out_gdb)
+
+    contexts = DomainContexts(ctx, domains, domains_fc)
+    for domainCtx in contexts:
+        arcpy.AddMessage('Selecting sites of model domain: {0}'.format(domainCtx.m_name))
+        PrepareSelection(domainCtx)
+        SelectSites(domainCtx)
+        YearsOfInterest(domainCtx)
+        WriteYearMap(domainCtx)
+
+    years = ClipDomainYears(ctx, contexts, domains_fc)
+    arcpy.AddMessage('{0} years read for {1} model domains'.format(len(years), len(contexts)))
+    for domainCtx in contexts:
+        WriteSummaries(domainCtx)
+        WriteSiteSummaries(domainCtx)
+    return contexts
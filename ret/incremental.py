@@ -0,0 +1,150 @@
+'''----------------------------------------------------------------------------------
+ Source Name: incremental.py
+ Description: Incremental reruns after edits of the Disposition table. Every run that is neither tiled nor
+              demand-driven records the Disposition table (DispositionSnapshot.csv) and the state carried over from
+              year to year at the start of every computed year (RunState/<year>.pickle). An incremental run diffs the Disposition table
+              against the snapshot: sites that were added, removed or changed only affect the years from their
+              earliest event (old or new dates) on, so the run restarts from the saved state of the last computed
+              year before it and rewrites only the later year geodatabases. Whole-run products (cubes, site index,
+              aggregates, Monte Carlo and sensitivity tables) need every year and are not written by an incremental
+              run.
+----------------------------------------------------------------------------------'''
+
+import os
+import csv
+import pickle
+from ret._arcpy import arcpy
+from ret.common import OpenCsv, CsvText
+from ret.planner import DateYear, dispositionDateFields
+
+carriedState = ['naip_activity_dict', 'ehsit_brmp_dict', 'bggenexs_brmp_dict', 'bggensit_brmp_dict',
+                'prev_year_ehsit', 'prev_year_bggenexs', 'prev_year_bggensit', 'scenario_ehsit']
+
+
+def RowText(value):
+    # Values are compared as the text they are written to the snapshot with
+    if value is None:
+        return ''
+    return CsvText(value) if hasattr(value, 'encode') else str(value)
+
+def ReadDispositionRows(disposition_input):
+    """Field names and Site_ID -> sorted rows (as text) of the Disposition table"""
+    fields = [f.name for f in arcpy.ListFields(disposition_input) if f.type not in ('OID', 'Geometry')]
+    rows = {}
+    with arcpy.da.SearchCursor(disposition_input, fields) as cursor:
+        for row in cursor:
+            row = tuple([RowText(x) for x in row])
+            rows.setdefault(row[fields.index('Site_ID')], []).append(row)
+    for site in rows:
+        rows[site].sort()
+    return fields, rows
+
+def WriteDispositionSnapshot(ctx):
+    fields, rows = ReadDispositionRows(ctx.disposition_input)
+    with OpenCsv(os.path.join(ctx.out_workspace, 'DispositionSnapshot.csv'), 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for site in sorted(rows):
+            writer.writerows(rows[site])
+
+def ReadDispositionSnapshot(out_workspace):
+    snapshot_csv = os.path.join(out_workspace, 'DispositionSnapshot.csv')
+    if not os.path.exists(snapshot_csv):
+        return None, None
+    rows = {}
+    with OpenCsv(snapshot_csv, 'r') as f:
+        reader = csv.reader(f)
+        fields = next(reader)
+        for row in reader:
+            rows.setdefault(row[fields.index('Site_ID')], []).append(tuple(row))
+    return fields, rows
+
+def ChangedSites(oldRows, newRows):
+    """Site_ID -> ADDED, REMOVED or CHANGED"""
+    changes = {}
+    for site in set(oldRows) | set(newRows):
+        if site not in oldRows:
+            changes[site] = 'ADDED'
+        elif site not in newRows:
+            changes[site] = 'REMOVED'
+        elif sorted(oldRows[site]) != sorted(newRows[site]):
+            changes[site] = 'CHANGED'
+    return changes
+
+def SiteEventYears(fields, rows, sites):
+    # Disposition years (and the years after) of the sites, as in ret.planner.DispositionYears
+    years = set()
+    dateColumns = [fields.index(f) for f in dispositionDateFields if f in fields]
+    for site in sites:
+        for row in rows.get(site, []):
+            for column in dateColumns:
+                year = DateYear(row[column])
+                if year is not None:
+                    years.update([year, year + 1])
+    return years
+
+def StatePath(out_workspace, year):
+    return os.path.join(out_workspace, 'RunState', '{0}.pickle'.format(year))
+
+def SaveRunState(ctx):
+    """Saves the carried-over state at the start of the year being calculated"""
+    state_dir = os.path.dirname(StatePath(ctx.out_workspace, ctx.qry_year))
+    if not os.path.exists(state_dir):
+        os.makedirs(state_dir)
+    with open(StatePath(ctx.out_workspace, ctx.qry_year), 'wb') as f:
+        pickle.dump(dict([(name, getattr(ctx, name)) for name in carriedState]), f, 2)
+
+def LoadRunState(ctx, year):
+    with open(StatePath(ctx.out_workspace, year), 'rb') as f:
+        state = pickle.load(f)
+    for name in carriedState:
+        setattr(ctx, name, state[name])
+
+def PlanIncremental(ctx):
+    """Restricts ctx.run_years to the years affected by the Disposition edits & restores the carried state. Returns
+    the changed sites, or None when a full run is needed"""
+    oldFields, oldRows = ReadDispositionSnapshot(ctx.out_workspace)
+    if oldRows is None:
+        ctx.Log("No Disposition snapshot of a previous run, running all years")
+        return None
+    newFields, newRows = ReadDispositionRows(ctx.disposition_input)
+    if oldFields != newFields:
+        ctx.Log("Disposition table fields changed, running all years")
+        return None
+
+    changes = ChangedSites(oldRows, newRows)
+    with OpenCsv(os.path.join(ctx.out_workspace, 'DispositionChanges.csv'), 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Site_ID', 'Change'])
+        for site in sorted(changes):
+            writer.writerow([site, changes[site]])
+
+    # Years before the first old or new event of a changed site are unchanged. The run restarts at the last
+    # computed year on or before it whose starting state was saved
+    if not changes:
+        ctx.run_years = []
+        ctx.Log("Disposition table unchanged, no years to recompute")
+        return changes
+    events = SiteEventYears(oldFields, oldRows, changes) | SiteEventYears(newFields, newRows, changes)
+    first = min(events) if events else ctx.run_years[0]
+    starts = [y for y in ctx.run_years if y <= first and os.path.exists(StatePath(ctx.out_workspace, y))]
+    if not starts:
+        ctx.Log("No saved run state before {0}, running all years".format(first))
+        return None
+    start = max(starts)
+    if start != ctx.run_years[0]:
+        LoadRunState(ctx, start)
+        # NAIP activity is derived from the disposition dates. From 1989 on a full run has it and uses NAIP2011
+        # as is, so it is only rebuilt for restarts before 1989
+        if start < 1989:
+            ctx.naip_activity_dict = None
+
+    # Year geodatabases of years that are no longer computed would shadow their catalog entry
+    for year in ctx.in_YoI:
+        database = os.path.join(ctx.out_workspace, '{0}.gdb'.format(year))
+        if year >= start and year not in ctx.run_years and arcpy.Exists(database):
+            arcpy.Delete_management(database)
+    ctx.run_years = [y for y in ctx.run_years if y >= start]
+    ctx.Log("Disposition Changes: {0} sites, recomputing {1} years from {2}".format(len(changes),
+                                                                                   len(ctx.run_years), start))
+    return changes
@@ -0,0 +1,162 @@
+'''----------------------------------------------------------------------------------
+ Source Name: lookupstore.py
+ Description: Read-only lookup tables shared by the processes of a run. The DispositionLookup and Disposition
+              tables and the Recharge Lookup tables (run, sensitivity and Monte Carlo) are compiled once per run into
+              flat structured arrays (Lookups/<table>.npy): text fields as fixed-width unicode with a null flag,
+              numbers as float64 with NaN for null. Every process (tile and Monte Carlo workers included) attaches the
+              arrays memory-mapped once, so their pages are shared through the file cache instead of every worker and
+              year opening the tables with cursors. Lookups read the values from the mapped arrays (see
+              StoredMapping); only the key -> row index is built by each process.
+----------------------------------------------------------------------------------'''
+
+import os
+import numpy as np
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+from ret._arcpy import arcpy
+
+textTypes = ('String',)
+integerTypes = ('Integer', 'SmallInteger')
+floatTypes = ('Double', 'Single')
+# Arrays attached by this process & the key -> row indexes built over them
+attached = {}
+indexes = {}
+
+
+def CompileTable(table, out_npy):
+    """Writes the text and numeric fields of a table as a structured array"""
+    fields = [f for f in arcpy.ListFields(table) if f.type in textTypes + integerTypes + floatTypes]
+    names = [f.name for f in fields]
+    with arcpy.da.SearchCursor(table, names) as cursor:
+        rows = [row for row in cursor]
+
+    # Text and integer fields carry a null flag, floats are NaN when null
+    dtype = []
+    for index, field in enumerate(fields):
+        if field.type in textTypes:
+            width = max([len(row[index]) for row in rows if row[index] is not None] + [1])
+            dtype += [(field.name, np.unicode_, width), (field.name + '_null', np.bool_)]
+        elif field.type in integerTypes:
+            dtype += [(field.name, np.int64), (field.name + '_null', np.bool_)]
+        else:
+            dtype.append((field.name, np.float64))
+    arr = np.zeros(len(rows), dtype=dtype)
+    for index, field in enumerate(fields):
+        values = [row[index] for row in rows]
+        if field.type in textTypes:
+            arr[field.name] = [u'' if v is None else v for v in values]
+        elif field.type in integerTypes:
+            arr[field.name] = [0 if v is None else v for v in values]
+        else:
+            arr[field.name] = [np.nan if v is None else v for v in values]
+        if field.name + '_null' in arr.dtype.names:
+            arr[field.name + '_null'] = [v is None for v in values]
+    np.save(out_npy, arr)
+    return out_npy
+
+def PublishLookups(ctx):
+    """Compiles the lookup tables of the run. Returns table path -> compiled array path"""
+    # Arrays of a previous run would keep the files mapped
+    attached.clear()
+    indexes.clear()
+    lookup_dir = os.path.join(ctx.out_workspace, 'Lookups')
+    if not os.path.exists(lookup_dir):
+        os.makedirs(lookup_dir)
+    tables = [ctx.lookup_input, ctx.disposition_input, ctx.RechargeLookup] + list(ctx.alt_lookups)
+    if ctx.mc_lookup:
+        tables.append(ctx.mc_lookup)
+    store = {}
+    for index, table in enumerate(tables):
+        if table in store:
+            continue
+        name = '{0}_{1}.npy'.format(index, os.path.splitext(os.path.basename(table))[0])
+        store[table] = CompileTable(table, os.path.join(lookup_dir, name))
+    return store
+
+def AttachArray(npy):
+    """Memory-mapped read-only array, attached once per process"""
+    if npy not in attached:
+        attached[npy] = np.load(npy, mmap_mode='r')
+    return attached[npy]
+
+class StoredMapping(Mapping):
+    """Read-only mapping over a compiled table. A key is the value of the key fields (a tuple for several fields,
+    followed by the column name if columns are given); the value is read from the memory-mapped array on access:
+    a field, {name: field} of fields, or the value of the column. Only the key -> row index is held by the process,
+    built once per table and key. Exact keys match like the cursor loops (the last row wins), lower-cased keys like
+    the disposition lookup (the first row wins, null keys skipped)"""
+
+    def __init__(self, npy, keyFields, fields=None, columns=None, lower=False):
+        self.npy = npy
+        self.keyFields = list(keyFields)
+        self.fields = fields
+        self.columns = list(columns) if columns else None
+        self.lower = lower
+        self.arr = AttachArray(npy)
+        indexKey = (npy, tuple(self.keyFields), lower)
+        if indexKey not in indexes:
+            indexes[indexKey] = KeyIndex(self.arr, self.keyFields, lower)
+        self.index = indexes[indexKey]
+
+    def __getstate__(self):
+        # Workers attach the array again instead of receiving a copy
+        return (self.npy, self.keyFields, self.fields, self.columns, self.lower)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def Field(self, row, field):
+        value = self.arr[field][row]
+        if field + '_null' in self.arr.dtype.names:
+            return None if self.arr[field + '_null'][row] else value.item()
+        return None if np.isnan(value) else value.item()
+
+    def __getitem__(self, key):
+        if self.columns:
+            if key[-1] not in self.columns:
+                raise KeyError(key)
+            rowKey = key[0] if len(key) == 2 else tuple(key[:-1])
+            return self.Field(self.index[rowKey], key[-1])
+        row = self.index[key]
+        if isinstance(self.fields, dict):
+            return dict([(name, self.Field(row, field)) for name, field in self.fields.items()])
+        return self.Field(row, self.fields)
+
+    def __iter__(self):
+        for key in self.index:
+            if self.columns:
+                rowKey = key if isinstance(key, tuple) else (key,)
+                for column in self.columns:
+                    yield rowKey + (column,)
+            else:
+                yield key
+
+    def __len__(self):
+        return len(self.index) * (len(self.columns) if self.columns else 1)
+
+def KeyIndex(arr, keyFields, lower=False):
+    # Key -> row index of a compiled table
+    columns = []
+    for field in keyFields:
+        if field + '_null' in arr.dtype.names:
+            columns.append([None if null else value
+                            for value, null in zip(arr[field].tolist(), arr[field + '_null'].tolist())])
+        else:
+            columns.append([None if np.isnan(value) else value for value in arr[field].tolist()])
+    index = {}
+    for row, key in enumerate(zip(*columns)):
+        key = key[0] if len(keyFields) == 1 else key
+        if lower:
+            if key is None or key.lower() in index:
+                continue
+            key = key.lower()
+        index[key] = row
+    return index
+
+def StoredLookup(lookupStore, table, keyFields, fields=None, columns=None, lower=False):
+    """StoredMapping of a compiled table, or None if the table is not compiled"""
+    if not lookupStore or table not in lookupStore:
+        return None
+    return StoredMapping(lookupStore[table], keyFields, fields, columns, lower)
@@ -0,0 +1,108 @@
+'''----------------------------------------------------------------------------------
+ Source Name: memo.py
+ Description: Demand-driven runs. Only the requested years (demand_years) are produced, each from the minimal chain
+              of computed years it depends on: the state carried over from year to year is restored from the
+              latest memoized year on or before the first missing request, and the chain only runs up to the last
+              missing request. Every computed year geodatabase and the state at its start are memoized in a local
+              store under the fingerprint of the inputs (geometry and attributes of the feature inputs, the
+              Disposition and lookup tables and the run options that change the estimates) and the year, so later
+              requests for the same or earlier years are copied from the store. Whole-run products need every year
+              and are not written by a demand-driven run.
+----------------------------------------------------------------------------------'''
+
+import os
+import json
+import pickle
+import shutil
+import hashlib
+from ret._arcpy import arcpy
+from ret.common import GeometrySignature
+from ret.incremental import carriedState
+
+
+def TableDigest(table, signature):
+    # Attributes of every row, in cursor order
+    fields = [f.name for f in arcpy.ListFields(table) if f.type not in ('OID', 'Geometry', 'Blob', 'Raster')]
+    with arcpy.da.SearchCursor(table, fields) as cursor:
+        for row in cursor:
+            signature.update(u'\t'.join([u'{0}'.format(x) for x in row]).encode('utf-8') + b'\n')
+
+def InputFingerprint(ctx):
+    """Fingerprint of everything the estimates of a year depend on"""
+    signature = hashlib.md5()
+    scenarios = [[s['name'], s['keywords'], s['dispositions']] for s in ctx.scenarios]
+    # The first year of interest sets the initial conditions of the builders
+    options = [ctx.keywords, ctx.dispositions, scenarios, ctx.snap_resolution, ctx.sliver_area, ctx.change_years,
+               ctx.in_YoI[0], ctx.aoi, ctx.aoi_buffer, ctx.alt_lookups]
+    signature.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    for featureClass in ctx.FeatureInputs():
+        signature.update(GeometrySignature(featureClass).encode('ascii'))
+        TableDigest(featureClass, signature)
+    for table in [ctx.disposition_input, ctx.lookup_input, ctx.RechargeLookup] + list(ctx.alt_lookups):
+        TableDigest(table, signature)
+    return signature.hexdigest()
+
+def MemoPath(store, year, extension):
+    return os.path.join(store, '{0}{1}'.format(year, extension))
+
+def GoverningYear(ctx, year):
+    # Computed year a year of interest is (or is an alias of)
+    for run_year in ctx.run_years:
+        if run_year == year or year in ctx.yearAliases.get(run_year, []):
+            return run_year
+    return None
+
+def PlanDemand(ctx):
+    """Copies the memoized requested years & restricts ctx.run_years to the chain the others need. Returns the store
+    directory of the inputs"""
+    store = os.path.join(ctx.memo_store or os.path.join(ctx.out_workspace, 'MemoStore'), InputFingerprint(ctx))
+    if not os.path.exists(store):
+        os.makedirs(store)
+    ctx.memoInfo = {'dir': store}
+
+    unknown = [y for y in ctx.demand_years if GoverningYear(ctx, y) is None]
+    if unknown:
+        ctx.Log("Not Years of Interest: {0}".format(unknown))
+    missing = []
+    for year in sorted(set([GoverningYear(ctx, y) for y in ctx.demand_years if y not in unknown])):
+        if arcpy.Exists(MemoPath(store, year, '.gdb')):
+            arcpy.Copy_management(MemoPath(store, year, '.gdb'),
+                                  os.path.join(ctx.out_workspace, '{0}.gdb'.format(year)))
+            ctx.Log("Year Served from Memo Store: {0}".format(year))
+        else:
+            missing.append(year)
+    if not missing:
+        ctx.run_years = []
+        return store
+
+    # The chain starts at the last computed year on or before the first missing year whose starting state is known
+    starts = [y for y in ctx.run_years if y <= missing[0] and os.path.exists(MemoPath(store, y, '.state'))]
+    start = max(starts) if starts else ctx.run_years[0]
+    if starts:
+        with open(MemoPath(store, start, '.state'), 'rb') as f:
+            state = pickle.load(f)
+        for name in carriedState:
+            setattr(ctx, name, state[name])
+    ctx.run_years = [y for y in ctx.run_years if start <= y <= missing[-1]]
+    ctx.Log("Demand: {0} years missing, computing {1} years from {2}".format(len(missing), len(ctx.run_years), start))
+    return store
+
+def MemoState(ctx):
+    """Memoizes the carried-over state at the start of the year being calculated"""
+    path = MemoPath(ctx.memoInfo['dir'], ctx.qry_year, '.state')
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(dict([(name, getattr(ctx, name)) for name in carriedState]), f, 2)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(path + '.tmp', path)
+
+def MemoYear(ctx):
+    """Memoizes the exported year geodatabase"""
+    path = MemoPath(ctx.memoInfo['dir'], ctx.qry_year, '.gdb')
+    # Copied under a temporary name, so an interrupted copy is never served
+    partial = MemoPath(ctx.memoInfo['dir'], ctx.qry_year, '_partial.gdb')
+    arcpy.Copy_management(ctx.out_gdb, partial)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(partial, path)
+    return path
@@ -0,0 +1,185 @@
+'''----------------------------------------------------------------------------------
+ Source Name: montecarlo.py
+ Description: Monte Carlo recharge realizations. The uncertainty table has the layout of the Recharge Lookup table
+              (Cover_Type, SurfCond and one column per soil) and holds the lognormal sigma of every entry; the
+              median is the Recharge Lookup rate. A realization is one draw of the whole lookup table, so polygons
+              and years sharing an entry share its sampled rate. Per year the polygon x realization rates are
+              gathered from the sampled table in chunks of polygons (optionally by worker processes of a separate
+              "python -m ret montecarlo" process), which keeps memory bounded for any number of realizations.
+
+              RechargeRate_P05/P50/P95   per-polygon percentiles added to RechargeEstimates_<year>
+              MonteCarloSummary.csv      per year: deterministic, mean and percentiles of the area-weighted mean
+                                         and volumetric recharge over the realizations
+              MonteCarlo/Ensemble_<year>.npy   optional polygons x realizations float32 rates (OID order)
+----------------------------------------------------------------------------------'''
+
+import os
+import csv
+import pickle
+import subprocess
+import multiprocessing
+import numpy as np
+from ret._arcpy import arcpy
+from ret.common import OpenCsv
+from ret.recharge import ReadRateDict
+from ret.lookupstore import AttachArray
+from ret.clipworkers import PythonExecutable
+
+mcPercentiles = [5, 50, 95]
+mcSummaryFields = ['Year', 'Statistic', 'Deterministic', 'Mean'] + ['P{0:02d}'.format(p) for p in mcPercentiles]
+# Polygon x realization cells evaluated at once (float64, i.e. 128 MB)
+mcChunkCells = 2 ** 24
+
+
+def SampleLookup(lookup_input, uncertainty_input, realizations, seed=0, nodata=-9999, lookupStore=None):
+    """Keys of the Recharge Lookup table and an entries x realizations array of sampled rates"""
+    rateDict = ReadRateDict(lookup_input, lookupStore)
+    sigmaDict = ReadRateDict(uncertainty_input, lookupStore)
+    keys = sorted(rateDict)
+    rates = np.array([nodata if rateDict[key] is None else float(rateDict[key]) for key in keys], dtype=np.float64)
+    sigma = np.array([float(sigmaDict[key]) if sigmaDict.get(key) is not None else 0.0 for key in keys],
+                     dtype=np.float64)
+
+    normal = np.random.RandomState(seed).standard_normal((len(keys), realizations))
+    sampled = rates[:, np.newaxis] * np.exp(sigma[:, np.newaxis] * normal)
+    sampled[rates == nodata, :] = nodata
+    return keys, sampled
+
+def CreateMonteCarlo(ctx):
+    mcInfo = {'dir': os.path.join(ctx.out_workspace, 'MonteCarlo'),
+              'summary': os.path.join(ctx.out_workspace, 'MonteCarloSummary.csv')}
+    mcInfo['keys'], mcInfo['sampled'] = SampleLookup(ctx.RechargeLookup, ctx.mc_lookup, ctx.mc_realizations,
+                                                     ctx.mc_seed, lookupStore=ctx.lookupStore)
+    # Workers attach the sampled table memory-mapped instead of receiving a copy with every chunk
+    mcInfo['sampledPath'] = os.path.join(ctx.out_workspace, 'Lookups', 'MonteCarloSampled.npy')
+    if not os.path.exists(os.path.dirname(mcInfo['sampledPath'])):
+        os.makedirs(os.path.dirname(mcInfo['sampledPath']))
+    np.save(mcInfo['sampledPath'], mcInfo['sampled'])
+    mcInfo['keyIndex'] = dict([(key, index) for index, key in enumerate(mcInfo['keys'])])
+    if ctx.mc_ensemble and not os.path.exists(mcInfo['dir']):
+        os.makedirs(mcInfo['dir'])
+    with OpenCsv(mcInfo['summary'], 'w') as f:
+        csv.writer(f).writerow(mcSummaryFields)
+    return mcInfo
+
+def RealizationChunk(args):
+    # Percentiles and area-weighted sums over the realizations of a chunk of polygons
+    sampled, entries, area, ensemble, first, nodata = args
+    sampled = AttachArray(sampled)
+    valid = entries >= 0
+    rates = np.zeros((len(entries), sampled.shape[1]), dtype=np.float64) + nodata
+    rates[valid] = sampled[entries[valid]]
+    valid &= rates[:, 0] != nodata
+
+    percentiles = np.zeros((len(entries), len(mcPercentiles)), dtype=np.float64) + nodata
+    if valid.any():
+        percentiles[valid] = np.array(np.percentile(rates[valid], mcPercentiles, axis=1)).T
+    weighted = np.dot(area[valid], rates[valid])
+    if ensemble:
+        out = np.load(ensemble, mmap_mode='r+')
+        out[first:first + len(entries)] = rates
+        del out
+    return percentiles, weighted, area[valid].sum()
+
+def RealizationChunksParallel(spec, workers):
+    """Evaluates the pickled chunks of a spec with a pool of worker processes & pickles the results next to it"""
+    multiprocessing.set_executable(PythonExecutable())
+    with open(spec, 'rb') as f:
+        tasks = pickle.load(f)
+    pool = multiprocessing.Pool(workers)
+    try:
+        results = pool.map(RealizationChunk, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    with open(spec + '.out', 'wb') as f:
+        pickle.dump(results, f, 2)
+
+def RunRealizationWorkers(tasks, workers, spec):
+    """Runs RealizationChunksParallel in a separate interpreter so worker processes only import the ret package"""
+    package_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    with open(spec, 'wb') as f:
+        pickle.dump(tasks, f, 2)
+    try:
+        subprocess.check_call([PythonExecutable(), '-m', 'ret', 'montecarlo', spec, '--workers', str(workers)],
+                              cwd=package_dir)
+        with open(spec + '.out', 'rb') as f:
+            return pickle.load(f)
+    finally:
+        for path in [spec, spec + '.out']:
+            if os.path.exists(path):
+                os.remove(path)
+
+def Build_MonteCarloRecharge(ctx, RechargeFeatures, nodata=-9999):
+    """Realizations of the year's recharge. Adds the percentile fields and returns the summary rows"""
+    mcInfo = ctx.mcInfo
+    sampled = mcInfo['sampled']
+    arr = arcpy.da.FeatureClassToNumPyArray(RechargeFeatures,
+                                            ['OID@', 'SHAPE@AREA', 'CoverType', 'SurfCond', 'TEXT_SYM',
+                                             'RechargeRate'],
+                                            null_value={'CoverType': '', 'SurfCond': '', 'TEXT_SYM': '',
+                                                        'RechargeRate': nodata})
+    area = arr['SHAPE@AREA'].astype(np.float64)
+
+    # Lookup entry of every polygon, looked up once per distinct key
+    keyStrings = np.char.add(np.char.add(np.char.add(np.char.add(arr['CoverType'].astype(np.unicode_), u'\t'),
+                                                     arr['SurfCond'].astype(np.unicode_)), u'\t'),
+                             arr['TEXT_SYM'].astype(np.unicode_))
+    uniqueKeys, inverse = np.unique(keyStrings, return_inverse=True)
+    keyEntries = np.array([mcInfo['keyIndex'].get(tuple(key.split(u'\t')), -1) for key in uniqueKeys.tolist()],
+                          dtype=np.int64)
+    entries = keyEntries[inverse] if len(arr) else np.zeros(0, dtype=np.int64)
+
+    ensemble = None
+    if ctx.mc_ensemble:
+        ensemble = os.path.join(mcInfo['dir'], 'Ensemble_{0}.npy'.format(ctx.yearString))
+        np.lib.format.open_memmap(ensemble, mode='w+', dtype=np.float32, shape=(len(arr), sampled.shape[1]))
+
+    chunk = max(1, mcChunkCells // sampled.shape[1])
+    tasks = [(mcInfo['sampledPath'], entries[first:first + chunk], area[first:first + chunk], ensemble, first, nodata)
+             for first in range(0, len(arr), chunk)]
+    if ctx.mc_workers > 1 and len(tasks) > 1:
+        results = RunRealizationWorkers(tasks, min(ctx.mc_workers, len(tasks)),
+                                        os.path.join(ctx.out_workspace, 'montecarlo.pickle'))
+    else:
+        results = [RealizationChunk(task) for task in tasks]
+
+    percentiles = np.zeros((0, len(mcPercentiles)), dtype=np.float64)
+    weighted = np.zeros(sampled.shape[1], dtype=np.float64)
+    validArea = 0.0
+    if results:
+        percentiles = np.vstack([r[0] for r in results])
+        weighted = np.sum([r[1] for r in results], axis=0)
+        validArea = sum([r[2] for r in results])
+
+    rateFields = ['RechargeRate_P{0:02d}'.format(p) for p in mcPercentiles]
+    extension = np.zeros(len(arr), dtype=[('ExtendOID', np.int32)] + [(f, np.float64) for f in rateFields])
+    extension['ExtendOID'] = arr['OID@']
+    for column, field in enumerate(rateFields):
+        extension[field] = percentiles[:, column]
+    arcpy.da.ExtendTable(RechargeFeatures, arcpy.Describe(RechargeFeatures).OIDFieldName, extension, 'ExtendOID')
+
+    # Deterministic and per-realization area-weighted mean (mm/yr) and volumetric recharge
+    rate = arr['RechargeRate'].astype(np.float64)
+    valid = rate != nodata
+    deterministicArea = area[valid].sum()
+    deterministic = {'Mean_RechargeRate': (rate[valid] * area[valid]).sum() / deterministicArea
+                                          if deterministicArea > 0 else nodata,
+                     'Volumetric_Recharge': (rate[valid] / 1000.0 * area[valid]).sum()}
+    realized = {'Mean_RechargeRate': weighted / validArea if validArea > 0 else np.zeros(len(weighted)) + nodata,
+                'Volumetric_Recharge': weighted / 1000.0}
+    rows = []
+    for statistic in ['Mean_RechargeRate', 'Volumetric_Recharge']:
+        values = realized[statistic]
+        rows.append([statistic, deterministic[statistic], values.mean()] +
+                    np.array(np.percentile(values, mcPercentiles)).tolist())
+    return rows
+
+def WriteMonteCarloYear(ctx, RechargeFeatures):
+    """Adds the year's realizations to the outputs. Alias years of the year get a copy of its summary rows"""
+    rows = Build_MonteCarloRecharge(ctx, RechargeFeatures)
+    with OpenCsv(ctx.mcInfo['summary'], 'a') as f:
+        writer = csv.writer(f)
+        for year in [ctx.qry_year] + ctx.yearAliases.get(ctx.qry_year, []):
+            for row in rows:
+                writer.writerow([year] + row)
@@ -0,0 +1,158 @@
+'''----------------------------------------------------------------------------------
+ Source Name: overlay.py
+ Description: Overlay helpers: the Bootleg_Update replacement for Update_analysis, input snapping and sliver
+              suppression.
+----------------------------------------------------------------------------------'''
+
+import os
+import csv
+from ret._arcpy import arcpy
+from ret.common import FeatureCount, OpenCsv
+
+
+def Bootleg_Update(input_layer, update_layer, output_feature_class, update_fields):
+    interim_features = os.path.dirname(output_feature_class) + "\\" + "interim_features"
+
+    # Union the input layer and update layer
+    UnionFeatures = arcpy.Union_analysis(in_features=[input_layer, update_layer], out_feature_class=interim_features,
+                        join_attributes='ALL',
+                        cluster_tolerance='#',
+                        gaps='GAPS')
+
+    # Create in memory layer for input layer
+    input_layer_result = arcpy.MakeFeatureLayer_management(input_layer, 'input_layer')
+    input_layer_object = input_layer_result.getOutput(0)
+    input_layer_path = input_layer_object.dataSource
+    input_fc_name = os.path.basename(input_layer_path)
+
+    # Create in memory layer for update layer
+    update_layer_result = arcpy.MakeFeatureLayer_management(update_layer, 'update_layer')
+    update_layer_object = update_layer_result.getOutput(0)
+    update_layer_path = update_layer_object.dataSource
+    update_fc_name = os.path.basename(update_layer_path)
+
+    # Create in memory layer for union layer
+    UnionLayer = "union_layer"
+    arcpy.MakeFeatureLayer_management(UnionFeatures, UnionLayer)
+
+    # Select all features that are not from the update feature
+    arcpy.SelectLayerByAttribute_management(UnionLayer,"NEW_SELECTION", ''' "FID_{0}" <> -1 '''.format(update_fc_name))
+
+    # Set update fields with overlapping feature values
+    for field in update_fields:
+        arcpy.CalculateField_management(UnionLayer, field, '!'+field+'_1!', "PYTHON_9.3")
+
+    # Select all features that are from the update feature
+    arcpy.SelectLayerByAttribute_management(UnionLayer,"NEW_SELECTION", ''' "FID_{0}" = -1 '''.format(update_fc_name))
+
+    # Assign the Update FID with the negative of Input FID
+    arcpy.CalculateField_management(UnionLayer, 'FID_{0}'.format(update_fc_name), '!FID_{0}! * -1'.format(input_fc_name), "PYTHON_9.3")
+
+    #Clear Selection
+    arcpy.SelectLayerByAttribute_management(UnionLayer,"CLEAR_SELECTION")
+
+    # Dissolve the union feature class by update layer fid,
+    # and summarize the update fields by their first record
+    stat_fields = [[f, 'FIRST'] for f in update_fields]
+    output_dissolved_features = arcpy.Dissolve_management(in_features=UnionFeatures, out_feature_class=output_feature_class,
+                             dissolve_field='FID_{0}'.format(update_fc_name),
+                             statistics_fields=stat_fields,
+                             multi_part='MULTI_PART',
+                             unsplit_lines='DISSOLVE_LINES')
+
+    arcpy.Delete_management(interim_features)
+
+    # Because of the dissolve step, the output feature class has
+    # the update fields listed as 'FIRST_[field]'. Here we
+    # add the update field names back into the output feature class,
+    # and set them equal to the FIRST_[field]. Then the
+    # FIRST_fields are deleted
+    for field in update_fields:
+        arcpy.AddField_management(output_feature_class, field, 'TEXT')
+        arcpy.CalculateField_management(output_feature_class, field, '!FIRST_{0}!'.format(field), "PYTHON_9.3")
+        arcpy.DeleteField_management(output_feature_class, 'FIRST_{0}'.format(field))
+
+    arcpy.DeleteField_management(output_feature_class, 'FID_{0}'.format(update_fc_name))
+    return output_dissolved_features
+
+def ReportSlivers(ctx, step, before, after):
+    ctx.Log("{0}: {1} features removed ({2} -> {3})".format(step, before - after, before, after))
+    with OpenCsv(ctx.sliver_csv, 'a') as f:
+        csv.writer(f).writerow([ctx.qry_year if ctx.qry_year is not None else '', step, before, after,
+                                before - after])
+
+def SnapInputs(ctx, snap_gdb, featureClasses, resolution):
+    # Copies the input features into a geodatabase with a common XY resolution, which snaps every vertex to the same
+    # precision grid. Feature class names are kept so the FID_<name> fields of the overlays do not change
+    value, unit = resolution.split()
+    if not arcpy.Exists(snap_gdb):
+        arcpy.CreateFileGDB_management(os.path.dirname(snap_gdb), os.path.basename(snap_gdb))
+
+    snapped = []
+    for featureClass in featureClasses:
+        name = os.path.basename(featureClass)
+        snapped_fc = os.path.join(snap_gdb, name)
+        # The resolution is only set for the copies, later geoprocessing keeps the environment of the run
+        previous = (arcpy.env.XYResolution, arcpy.env.XYTolerance)
+        arcpy.env.XYResolution = resolution
+        arcpy.env.XYTolerance = '{0} {1}'.format(2 * float(value), unit)
+        try:
+            arcpy.CopyFeatures_management(featureClass, snapped_fc)
+        finally:
+            arcpy.env.XYResolution, arcpy.env.XYTolerance = previous
+        # Features collapsed by the snapping are removed
+        before = FeatureCount(snapped_fc)
+        arcpy.RepairGeometry_management(snapped_fc, 'DELETE_NULL')
+        ReportSlivers(ctx, 'Snap ' + name, before, FeatureCount(snapped_fc))
+        snapped.append(snapped_fc)
+    return snapped
+
+def SuppressSlivers(ctx, featureClass, threshold, step):
+    # Merges polygons smaller than the threshold into the neighbor they share the longest edge with (as Eliminate
+    # with LENGTH does). The merged polygon keeps the attributes of that neighbor
+    featureClass = str(featureClass)
+    oidField = arcpy.Describe(featureClass).OIDFieldName
+    before = FeatureCount(featureClass)
+    areas = dict(arcpy.da.FeatureClassToNumPyArray(featureClass, ['OID@', 'SHAPE@AREA']).tolist())
+    slivers = set([oid for oid in areas if areas[oid] < threshold])
+    if not slivers:
+        ReportSlivers(ctx, step, before, before)
+        return featureClass
+
+    # Longest shared edge for every sliver
+    neighbors = arcpy.PolygonNeighbors_analysis(featureClass, featureClass + '_nbr', oidField, 'NO_AREA_OVERLAP',
+                                                'BOTH_SIDES')
+    srcField = 'src_' + oidField
+    nbrField = 'nbr_' + oidField
+    target = {}
+    with arcpy.da.SearchCursor(neighbors, [srcField, nbrField, 'LENGTH']) as rows:
+        for row in rows:
+            if row[0] in slivers and row[2] > 0 and (row[0] not in target or row[2] > target[row[0]][1]):
+                target[row[0]] = (row[1], row[2])
+    arcpy.Delete_management(neighbors)
+
+    # Follow chains of adjacent slivers to the polygon that is kept
+    mergeTo = {}
+    for oid in target:
+        merged = oid
+        visited = set()
+        while merged in target and merged not in visited:
+            visited.add(merged)
+            merged = target[merged][0]
+        mergeTo[oid] = merged
+
+    arcpy.AddField_management(featureClass, 'MergeID', 'LONG')
+    with arcpy.da.UpdateCursor(featureClass, ['OID@', 'MergeID']) as rows:
+        for row in rows:
+            row[1] = mergeTo.get(row[0], row[0])
+            rows.updateRow(row)
+
+    fields = [f.name for f in arcpy.ListFields(featureClass)
+              if f.type not in ('OID', 'Geometry') and f.name not in ('MergeID', 'Shape_Length', 'Shape_Area')]
+    dissolved = arcpy.Dissolve_management(featureClass, featureClass + '_dslv', 'MergeID', '#', 'MULTI_PART')
+    arcpy.JoinField_management(dissolved, 'MergeID', featureClass, oidField, fields)
+    arcpy.DeleteField_management(dissolved, 'MergeID')
+    arcpy.Delete_management(featureClass)
+    arcpy.Rename_management(dissolved, featureClass)
+    ReportSlivers(ctx, step, before, FeatureCount(featureClass))
+    return featureClass
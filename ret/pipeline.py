@@ -0,0 +1,301 @@
+'''----------------------------------------------------------------------------------
+ Source Name: pipeline.py
+ Description: The RET workflow: run preparation, the per-year stages (build features, update chain, recharge and
+              exports) and the loop over the years of interest. Each stage takes the run context, so a stage can be
+              called on its own for a given year.
+----------------------------------------------------------------------------------'''
+
+import os
+import csv
+from ret._arcpy import arcpy
+from ret.common import OpenCsv
+from ret.builders import setLookupDicts
+from ret.stages import YearStages, RunStages, stageFields
+from ret.prefilter import PrefilterInputs
+from ret.lookupstore import PublishLookups
+from ret.memo import PlanDemand, MemoState, MemoYear
+from ret.incremental import PlanIncremental, SaveRunState, WriteDispositionSnapshot
+from ret.scratch import BeginScratch, TrackScratch, ReleaseScratch, FinishScratch, scratchFields
+from ret.overlay import Bootleg_Update, SnapInputs, SuppressSlivers
+from ret.recharge import ReadRateDict, Build_RechargeFeatures, Build_ScenarioRecharge, Build_SensitivityRecharge, \
+    SensitivityDeltas
+from ret.cube import CreateRechargeCube, WriteRechargeCubeYear
+from ret.tiling import RunTiled
+from ret.planner import PlanYears
+from ret.attributecube import CreateAttributeCube, AppendAttributeCubeYear, CloseAttributeCube
+from ret.siteindex import CreateSiteIndex, AppendSiteIndexYear
+from ret.montecarlo import CreateMonteCarlo, WriteMonteCarloYear
+from ret.aggregates import CreateAggregates, AppendAggregateYear, FinishAggregates
+
+
+def PrepareRun(ctx):
+    #Allow for overwriting of outputs
+    arcpy.env.overwriteOutput = True
+
+    # Create Output Directory if doesn't exist
+    if not os.path.exists(ctx.out_workspace):
+        os.makedirs(ctx.out_workspace)
+
+    # Only compute the years at which surface conditions change
+    if ctx.change_years:
+        PlanYears(ctx)
+
+    # Only recompute the years affected by edits of the Disposition table since the previous run
+    if ctx.tiles and (ctx.incremental or ctx.demand_years):
+        ctx.incremental = False
+        ctx.demand_years = None
+        ctx.Log("Incremental & demand-driven runs are not tiled, running all years")
+    if ctx.incremental and ctx.demand_years:
+        ctx.incremental = False
+        ctx.Log("Demand-driven run, the memo store replaces the incremental run state")
+    if ctx.incremental:
+        if PlanIncremental(ctx) is not None:
+            DisableRunProducts(ctx)
+    # Every run computing the years in one process leaves the state a later incremental run starts from
+    ctx.saveRunState = not ctx.tiles and not ctx.demand_years
+
+    # Restrict the inputs to the model domain before any overlay
+    if ctx.aoi:
+        PrefilterInputs(ctx)
+        ctx.Log("Inputs Restricted to " + ctx.aoi)
+
+    # Snap all input features to a common precision grid & start the sliver report
+    if ctx.snap_resolution or ctx.sliver_area:
+        ctx.sliver_csv = os.path.join(ctx.out_workspace, 'SliverReport.csv')
+        with OpenCsv(ctx.sliver_csv, 'w') as f:
+            csv.writer(f).writerow(['Year', 'Step', 'Features_Before', 'Features_After', 'Features_Removed'])
+    if ctx.snap_resolution:
+        ctx.SetFeatureInputs(SnapInputs(ctx, os.path.join(ctx.out_workspace, 'SnappedInputs.gdb'),
+                                        ctx.FeatureInputs(), ctx.snap_resolution))
+        ctx.Log("Inputs Snapped to " + ctx.snap_resolution)
+
+    # Only compute the requested years & the chain of years they depend on
+    if ctx.demand_years:
+        PlanDemand(ctx)
+        DisableRunProducts(ctx)
+
+    # Compile the lookup tables once for every process & year of the run
+    ctx.lookupStore = PublishLookups(ctx)
+
+    # Start the scratch deletion & year geodatabase size report
+    ctx.scratch_csv = os.path.join(ctx.out_workspace, 'ScratchReport.csv')
+    with OpenCsv(ctx.scratch_csv, 'w') as f:
+        csv.writer(f).writerow(scratchFields)
+
+    # Start the stage timing & critical path report
+    ctx.stage_csv = os.path.join(ctx.out_workspace, 'StageReport.csv')
+    with OpenCsv(ctx.stage_csv, 'w') as f:
+        csv.writer(f).writerow(stageFields)
+
+    # Start the Recharge Lookup sensitivity summary
+    if ctx.alt_lookups and ctx.alt_summary:
+        ctx.sensitivity_csv = os.path.join(ctx.out_workspace, 'RechargeSensitivity.csv')
+        with OpenCsv(ctx.sensitivity_csv, 'w') as f:
+            csv.writer(f).writerow(['Year', 'Field', 'Table', 'Mean_RechargeRate', 'Delta_Mean_RechargeRate',
+                                    'Volumetric_Recharge', 'Delta_Volumetric_Recharge'])
+
+    # Create the recharge cube once for all years
+    if ctx.cube_cellsize:
+        ctx.cubeInfo = CreateRechargeCube(ctx, os.path.join(ctx.out_workspace, 'RechargeCube.gdb'), ctx.in_YoI,
+                                          ctx.cube_cellsize, ctx.cube_extent)
+        ctx.Log("Recharge Cube Created")
+
+    # Sample the Recharge Lookup table for the Monte Carlo realizations
+    if ctx.mc_realizations:
+        ctx.mcInfo = CreateMonteCarlo(ctx)
+        ctx.Log("Recharge Lookup Sampled: {0} realizations".format(ctx.mc_realizations))
+
+    # Start the polygon x year attribute cube
+    if ctx.attribute_cube:
+        ctx.attributeCubeInfo = CreateAttributeCube(os.path.join(ctx.out_workspace, 'AttributeCube'))
+
+    # Start the running temporal aggregates
+    if ctx.aggregate_windows:
+        ctx.aggregateInfo = CreateAggregates(ctx)
+
+    # Start the site index & per-site recharge table
+    if ctx.site_index:
+        ctx.siteIndexInfo = CreateSiteIndex(ctx.out_workspace)
+
+def DisableRunProducts(ctx):
+    # Products built from every year cannot be patched by an incremental run
+    disabled = [name for name, enabled in [('recharge cube', ctx.cube_cellsize), ('attribute cube', ctx.attribute_cube),
+                                           ('site index', ctx.site_index), ('aggregates', ctx.aggregate_windows),
+                                           ('Monte Carlo', ctx.mc_realizations), ('sensitivity', ctx.alt_lookups)]
+                if enabled]
+    ctx.cube_cellsize = None
+    ctx.attribute_cube = False
+    ctx.site_index = False
+    ctx.aggregate_windows = ''
+    ctx.mc_realizations = 0
+    ctx.alt_lookups = []
+    if disabled:
+        ctx.Log("Not written by an incremental run: " + ', '.join(disabled))
+
+def BuildYearFeatures(ctx):
+    # Calculate surface condition from disposition via cover type
+    setLookupDicts(ctx, ctx.disposition_lookup)
+    ctx.Log("Disposition Lookup Table Created")
+
+    # Build Features in dependency order (see ret.stages)
+    RunStages(ctx, YearStages(ctx))
+
+    # Update order: BRMP, AAC 1943, NAIP, CVP, facilities, sites, environmental hazardous waste sites
+    if ctx.brmpIsValid:
+        ctx.validClasses.append(ctx.brmp_temp)
+    if ctx.aac1943IsValid or ctx.aac1943IsFallow:
+        ctx.validClasses.append(ctx.aac_1943_temp)
+    if ctx.naip2011IsValid:
+        ctx.validClasses.append(ctx.naip_2011_temp)
+    if ctx.cvpIsValid:
+        ctx.validClasses.append(ctx.cvp_temp)
+    if ctx.facilitiesIsValid:
+        ctx.validClasses.append(ctx.bggenexs_temp)
+        ctx.validClasses.append(ctx.bggensit_temp)
+    if ctx.ehsitIsValid:
+        ctx.validClasses.append(ctx.ehsit_temp)
+    return ctx.validClasses
+
+def UpdateFeatures(ctx):
+    validClasses = ctx.validClasses
+    valid_count = len(validClasses)
+    temp_features = os.path.join(ctx.out_gdb, r'UpdatedFeatures_')
+    UpdatedFeatures = validClasses[0]
+    if valid_count > 1:
+        base_feature = validClasses[0]
+        for x in range(1, valid_count):
+            update_feature = validClasses[x]
+            temp_name = temp_features + str(x)
+            # Requres use of Arc Pro license
+            #UpdatedFeatures = arcpy.Update_analysis(base_feature, update_feature,temp_name) #JBP
+            UpdatedFeatures = Bootleg_Update(base_feature, update_feature, temp_name,
+                                             ['Source', 'CoverType', 'SurfCond', 'Lineage'])
+            if ctx.sliver_area:
+                UpdatedFeatures = SuppressSlivers(ctx, UpdatedFeatures, ctx.sliver_area,
+                                                  'Update ' + arcpy.Describe(update_feature).name)
+            base_feature = temp_name
+
+    updatedFeaturesFinalString = os.path.join(ctx.out_gdb, r'UpdatedFeatures_' + ctx.yearString)
+    FinalUpdatedFeatures = arcpy.CopyFeatures_management(UpdatedFeatures, updatedFeaturesFinalString)
+
+    if valid_count > 1:
+        for x in range(1, valid_count):
+            temp_name = temp_features + str(x)
+            arcpy.Delete_management(temp_name)
+    return FinalUpdatedFeatures
+
+def ExportYear(ctx, recharge, scenarios=True):
+    # Evaluate alternative Recharge Lookup tables on the same polygons
+    if ctx.alt_lookups:
+        area, baseline, rates = Build_SensitivityRecharge(recharge, ctx.alt_lookups, lookupStore=ctx.lookupStore)
+        if ctx.alt_summary:
+            baseMean, baseVolume, deltas = SensitivityDeltas(area, baseline, rates)
+            with OpenCsv(ctx.sensitivity_csv, 'a') as f:
+                writer = csv.writer(f)
+                writer.writerow([ctx.qry_year, 'RechargeRate', ctx.RechargeLookup, baseMean, 0.0, baseVolume, 0.0])
+                for k, delta in enumerate(deltas):
+                    writer.writerow([ctx.qry_year, 'RechargeRate_{0}'.format(k + 1), ctx.alt_lookups[k]] + delta)
+        ctx.Log("Recharge Lookup Sensitivity Created")
+
+    # Monte Carlo realizations of the recharge of every polygon
+    if ctx.mc_realizations:
+        WriteMonteCarloYear(ctx, recharge)
+        ctx.Log("Monte Carlo Realizations Created")
+
+    # Export Keyword/Disposition Scenarios side by side with the run's recharge estimates
+    if ctx.scenarios and scenarios:
+        scenarioRates = ReadRateDict(ctx.RechargeLookup, ctx.lookupStore)
+        for scenario in ctx.scenarios:
+            Build_ScenarioRecharge(ctx, ctx.out_gdb, recharge, scenario, ctx.scenario_ehsit[scenario['name']],
+                                   scenarioRates)
+            ctx.Log("Scenario Created: " + scenario['name'])
+
+    # Export Recharge Cube band
+    if ctx.cube_cellsize:
+        band = ctx.in_YoI.index(ctx.qry_year)
+        WriteRechargeCubeYear(ctx.cubeInfo, recharge, band)
+        # Years that are aliases of this year get a copy of the band
+        for alias in ctx.yearAliases.get(ctx.qry_year, []):
+            ctx.cubeInfo['cube'][ctx.in_YoI.index(alias)] = ctx.cubeInfo['cube'][band]
+        ctx.cubeInfo['cube'].flush()
+        ctx.Log("Recharge Cube Updated")
+
+    # Add the year to the attribute cube (only polygons that changed are stored)
+    if ctx.attribute_cube:
+        changed = AppendAttributeCubeYear(ctx.attributeCubeInfo, ctx.qry_year, recharge)
+        ctx.Log("Attribute Cube Updated: {0} polygons changed".format(changed))
+
+    # Index the polygons owned by every site & add the year (and its alias years) to the per-site table
+    if ctx.site_index:
+        sites = AppendSiteIndexYear(ctx.siteIndexInfo, [ctx.qry_year] + ctx.yearAliases.get(ctx.qry_year, []),
+                                    recharge)
+        ctx.Log("Site Index Updated: {0} sites".format(sites))
+
+    # Add the year (and its alias years) to the running aggregates & write the windows it completes
+    if ctx.aggregate_windows:
+        years = [ctx.qry_year] + ctx.yearAliases.get(ctx.qry_year, [])
+        for aggregate in AppendAggregateYear(ctx.aggregateInfo, years, recharge):
+            ctx.Log("Aggregate Written: " + aggregate)
+
+    # Delete the remaining scratch of the year & compact its geodatabase
+    size = FinishScratch(ctx)
+    if size is not None:
+        ctx.Log("Year Geodatabase Compacted: {0:.1f} MB".format(size))
+
+    # Keep the year for later demand-driven runs on the same inputs
+    if ctx.memoInfo:
+        ctx.Log("Year Memoized: " + MemoYear(ctx))
+
+def ComputeYear(ctx, qry_year):
+    ctx.Log('Year being calculated: ' + str(qry_year))
+    ctx.BeginYear(qry_year)
+
+    # Create new geodatabase
+    arcpy.CreateFileGDB_management(ctx.out_workspace, ctx.out_name)
+    BeginScratch(ctx)
+    if ctx.saveRunState:
+        SaveRunState(ctx)
+    if ctx.memoInfo:
+        MemoState(ctx)
+
+    # Built layers are scratch once the update chain is done, the updated features once the soils are unioned
+    BuildYearFeatures(ctx)
+    TrackScratch(ctx, 'update')
+    FinalUpdatedFeatures = UpdateFeatures(ctx)
+    ReleaseScratch(ctx, 'update')
+    TrackScratch(ctx, 'recharge')
+
+    # Export Recharge Data
+    recharge = Build_RechargeFeatures(ctx, ctx.out_gdb, FinalUpdatedFeatures, ctx.SoilFeatures, ctx.RechargeLookup)
+    #DeleteExcessRechargeFeatures(recharge) #JBP
+    TrackScratch(ctx, 'recharge')
+    ReleaseScratch(ctx, 'recharge')
+    return recharge
+
+def RunYear(ctx, qry_year):
+    recharge = ComputeYear(ctx, qry_year)
+    ExportYear(ctx, recharge)
+
+    ctx.Log(" Done")
+    arcpy.AddMessage("Done!")
+    return recharge
+
+def FinishRun(ctx):
+    # Disposition table the outputs were computed with, for the next incremental run
+    if ctx.saveRunState:
+        WriteDispositionSnapshot(ctx)
+    if ctx.aggregate_windows:
+        for aggregate in FinishAggregates(ctx.aggregateInfo):
+            ctx.Log("Aggregate Written: " + aggregate)
+    if ctx.attribute_cube:
+        CloseAttributeCube(ctx.attributeCubeInfo)
+        ctx.Log("Attribute Cube Written")
+
+def Run(ctx):
+    PrepareRun(ctx)
+    if ctx.tiles:
+        RunTiled(ctx)
+    else:
+        for qry_year in ctx.run_years:
+            RunYear(ctx, qry_year)
+    FinishRun(ctx)
@@ -0,0 +1,119 @@
+'''----------------------------------------------------------------------------------
+ Source Name: planner.py
+ Description: Change-year planning. Surface conditions only change at known events, so only the years of interest at
+              which an event occurs are computed. Every other year is an alias of the previous computed year and is
+              recorded as such in YearCatalog.csv. Events:
+                  disposition dates (Date_Begin, Date_End, Date_Disposition, Disposition_TPA_Date) and the year
+                      after, since sites are in a separate state in the year they begin. NAIP first-disturbance
+                      years come from the same dates
+                  CVP start years plus the 5/10/40 year succession thresholds of CalculateSuccession
+                  layer validity breakpoints (BRMP 1880, AAC 1943, NAIP 1944, NAIP activity 1989, CVP 1998) and the
+                      2042 default of missing TPA dates
+----------------------------------------------------------------------------------'''
+
+import os
+import re
+import csv
+from ret._arcpy import arcpy
+from ret.common import OpenCsv
+
+dispositionDateFields = ['Date_Begin', 'Date_End', 'Date_Disposition', 'Disposition_TPA_Date']
+# Years after a CVP start at which CalculateSuccession changes stage, for every starting condition
+successionOffsets = [5, 10, 30, 35, 40]
+validityBreakpoints = [1880, 1943, 1944, 1989, 1998, 2042]
+
+
+def DateYear(value):
+    # Year of a date field (year number, date or text starting with the year)
+    if value is None:
+        return None
+    if hasattr(value, 'year'):
+        return value.year
+    match = re.match(r'^\s*(\d+)', str(value))
+    if match is None:
+        return None
+    year = int(match.group(1))
+    return year if year > 0 else None
+
+def DispositionYears(disposition_input, site_ids=None):
+    # Only the dispositions of the given Site_IDs, if any
+    fieldNames = [f.name for f in arcpy.ListFields(disposition_input)]
+    fields = [f for f in dispositionDateFields if f in fieldNames]
+    keyFields = []
+    if site_ids is not None:
+        site_ids = set([str(x) for x in site_ids])
+        keyFields = ['Site_ID']
+    years = {}
+    with arcpy.da.SearchCursor(disposition_input, fields + keyFields) as rows:
+        for row in rows:
+            if site_ids is not None and str(row[-1]) not in site_ids:
+                continue
+            for field, value in zip(fields, row):
+                year = DateYear(value)
+                if year is not None:
+                    years.setdefault(year, set()).add(field)
+                    years.setdefault(year + 1, set()).add(field + '+1')
+    return years
+
+def CVPYears(cvp_input, site_ids=None):
+    # Start years as read by Build_CVP from Key_WSRF (98/99 are 1998/1999), only of the given wids_sitec, if any
+    if site_ids is not None:
+        site_ids = set([str(x) for x in site_ids])
+    years = {}
+    with arcpy.da.SearchCursor(cvp_input, ['Key_WSRF', 'wids_sitec']) as rows:
+        for row in rows:
+            if site_ids is not None and str(row[1]) not in site_ids:
+                continue
+            year = DateYear(row[0])
+            if year in (98, 99):
+                year += 1900
+            if year is None or year < 1998:
+                continue
+            years.setdefault(year, set()).add('CVP')
+            for offset in successionOffsets:
+                years.setdefault(year + offset, set()).add('CVP+{0}'.format(offset))
+    return years
+
+def EventYears(disposition_input, cvp_input, site_ids=None, cvp_ids=None):
+    """Year -> events at which surface conditions change, optionally only for some sites"""
+    events = {}
+    for source in [DispositionYears(disposition_input, site_ids), CVPYears(cvp_input, cvp_ids),
+                   dict([(y, set(['Validity'])) for y in validityBreakpoints])]:
+        for year in source:
+            events.setdefault(year, set()).update(source[year])
+    return events
+
+def PlanYears(ctx):
+    """Sets the years to compute (ctx.run_years) & the alias years of every computed year (ctx.yearAliases)"""
+    events = EventYears(ctx.disposition_input, ctx.cvp_input)
+
+    # The first year sets the initial conditions of the carried-over site states, so it is always computed
+    run_years = []
+    aliases = {}
+    catalog = []
+    for year in ctx.in_YoI:
+        if not run_years or year in events:
+            run_years.append(year)
+            aliases[year] = []
+            reason = ' '.join(sorted(events.get(year, set(['First year']))))
+            catalog.append([year, year, 'COMPUTED', reason])
+        else:
+            aliases[run_years[-1]].append(year)
+            catalog.append([year, run_years[-1], 'ALIAS', ''])
+    ctx.run_years = run_years
+    ctx.yearAliases = aliases
+
+    with OpenCsv(os.path.join(ctx.out_workspace, 'YearCatalog.csv'), 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Year', 'Computed_Year', 'Status', 'Events'])
+        writer.writerows(catalog)
+    ctx.Log("Change Years Planned: {0} of {1} years computed".format(len(run_years), len(ctx.in_YoI)))
+    return run_years
+
+def ReadYearCatalog(out_workspace):
+    """Year -> computed year of a planned RET run, or None without a catalog"""
+    catalog_csv = os.path.join(out_workspace, 'YearCatalog.csv')
+    if not os.path.exists(catalog_csv):
+        return None
+    with OpenCsv(catalog_csv, 'r') as f:
+        return dict([(int(row[0]), int(row[1])) for row in list(csv.reader(f))[1:]])
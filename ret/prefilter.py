@@ -0,0 +1,75 @@
+'''----------------------------------------------------------------------------------
+ Source Name: prefilter.py
+ Description: Domain-restricted RET runs. Before any overlay the feature inputs are prefiltered to a window, the AoI
+              buffered by aoi_buffer: the site layers (CVP, ehsit, bggenexs, bggensit) keep the whole features of
+              the sites that intersect it and the area layers (Soils, BRMP, AAC1943, NAIP2011) are clipped to the
+              window plus those site features. Site attributes and the state carried over from year to year (NAIP
+              activity, site x BRMP) are then only built for those sites, from their complete geometries and the
+              complete area layers under them. Feature class names are kept, so the FID_<name> fields of the
+              overlays do not change. The recharge estimates cover the window plus the kept sites.
+----------------------------------------------------------------------------------'''
+
+import os
+import csv
+from ret._arcpy import arcpy
+from ret.common import FeatureCount, OpenCsv
+
+# Inputs clipped to the window; the others are site layers
+areaInputs = ['Soils', 'BRMP', 'AAC1943', 'NAIP2011']
+
+
+def DomainWindow(ctx, domain_gdb):
+    # AoI plus buffer as a single polygon
+    window = os.path.join(domain_gdb, 'DomainWindow')
+    if ctx.aoi_buffer:
+        arcpy.Buffer_analysis(ctx.aoi, window, str(ctx.aoi_buffer), dissolve_option='ALL')
+    else:
+        arcpy.Dissolve_management(ctx.aoi, window)
+    return window
+
+def SelectSiteFeatures(featureClass, window, out_fc):
+    # Whole features intersecting the window
+    lyr = arcpy.MakeFeatureLayer_management(featureClass, os.path.basename(out_fc) + '_lyr')
+    arcpy.SelectLayerByLocation_management(lyr, 'INTERSECT', window)
+    # Geoprocessing on a layer without a selection would use all features
+    if arcpy.Describe(lyr).FIDSet:
+        arcpy.CopyFeatures_management(lyr, out_fc)
+    else:
+        arcpy.CreateFeatureclass_management(os.path.dirname(out_fc), os.path.basename(out_fc), template=featureClass,
+                                            spatial_reference=arcpy.Describe(featureClass).spatialReference)
+    arcpy.Delete_management(lyr)
+    return out_fc
+
+def FilterInputs(featureInputs, window, out_gdb):
+    """Keeps the whole site features intersecting the window, and clips the area layers to the window plus those
+    site features, so every kept site is overlaid with complete area layers. Returns the filtered feature classes"""
+    filtered = dict([(featureClass, os.path.join(out_gdb, os.path.basename(featureClass)))
+                     for featureClass in featureInputs])
+    siteInputs = [fc for fc in featureInputs if os.path.basename(fc) not in areaInputs]
+    for featureClass in siteInputs:
+        SelectSiteFeatures(featureClass, window, filtered[featureClass])
+    merged = arcpy.Merge_management([window] + [filtered[fc] for fc in siteInputs],
+                                    os.path.join(out_gdb, 'SiteWindow_merged'))
+    site_window = arcpy.Dissolve_management(merged, os.path.join(out_gdb, 'SiteWindow')).getOutput(0)
+    arcpy.Delete_management(merged)
+    for featureClass in featureInputs:
+        if os.path.basename(featureClass) in areaInputs:
+            arcpy.Clip_analysis(featureClass, site_window, filtered[featureClass])
+    return [filtered[featureClass] for featureClass in featureInputs]
+
+def PrefilterInputs(ctx):
+    """Restricts the feature inputs to the AoI window (DomainInputs.gdb) & reports the kept features"""
+    domain_gdb = os.path.join(ctx.out_workspace, 'DomainInputs.gdb')
+    if not arcpy.Exists(domain_gdb):
+        arcpy.CreateFileGDB_management(ctx.out_workspace, 'DomainInputs.gdb')
+    window = DomainWindow(ctx, domain_gdb)
+
+    featureInputs = ctx.FeatureInputs()
+    filtered = FilterInputs(featureInputs, window, domain_gdb)
+    with OpenCsv(os.path.join(ctx.out_workspace, 'DomainReport.csv'), 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Input', 'Features', 'Features_Kept'])
+        for featureClass, out_fc in zip(featureInputs, filtered):
+            writer.writerow([os.path.basename(featureClass), FeatureCount(featureClass), FeatureCount(out_fc)])
+    ctx.SetFeatureInputs(filtered)
+    return window
@@ -0,0 +1,140 @@
+'''----------------------------------------------------------------------------------
+ Source Name: recharge.py
+ Description: Recharge rate assignment: the soil union and rate lookup of each year, keyword/disposition scenarios
+              and Recharge Lookup sensitivity runs.
+----------------------------------------------------------------------------------'''
+
+import os
+import numpy as np
+from ret._arcpy import arcpy
+from ret.overlay import SuppressSlivers
+from ret.lookupstore import StoredLookup
+
+
+def ReadRateDict(lookup_input, lookupStore=None):
+#    rateWorksheet = "SurfCondRecharge$"
+    rateLookupPath = lookup_input #os.path.join(lookup_input, rateWorksheet)   #GLT
+
+    rateFields = ['Cover_Type', 'SurfCond', 'Qy', 'Ri', 'Rp', 'He', 'Kf', 'Ba', 'El', 'Ls', 'Eb', 'Ki', 'Wa', 'Sc', 'P', 'Qu', 'Rv', 'D', 'XX']
+
+    # Read from the table compiled once per run when available (see ret.lookupstore)
+    stored = StoredLookup(lookupStore, lookup_input, rateFields[:2], columns=rateFields[2:])
+    if stored is not None:
+        return stored
+    rateDict = {}
+    rateTable = arcpy.MakeTableView_management(rateLookupPath, 'rateTable')
+    with arcpy.da.SearchCursor(rateTable,rateFields) as rows:
+        for row in rows:
+            cover = row[0]
+            surfaceCondition = row[1]
+            for x in range(2, len(rateFields)):
+                soilType = rateFields[x]
+                rateDict[(cover, surfaceCondition, soilType)] = row[x]
+    arcpy.Delete_management('rateTable')
+    return rateDict
+
+def Build_RechargeFeatures(ctx, interim_dir, UpdatedFeatures, SoilFeatures, lookup_input ):
+
+    Soil_temp = arcpy.CopyFeatures_management(SoilFeatures, os.path.join(interim_dir, 'Soil_temp'))
+    Recharge_path = os.path.join(interim_dir, "RechargeEstimates_" + ctx.yearString)
+    recharge_feats = arcpy.Union_analysis([UpdatedFeatures, Soil_temp], Recharge_path)
+    if ctx.sliver_area:
+        recharge_feats = SuppressSlivers(ctx, recharge_feats, ctx.sliver_area, 'Union Soils')
+
+    rechargeField = "RechargeRate"
+    arcpy.AddField_management(recharge_feats, rechargeField, "DOUBLE" )
+
+    rateDict = ReadRateDict(lookup_input, ctx.lookupStore)
+
+    resultFields = ['CoverType', 'SurfCond', 'TEXT_SYM', rechargeField]
+    with arcpy.da.UpdateCursor(recharge_feats,resultFields) as rows:
+        for row in rows:
+            cover = row[0]
+            surfaceCondition = row[1]
+            soilType = row[2]
+            key = (cover, surfaceCondition, soilType)
+            if key in rateDict:
+                row[3] = float(rateDict[key])
+            else:
+                row[3] = -9999
+            rows.updateRow(row)
+    return recharge_feats
+
+def Build_ScenarioRecharge(ctx, interim_dir, RechargeFeatures, scenario, scenarioConditions, rateDict):
+    # Copies the run's recharge estimates and re-assigns the ehsit polygons with the scenario's conditions. Geometry,
+    # overlays and site status are shared with the run, so only the attributes are recalculated
+    scenario_path = os.path.join(interim_dir, "RechargeEstimates_{0}_{1}".format(ctx.yearString, scenario['name']))
+    scenario_feats = arcpy.CopyFeatures_management(RechargeFeatures, scenario_path)
+
+    resultFields = ['Lineage', 'CoverType', 'SurfCond', 'TEXT_SYM', 'RechargeRate']
+    with arcpy.da.UpdateCursor(scenario_feats, resultFields) as rows:
+        for row in rows:
+            if row[0] is None or not row[0].startswith('ehsit:'):
+                continue
+            id = row[0].split(':', 1)[1]
+            if id not in scenarioConditions:
+                continue
+            row[1] = scenarioConditions[id]['CoverType']
+            row[2] = scenarioConditions[id]['SurfCond']
+            key = (row[1], row[2], row[3])
+            if key in rateDict:
+                row[4] = float(rateDict[key])
+            else:
+                row[4] = -9999
+            rows.updateRow(row)
+    return scenario_feats
+
+def Build_SensitivityRecharge(RechargeFeatures, lookup_tables, nodata=-9999, lookupStore=None):
+    # Recharge rates for alternative lookup tables from the cover type, surface condition and soil already assigned to
+    # each polygon. The rates of every distinct key are looked up once per table, then gathered for all polygons and
+    # tables in one pass and appended as RechargeRate_1..K
+    fields = ['OID@', 'SHAPE@AREA', 'CoverType', 'SurfCond', 'TEXT_SYM', 'RechargeRate']
+    arr = arcpy.da.FeatureClassToNumPyArray(RechargeFeatures, fields,
+                                            null_value={'CoverType': '', 'SurfCond': '', 'TEXT_SYM': '',
+                                                        'RechargeRate': nodata})
+    keyStrings = np.char.add(np.char.add(np.char.add(np.char.add(arr['CoverType'].astype(np.unicode_), u'\t'),
+                                                     arr['SurfCond'].astype(np.unicode_)), u'\t'),
+                             arr['TEXT_SYM'].astype(np.unicode_))
+    uniqueKeys, inverse = np.unique(keyStrings, return_inverse=True)
+    keys = [tuple(key.split(u'\t')) for key in uniqueKeys]
+
+    keyRates = np.zeros((len(keys), len(lookup_tables)), dtype=np.float64) + nodata
+    for column, table in enumerate(lookup_tables):
+        rateDict = ReadRateDict(table, lookupStore)
+        for index, key in enumerate(keys):
+            if key in rateDict and rateDict[key] is not None:
+                keyRates[index, column] = float(rateDict[key])
+    rates = keyRates[inverse]
+
+    rateFields = ['RechargeRate_{0}'.format(k + 1) for k in range(len(lookup_tables))]
+    extension = np.zeros(len(arr), dtype=[('ExtendOID', np.int32)] + [(f, np.float64) for f in rateFields])
+    extension['ExtendOID'] = arr['OID@']
+    for column, field in enumerate(rateFields):
+        extension[field] = rates[:, column]
+    arcpy.da.ExtendTable(RechargeFeatures, arcpy.Describe(RechargeFeatures).OIDFieldName, extension, 'ExtendOID')
+    return arr['SHAPE@AREA'].astype(np.float64), arr['RechargeRate'].astype(np.float64), rates
+
+def SensitivityDeltas(area, baseline, rates, nodata=-9999):
+    # Area-weighted mean and volumetric recharge (rates in mm/yr) of each table, and their deltas to the baseline
+    def summarize(rate):
+        valid = rate != nodata
+        validArea = area[valid].sum()
+        if validArea > 0:
+            mean = (rate[valid] * area[valid]).sum() / validArea
+        else:
+            mean = nodata
+        return mean, (rate[valid] / 1000.0 * area[valid]).sum()
+
+    baseMean, baseVolume = summarize(baseline)
+    deltas = []
+    for column in range(rates.shape[1]):
+        mean, volume = summarize(rates[:, column])
+        deltas.append([mean, mean - baseMean, volume, volume - baseVolume])
+    return baseMean, baseVolume, deltas
+
+def DeleteExcessRechargeFeatures(RechargeFeatures):
+#    finalFields = ['SurfCond', 'CoverType', 'Source', 'TEXT_SYM', 'SOIL_NAME', 'RechargeRate']
+    fieldNames = [x.name for x in arcpy.ListFields(RechargeFeatures)]
+    for name in fieldNames:
+        if name not in fieldNames:
+            arcpy.DeleteField_management(RechargeFeatures, name)
@@ -0,0 +1,158 @@
+'''----------------------------------------------------------------------------------
+ Source Name: recorder.py
+ Description: Records the geoprocessing workload of a run. While recording (RET_RECORD=<file> in the environment or
+              StartRecording) every arcpy and arcpy.mapping function called through ret._arcpy is logged to a JSON
+              lines file: tool, parameters, feature counts of the input and output datasets, duration, the Python
+              time since the previous call and the thread. Classes (cursors, geometries) and attributes are not
+              recorded. The dataset counts are taken outside of the timed call. Worker processes record into
+              <file>.<pid>. See ret.replay for replaying a recording without ArcGIS.
+----------------------------------------------------------------------------------'''
+
+import os
+import json
+import time
+import inspect
+import importlib
+import threading
+
+recordLock = threading.Lock()
+recording = {'path': None, 'seq': 0, 'last': None}
+
+
+def StartRecording(path):
+    """Starts a new recording of the arcpy calls into path"""
+    with recordLock:
+        with open(path, 'w'):
+            pass
+        recording['path'] = path
+        recording['seq'] = 0
+        recording['last'] = time.time()
+    # Worker processes started from here record into <path>.<pid>
+    os.environ['RET_RECORD'] = path
+    os.environ.setdefault('RET_RECORD_PID', str(os.getpid()))
+
+def StopRecording():
+    with recordLock:
+        recording['path'] = None
+
+def IsRecording():
+    return recording['path'] is not None
+
+def ParamValue(value):
+    # JSON value of a parameter: datasets and layers by path, other arcpy objects by type
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if hasattr(value, 'encode'):
+        return value if isinstance(value, type(u'')) else value.decode('utf-8', 'replace')
+    if isinstance(value, (list, tuple)):
+        return [ParamValue(v) for v in value]
+    if hasattr(value, 'getOutput'):
+        return ParamValue(value.getOutput(0))
+    return '<{0}>'.format(type(value).__name__)
+
+def IsTool(name):
+    # Geoprocessing tools are named <Tool>_<toolbox>, e.g. Clip_analysis
+    return '_' in name.split('.')[-1]
+
+def DatasetCount(value):
+    """Feature/row count of a dataset path, or None"""
+    if not hasattr(value, 'encode') or not ('/' in value or '\\' in value or value.startswith('in_memory')):
+        return None
+    arcpy = importlib.import_module('arcpy')
+    try:
+        if not arcpy.Exists(value):
+            return None
+        return int(arcpy.GetCount_management(value).getOutput(0))
+    except Exception:
+        return None
+
+def InputCounts(args, kwargs):
+    counts = {}
+    values = list(enumerate(args)) + list(kwargs.items())
+    for key, value in values:
+        if hasattr(value, 'getOutput'):
+            value = value.getOutput(0)
+        if isinstance(value, (list, tuple)):
+            found = [DatasetCount(v) for v in value]
+            if any([c is not None for c in found]):
+                counts[str(key)] = found
+        else:
+            count = DatasetCount(value)
+            if count is not None:
+                counts[str(key)] = count
+    return counts
+
+def OutputCount(result):
+    if hasattr(result, 'getOutput'):
+        try:
+            return DatasetCount(result.getOutput(0))
+        except Exception:
+            return None
+    if hasattr(result, 'shape') and len(getattr(result, 'shape', ())) > 0:
+        return int(result.shape[0])
+    return None
+
+def WriteRecord(record):
+    with recordLock:
+        if recording['path'] is None:
+            return
+        recording['seq'] += 1
+        record['seq'] = recording['seq']
+        with open(recording['path'], 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+def RecordedFunction(name, function):
+    def call(*args, **kwargs):
+        python = time.time() - recording['last'] if recording['last'] else 0.0
+        inputs = InputCounts(args, kwargs) if IsTool(name) else {}
+        start = time.time()
+        result = None
+        error = None
+        try:
+            result = function(*args, **kwargs)
+            return result
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            seconds = time.time() - start
+            # An existing output dataset (overwritten) is not an input
+            if hasattr(result, 'getOutput'):
+                output = ParamValue(result)
+                values = dict([(str(k), v) for k, v in list(enumerate(args)) + list(kwargs.items())])
+                inputs = dict([(k, c) for k, c in inputs.items() if ParamValue(values[k]) != output])
+            WriteRecord({'call': name, 'args': [ParamValue(a) for a in args],
+                         'kwargs': dict([(k, ParamValue(v)) for k, v in kwargs.items()]),
+                         'inputs': inputs, 'output': OutputCount(result),
+                         'seconds': seconds, 'python_seconds': python, 'error': error,
+                         'thread': threading.current_thread().name})
+            recording['last'] = time.time()
+    return call
+
+class RecordedModule(object):
+    """Module proxy recording the calls of its functions"""
+
+    def __init__(self, name, module):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = module
+
+    def __getattr__(self, attr):
+        return Recorded(self.__dict__['_name'] + '.' + attr, getattr(self.__dict__['_module'], attr))
+
+    def __setattr__(self, attr, value):
+        setattr(self.__dict__['_module'], attr, value)
+
+def Recorded(name, value):
+    """Recording stand-in of a module attribute"""
+    if inspect.ismodule(value):
+        return RecordedModule(name, value)
+    if inspect.isroutine(value):
+        return RecordedFunction(name, value)
+    return value
+
+
+if os.environ.get('RET_RECORD'):
+    if os.environ.get('RET_RECORD_PID', str(os.getpid())) == str(os.getpid()):
+        StartRecording(os.environ['RET_RECORD'])
+    else:
+        StartRecording('{0}.{1}'.format(os.environ['RET_RECORD'], os.getpid()))
@@ -0,0 +1,105 @@
+'''----------------------------------------------------------------------------------
+ Source Name: replay.py
+ Description: Replays a recorded geoprocessing workload (see ret.recorder) without ArcGIS or the real inputs. Every
+              recorded call is re-executed in sequence against a stand-in backend on synthetic features of the
+              recorded input and output counts: overlays (Intersect, Union, Clip, ...) sort and sweep the bounding
+              boxes of all their inputs, copies and conversions copy their records, and calls that only read
+              metadata cost nothing. The replayed seconds per tool are reported next to the recorded ones, so
+              changes of the call sequence or of the dataset sizes it moves can be benchmarked on any machine.
+----------------------------------------------------------------------------------'''
+
+import csv
+import json
+import time
+import numpy as np
+from ret.common import OpenCsv
+
+overlayTools = ['Intersect', 'Union', 'Clip', 'Erase', 'Identity', 'Update', 'SpatialJoin', 'Dissolve', 'Buffer',
+                'Eliminate', 'PolygonNeighbors', 'SelectLayerByLocation', 'RepairGeometry']
+copyTools = ['CopyFeatures', 'FeatureClassToFeatureClass', 'Copy', 'Merge', 'Append', 'Select', 'TableToTable',
+             'FeatureClassToNumPyArray', 'ExtendTable', 'CalculateField', 'MakeFeatureLayer', 'Compact']
+replayFields = ['Tool', 'Calls', 'Recorded_Seconds', 'Replayed_Seconds', 'Input_Features', 'Output_Features']
+# Synthetic features by count
+synthetic = {}
+
+
+def ReadRecording(recording_path):
+    with open(recording_path, 'r') as f:
+        return sorted([json.loads(line) for line in f if line.strip() != ''], key=lambda r: r['seq'])
+
+def ToolName(call):
+    # "arcpy.Clip_analysis" -> "Clip"
+    return call.split('.')[-1].split('_')[0]
+
+def InputFeatures(record):
+    counts = []
+    for value in record['inputs'].values():
+        counts += value if isinstance(value, list) else [value]
+    return [c for c in counts if c is not None]
+
+def SyntheticFeatures(count):
+    """Bounding boxes (xmin, ymin, xmax, ymax) of count synthetic polygons"""
+    if count not in synthetic:
+        corners = np.random.RandomState(count % 4294967296).uniform(0.0, 1000.0, (count, 2))
+        sizes = np.random.RandomState(count % 4294967296 + 1).uniform(0.1, 10.0, (count, 2))
+        synthetic[count] = np.hstack([corners, corners + sizes])
+    return synthetic[count]
+
+def StandInOverlay(inputs, output):
+    # Sweep of all input boxes by xmin, the candidate pairs being those starting before a box ends
+    boxes = np.vstack([SyntheticFeatures(c) for c in inputs] + [np.zeros((0, 4))])
+    order = np.argsort(boxes[:, 0], kind='mergesort')
+    starts = boxes[order, 0]
+    candidates = np.searchsorted(starts, boxes[order, 2]) - np.arange(len(boxes))
+    result = SyntheticFeatures(output)
+    return candidates.sum() + len(result)
+
+def StandInCopy(inputs, output):
+    copies = [SyntheticFeatures(c).copy() for c in inputs]
+    return sum([len(c) for c in copies]) + len(SyntheticFeatures(output).copy())
+
+def StandInCall(record):
+    """Executes a recorded call against the stand-in backend"""
+    tool = ToolName(record['call'])
+    inputs = InputFeatures(record)
+    output = record['output'] or 0
+    if tool in overlayTools:
+        return StandInOverlay(inputs, output)
+    if tool in copyTools:
+        return StandInCopy(inputs or [output], output)
+    return 0
+
+def ReplayRecording(recording_paths, report_csv=None, repeat=1):
+    """Replays recordings (e.g. a run and its workers) one after the other. Returns the per-tool rows of the replay
+    report"""
+    records = []
+    for recording_path in recording_paths:
+        records += ReadRecording(recording_path)
+    tools = {}
+    for record in records:
+        tool = ToolName(record['call'])
+        if tool not in tools:
+            tools[tool] = {'Tool': tool, 'Calls': 0, 'Recorded_Seconds': 0.0, 'Replayed_Seconds': 0.0,
+                           'Input_Features': 0, 'Output_Features': 0}
+        start = time.time()
+        for run in range(repeat):
+            StandInCall(record)
+        stats = tools[tool]
+        stats['Calls'] += 1
+        stats['Recorded_Seconds'] += record['seconds']
+        stats['Replayed_Seconds'] += (time.time() - start) / repeat
+        stats['Input_Features'] += sum(InputFeatures(record))
+        stats['Output_Features'] += record['output'] or 0
+
+    rows = sorted(tools.values(), key=lambda s: -s['Recorded_Seconds'])
+    if report_csv:
+        with OpenCsv(report_csv, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(replayFields)
+            for stats in rows:
+                writer.writerow([stats[field] for field in replayFields])
+            writer.writerow(['Total', len(records), sum([s['Recorded_Seconds'] for s in rows]),
+                             sum([s['Replayed_Seconds'] for s in rows]), sum([s['Input_Features'] for s in rows]),
+                             sum([s['Output_Features'] for s in rows])])
+            writer.writerow(['Python', '', sum([r['python_seconds'] for r in records]), '', '', ''])
+    return rows
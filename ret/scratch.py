@@ -0,0 +1,82 @@
+'''----------------------------------------------------------------------------------
+ Source Name: scratch.py
+ Description: Scratch lifecycle of a year geodatabase. The datasets a group of stages creates are tracked with the
+              stage that last needs them (the build stages' layers are needed by the update chain, the updated
+              features and soil copy by the recharge union) and deleted once it is done. After the exports the year
+              geodatabase only holds the recharge estimates and is compacted. keep_intermediates keeps everything.
+              Deletions and the size of every year geodatabase are written to ScratchReport.csv.
+----------------------------------------------------------------------------------'''
+
+import os
+import csv
+from ret._arcpy import arcpy
+from ret.common import OpenCsv
+
+scratchFields = ['Year', 'Deleted', 'Delete_Failures', 'Size_MB']
+# Year outputs (run, scenarios and tile cores) are never scratch
+protectedPrefixes = ('RechargeEstimates_', 'Core_')
+
+
+def ListDatasets(workspace):
+    # da.Walk leaves arcpy.env.workspace alone, which the caller may be relying on
+    datasets = set()
+    for folder, dirs, names in arcpy.da.Walk(workspace, datatype=['FeatureClass', 'Table']):
+        datasets.update([os.path.join(folder, name) for name in names])
+    return datasets
+
+def WorkspaceSize(workspace):
+    size = 0
+    for folder, dirs, files in os.walk(workspace):
+        size += sum([os.path.getsize(os.path.join(folder, name)) for name in files])
+    return size / 1048576.0
+
+def BeginScratch(ctx):
+    """Starts tracking the year geodatabase of the year being calculated"""
+    ctx.scratchInfo = {'gdb': ctx.out_gdb, 'known': ListDatasets(ctx.out_gdb), 'tracked': {}, 'deleted': 0,
+                       'failed': []}
+    return ctx.scratchInfo
+
+def TrackScratch(ctx, until):
+    # Datasets created since the last call are needed until the given stage is done
+    scratchInfo = ctx.scratchInfo
+    datasets = ListDatasets(scratchInfo['gdb'])
+    for dataset in datasets - scratchInfo['known']:
+        if not os.path.basename(dataset).startswith(protectedPrefixes):
+            scratchInfo['tracked'][dataset] = until
+    scratchInfo['known'] = datasets
+
+def DeleteScratch(scratchInfo, datasets):
+    for dataset in datasets:
+        try:
+            arcpy.Delete_management(dataset)
+            scratchInfo['deleted'] += 1
+        except arcpy.ExecuteError:
+            # Still locked (e.g. by a layer), retried when the year is finished
+            scratchInfo['failed'].append(dataset)
+        del scratchInfo['tracked'][dataset]
+
+def ReleaseScratch(ctx, done):
+    """Deletes the scratch datasets no stage after the given one needs"""
+    if ctx.keep_intermediates:
+        return
+    scratchInfo = ctx.scratchInfo
+    DeleteScratch(scratchInfo, [d for d in scratchInfo['tracked'] if scratchInfo['tracked'][d] == done])
+
+def FinishScratch(ctx):
+    """Deletes what is left of the year's scratch, compacts the year geodatabase and reports its size"""
+    scratchInfo = ctx.scratchInfo
+    if scratchInfo is None or scratchInfo['gdb'] != ctx.out_gdb:
+        return None
+    if not ctx.keep_intermediates:
+        TrackScratch(ctx, 'year')
+        retry = scratchInfo['failed']
+        scratchInfo['failed'] = []
+        for dataset in retry:
+            scratchInfo['tracked'][dataset] = 'year'
+        DeleteScratch(scratchInfo, list(scratchInfo['tracked']))
+        arcpy.Compact_management(ctx.out_gdb)
+    size = WorkspaceSize(ctx.out_gdb)
+    if ctx.scratch_csv:
+        with OpenCsv(ctx.scratch_csv, 'a') as f:
+            csv.writer(f).writerow([ctx.qry_year, scratchInfo['deleted'], len(scratchInfo['failed']), size])
+    return size
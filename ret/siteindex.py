@@ -0,0 +1,142 @@
+'''----------------------------------------------------------------------------------
+ Source Name: siteindex.py
+ Description: Site inverted index and per-site x year recharge table, built from the Lineage field of the recharge
+              estimates ('ehsit:<Site_ID>_<FID_BRMP>', 'bggenexs:...', 'bggensit:...', 'cvp:<wids_sitec>').
+                  SiteIndex.csv      From_Year, Source, Site_ID, OIDs of the RechargeEstimates polygons the site
+                                     owns. Written once per polygon set; it applies to every later year until the
+                                     next From_Year
+                  SiteRecharge.csv   Year, Source, Site_ID, area, dominant CoverType/SurfCond and area-weighted
+                                     recharge of every site
+----------------------------------------------------------------------------------'''
+
+import os
+import csv
+import numpy as np
+from ret._arcpy import arcpy
+from ret.common import OpenCsv, CsvText, GeometrySignature
+
+siteRechargeFields = ['Year', 'Source', 'Site_ID', 'Area', 'CoverType', 'SurfCond', 'Mean_RechargeRate',
+                      'Volumetric_Recharge']
+
+
+def LineageSite(lineage):
+    """(source, Site_ID) of a Lineage value, or None for polygons that do not come from a site"""
+    if not lineage or ':' not in lineage:
+        return None
+    source, id = lineage.split(':', 1)
+    if source in ('ehsit', 'bggenexs', 'bggensit'):
+        # <Site_ID>_<FID_BRMP>
+        id = id.rsplit('_', 1)[0]
+    return source, id
+
+def CreateSiteIndex(out_workspace):
+    siteInfo = {'index': os.path.join(out_workspace, 'SiteIndex.csv'),
+                'table': os.path.join(out_workspace, 'SiteRecharge.csv'),
+                'signature': None}
+    with OpenCsv(siteInfo['index'], 'w') as f:
+        csv.writer(f).writerow(['From_Year', 'Source', 'Site_ID', 'OIDs'])
+    with OpenCsv(siteInfo['table'], 'w') as f:
+        csv.writer(f).writerow(siteRechargeFields)
+    return siteInfo
+
+def SiteRecharge(RechargeFeatures, nodata=-9999):
+    """Site keys, polygon OIDs per site and per-site area, dominant cover and recharge of a year"""
+    arr = arcpy.da.FeatureClassToNumPyArray(RechargeFeatures,
+                                            ['OID@', 'SHAPE@AREA', 'Lineage', 'CoverType', 'SurfCond',
+                                             'RechargeRate'],
+                                            null_value={'Lineage': '', 'CoverType': '', 'SurfCond': '',
+                                                        'RechargeRate': nodata})
+    sites = [LineageSite(x) for x in arr['Lineage'].tolist()]
+    owned = np.array([s is not None for s in sites], dtype=bool)
+    if not owned.any():
+        return [], {}, []
+    keys = np.array([u'\t'.join(s) for s in sites if s is not None])
+    arr = arr[owned]
+    siteKeys, siteIndex = np.unique(keys, return_inverse=True)
+    nsites = len(siteKeys)
+    area = arr['SHAPE@AREA'].astype(np.float64)
+    rate = arr['RechargeRate'].astype(np.float64)
+    valid = rate != nodata
+
+    # Polygons owned by every site
+    order = np.argsort(siteIndex, kind='mergesort')
+    starts = np.searchsorted(siteIndex[order], np.arange(nsites + 1))
+    oids = arr['OID@'][order]
+    polygons = dict([(siteKeys[s], oids[starts[s]:starts[s + 1]].tolist()) for s in range(nsites)])
+
+    siteArea = np.bincount(siteIndex, weights=area, minlength=nsites)
+    validArea = np.bincount(siteIndex[valid], weights=area[valid], minlength=nsites)
+    weighted = np.bincount(siteIndex[valid], weights=(rate * area)[valid], minlength=nsites)
+    volume = np.bincount(siteIndex[valid], weights=(rate / 1000.0 * area)[valid], minlength=nsites)
+    meanRate = np.zeros(nsites) + nodata
+    meanRate[validArea > 0] = weighted[validArea > 0] / validArea[validArea > 0]
+
+    # Dominant CoverType/SurfCond: the combination covering the largest area of the site
+    combos = np.char.add(np.char.add(arr['CoverType'].astype(np.unicode_), u'\t'), arr['SurfCond'].astype(np.unicode_))
+    comboKeys, comboIndex = np.unique(combos, return_inverse=True)
+    pairIndex = siteIndex * len(comboKeys) + comboIndex
+    pairs, pairInverse = np.unique(pairIndex, return_inverse=True)
+    pairArea = np.bincount(pairInverse, weights=area)
+    pairSite = pairs // len(comboKeys)
+    best = np.lexsort((-pairArea, pairSite))
+    first = best[np.concatenate(([True], pairSite[best][1:] != pairSite[best][:-1]))]
+    dominant = dict(zip(pairSite[first].tolist(), (pairs[first] % len(comboKeys)).tolist()))
+
+    rows = []
+    for s in range(nsites):
+        source, id = siteKeys[s].split(u'\t')
+        cover, surfCond = comboKeys[dominant[s]].split(u'\t')
+        rows.append([source, id, siteArea[s], cover, surfCond, meanRate[s], volume[s]])
+    return siteKeys.tolist(), polygons, rows
+
+def AppendSiteIndexYear(siteInfo, years, RechargeFeatures):
+    """Adds a computed year (and the alias years it stands for) to the site index & per-site table"""
+    siteKeys, polygons, rows = SiteRecharge(RechargeFeatures)
+    signature = GeometrySignature(RechargeFeatures)
+    if signature != siteInfo['signature']:
+        with OpenCsv(siteInfo['index'], 'a') as f:
+            writer = csv.writer(f)
+            for key in siteKeys:
+                source, id = key.split(u'\t')
+                writer.writerow([years[0], source, CsvText(id), ' '.join([str(oid) for oid in polygons[key]])])
+        siteInfo['signature'] = signature
+    with OpenCsv(siteInfo['table'], 'a') as f:
+        writer = csv.writer(f)
+        for year in years:
+            for row in rows:
+                writer.writerow([year] + [CsvText(x) for x in row])
+    return len(siteKeys)
+
+def ReadSiteRecharge(out_workspace, site_ids=None, first=None, last=None):
+    """Rows of SiteRecharge.csv, optionally only for some Site_IDs and years"""
+    if site_ids is not None:
+        site_ids = set([str(x) for x in site_ids])
+    result = []
+    with OpenCsv(os.path.join(out_workspace, 'SiteRecharge.csv'), 'r') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            year = int(row[0])
+            if site_ids is not None and row[2] not in site_ids:
+                continue
+            if (first is not None and year < first) or (last is not None and year > last):
+                continue
+            result.append(row)
+    return result
+
+def ReadSiteIndex(out_workspace, year):
+    """(Source, Site_ID) -> OIDs of the RechargeEstimates polygons of a year owned by the site"""
+    index = {}
+    fromYear = None
+    with OpenCsv(os.path.join(out_workspace, 'SiteIndex.csv'), 'r') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            rowYear = int(row[0])
+            if rowYear > year:
+                break
+            if rowYear != fromYear:
+                index = {}
+                fromYear = rowYear
+            index[(row[1], row[2])] = [int(oid) for oid in row[3].split()]
+    return index
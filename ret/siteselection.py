@@ -0,0 +1,337 @@
+'''----------------------------------------------------------------------------------
+ Source Name: siteselection.py
+ Description: The SiteSelection workflow: select the sites within the model domain, find the years of interest within
+              the simulation period, clip the RET outputs for these years to the model domain and summarize them.
+              Per-site recharge of the selected sites comes from the site table of the RET run (SiteRecharge.csv).
+----------------------------------------------------------------------------------'''
+
+import os
+import csv
+import bisect
+import numpy as np
+from ret._arcpy import arcpy
+from ret.common import OpenCsv, CsvText
+from ret.clipworkers import RunClipWorkers
+from ret.planner import EventYears, DateYear
+from ret.siteindex import ReadSiteRecharge, siteRechargeFields
+from ret.attributecube import OpenAttributeCube, AttributeCubeValues, DecodeCubeCodes, CubeGroupAt, CubeChangeYears
+
+# Site dates deciding whether RET disturbs a NAIP2011 polygon (see Build_NAIP2011)
+naipYearFields = ['Year_Built', 'First_Remediation', 'Closure_Year', 'Start_Ops', 'End_Ops', 'First_Action',
+                  'Final_Action']
+
+def SummarizeRecharge(featureClass, nodata=-9999):
+    """Area-weighted recharge summary of a clipped RechargeEstimates feature class"""
+    fields = ['SHAPE@AREA', 'RechargeRate', 'CoverType', 'SurfCond']
+    arr = arcpy.da.FeatureClassToNumPyArray(featureClass, fields,
+                                            null_value={'RechargeRate': nodata, 'CoverType': '', 'SurfCond': ''})
+    area = arr['SHAPE@AREA'].astype(np.float64)
+    rate = arr['RechargeRate'].astype(np.float64)
+
+    # Polygons without a recharge lookup match (-9999) count toward the total area only
+    valid = rate != nodata
+    validArea = area[valid].sum()
+    # RechargeRate is in mm/yr, so volumetric recharge is in (area units x m)/yr, i.e. m^3/yr for meters
+    volume = (rate[valid] / 1000.0 * area[valid]).sum()
+    if validArea > 0:
+        meanRate = (rate[valid] * area[valid]).sum() / validArea
+    else:
+        meanRate = nodata
+
+    totals = {'Total_Area': area.sum(),
+              'NoData_Area': area[~valid].sum(),
+              'Mean_RechargeRate': meanRate,
+              'Volumetric_Recharge': volume}
+
+    # Area by CoverType/SurfCond
+    breakdown = []
+    if len(arr) > 0:
+        keys = np.char.add(np.char.add(arr['CoverType'].astype(np.unicode_), u'\t'),
+                           arr['SurfCond'].astype(np.unicode_))
+        uniqueKeys, inverse = np.unique(keys, return_inverse=True)
+        keyArea = np.bincount(inverse, weights=area, minlength=len(uniqueKeys))
+        for index, key in enumerate(uniqueKeys):
+            cover, surfCond = key.split(u'\t')
+            breakdown.append([cover, surfCond, keyArea[index]])
+    return totals, breakdown
+
+def IsDomainList(AoI):
+    # "name=feature class;..." or a multivalue list of feature classes
+    return '=' in AoI or ';' in AoI
+
+def PrepareSelection(ctx):
+    #Allow for overwriting of outputs
+    arcpy.env.overwriteOutput = True
+
+    # Create Output Directory if doesn't exist
+    if not os.path.exists(ctx.out_workspace):
+        os.makedirs(ctx.out_workspace)
+
+    # Create Geodatabase if doesn't exist
+    if not arcpy.Exists(ctx.out_gdb):
+        arcpy.CreateFileGDB_management(ctx.out_workspace, ctx.out_name)
+
+    #Print messages
+    arcpy.AddMessage('AoI: ' + ctx.AoI)
+    arcpy.AddMessage('Simulation Year: ' + str(ctx.simyear))
+    arcpy.AddMessage('Simulation Duration: ' + str(ctx.simduration))
+    arcpy.AddMessage('Input Directory: ' + ctx.in_workspace)
+    arcpy.AddMessage('Output Directory: ' + ctx.out_workspace)
+    arcpy.AddMessage("Starting processing...")
+
+def SelectSites(ctx):
+    # Relevant features to intersect with AoI
+    cvp_lyr = arcpy.MakeFeatureLayer_management(ctx.cvp_input, "cvp_lyr")
+    ehsit_lyr = arcpy.MakeFeatureLayer_management(ctx.ehsit_input, "ehsit_lyr")
+    bggenexs_lyr = arcpy.MakeFeatureLayer_management(ctx.bggenexs_input, "bggenexs_lyr")
+    bggensit_lyr = arcpy.MakeFeatureLayer_management(ctx.bggensit_input, "bggensit_lyr")
+
+    AoI_lyr = arcpy.MakeFeatureLayer_management(ctx.AoI, "AoI_lyr")
+    # Features that undergo succession
+    succession_layers = [cvp_lyr,ehsit_lyr,bggenexs_lyr,bggensit_lyr]
+
+    # Fields containing site_ID
+    SiteID_fields = ['wids_sitec','SITE_NUM','FACIL_NAME','FACIL_NAME']
+    # Lineage source & Site_ID field of the sites in the RET outputs (see ret.siteindex)
+    SiteKey_sources = ['cvp', 'ehsit', 'bggenexs', 'bggensit']
+    SiteKey_fields = ['wids_sitec', 'SITE_NUM', 'Site_ID', 'Site_ID']
+
+    # List of selected Site IDs for AoI
+    ctx.SiteID_AoI = []
+    ctx.SiteKeys_AoI = []
+
+    for index, lyr in enumerate(succession_layers):
+        selection = arcpy.SelectLayerByLocation_management(in_layer=lyr,
+                                           overlap_type="INTERSECT",
+                                           select_features=AoI_lyr)
+        # Search cursor to find Site_IDs
+        with arcpy.da.SearchCursor(selection, [SiteID_fields[index], SiteKey_fields[index]]) as rows:
+            # Iterate through the rows in the cursor and compile the Site_IDs to a list
+            count = 0
+            for row in rows:
+                ctx.SiteID_AoI.append(row[0])
+                # RET keys ehsit sites by the first SITE_NUM
+                key = str(row[1]).split(';')[0] if SiteKey_sources[index] == 'ehsit' else str(row[1])
+                ctx.SiteKeys_AoI.append((SiteKey_sources[index], key))
+                count = count + 1
+        arcpy.AddMessage('Number of waste sites in {0}: {1}'.format(lyr, count)) #count should be:CVP = 45, ehsit = 345, bggenexs = 117, bggensit = 507
+    arcpy.AddMessage('Total number of waste sites in model domain: {0}'.format(len(ctx.SiteID_AoI))) #should be 1014
+    return AoI_lyr
+
+def YearsOfInterest(ctx):
+    arcpy.AddMessage('Simulation End Year: {0}'.format(ctx.simend))
+    # With an attribute cube the YoI are the years at which recharge changes. The cube also covers the years after
+    # the last RET year, so simulations past the RET outputs need no year geodatabases
+    if os.path.exists(os.path.join(ctx.in_workspace, 'AttributeCube', 'AttributeCube.hdr')):
+        ctx.cube = OpenAttributeCube(os.path.join(ctx.in_workspace, 'AttributeCube'))
+        # Only changes of the polygons within the AoI, and the years a new polygon set takes effect
+        groupYears = [g['year'] for g in ctx.cube['groups'] if ctx.simyear < g['year'] <= ctx.simend]
+        years = sorted(set(CubeChangeYears(ctx.cube, ctx.simyear, ctx.simend, rows=CubeAoIRows(ctx)) + groupYears))
+        ctx.YoI_AoI_Final = [str(y) for y in years if CubeGroupAt(ctx.cube, y) is not None]
+        arcpy.AddMessage('Years of Interest from attribute cube: {0}'.format(ctx.YoI_AoI_Final))
+        arcpy.AddMessage('Total number of Years of Interest: {0}'.format(len(ctx.YoI_AoI_Final)))
+        return ctx.YoI_AoI_Final
+
+    # Lookup list of YoI for selected sites in folder directory
+    YoI_AoI_Unique = []
+    for database in os.listdir(ctx.in_workspace):
+        if '.gdb' in database.lower() and database.replace('.gdb', '').isdigit():
+            YoI_AoI_Unique.append(int(database.replace('.gdb','')))
+    YoI_AoI_Unique.sort()
+
+    # Recharge within the AoI only changes at the event years of the selected sites (disposition dates, status
+    # transitions, CVP succession) and at the layer validity breakpoints. Every event year is read from the output
+    # year governing it (the last output year on or before it)
+    candidates = [y for y in YoI_AoI_Unique if y >= ctx.simyear and y <= ctx.simend]
+    if arcpy.Exists(ctx.disposition_input):
+        events = SiteEventYears(ctx)
+        candidates = [ctx.simyear] + [y for y in sorted(events) if y > ctx.simyear and y <= ctx.simend]
+    governing = []
+    for y in candidates:
+        index = bisect.bisect_right(YoI_AoI_Unique, y) - 1
+        if index >= 0 and YoI_AoI_Unique[index] not in governing:
+            governing.append(YoI_AoI_Unique[index])
+    ctx.YoI_AoI_Final = [str(y) for y in governing]
+    arcpy.AddMessage('Years of Interest for model domain & simulation period: {0}'.format(ctx.YoI_AoI_Final))
+    arcpy.AddMessage('Total number of Years of Interest: {0}'.format(len(ctx.YoI_AoI_Final))) #should be 1014
+    return ctx.YoI_AoI_Final
+
+def NAIPSites(ctx):
+    """(Lineage source, Site_ID) and Year -> events of the sites intersecting the NAIP2011 polygons within the AoI,
+    or None without NAIP2011"""
+    # RET marks a NAIP2011 polygon disturbed from the dates of the sites it overlaps (see Build_NAIP2011), also of
+    # those outside the AoI
+    if not arcpy.Exists(ctx.naip_2011_input):
+        return None
+    naip_lyr = arcpy.MakeFeatureLayer_management(ctx.naip_2011_input, 'naip_aoi_lyr')
+    arcpy.SelectLayerByLocation_management(naip_lyr, 'INTERSECT', ctx.AoI)
+    keys = []
+    events = {}
+    if not arcpy.Describe(naip_lyr).FIDSet:
+        return keys, events
+    for source, featureClass, field in [('ehsit', ctx.ehsit_input, 'SITE_NUM'),
+                                        ('bggenexs', ctx.bggenexs_input, 'Site_ID'),
+                                        ('bggensit', ctx.bggensit_input, 'Site_ID')]:
+        lyr = arcpy.MakeFeatureLayer_management(featureClass, source + '_naip_lyr')
+        arcpy.SelectLayerByLocation_management(lyr, 'INTERSECT', naip_lyr)
+        fieldNames = [f.name for f in arcpy.ListFields(featureClass)]
+        yearFields = [f for f in naipYearFields if f in fieldNames]
+        # A cursor on a layer without a selection would read all features
+        if arcpy.Describe(lyr).FIDSet:
+            with arcpy.da.SearchCursor(lyr, [field] + yearFields) as rows:
+                for row in rows:
+                    keys.append((source, str(row[0]).split(';')[0] if source == 'ehsit' else str(row[0])))
+                    for value in row[1:]:
+                        year = DateYear(value)
+                        if year is not None:
+                            events.setdefault(year, set()).add('NAIP')
+        arcpy.Delete_management(lyr)
+    arcpy.Delete_management(naip_lyr)
+    return keys, events
+
+def SiteEventYears(ctx):
+    """Year -> events of the sites selected within the AoI and of the sites disturbing its NAIP2011 polygons"""
+    naip = NAIPSites(ctx)
+    if naip is None:
+        arcpy.AddWarning('No NAIP2011 in {0}, using the event years of all sites'.format(ctx.source_gdb))
+        return EventYears(ctx.disposition_input, ctx.cvp_input)
+    keys = ctx.SiteKeys_AoI + naip[0]
+    site_ids = [key[1] for key in keys if key[0] != 'cvp']
+    cvp_ids = [key[1] for key in keys if key[0] == 'cvp']
+    events = EventYears(ctx.disposition_input, ctx.cvp_input, site_ids, cvp_ids)
+    for year in naip[1]:
+        events.setdefault(year, set()).update(naip[1][year])
+    return events
+
+def CubeAoIRows(ctx):
+    """Cube rows of the polygons within the AoI, of every polygon set in effect during the simulation"""
+    groups = ctx.cube['groups']
+    rows = []
+    for index, group in enumerate(groups):
+        end = groups[index + 1]['year'] if index + 1 < len(groups) else None
+        if group['year'] > ctx.simend or (end is not None and end <= ctx.simyear):
+            continue
+        lyr = arcpy.MakeFeatureLayer_management(group['features'], 'cube_aoi_lyr')
+        arcpy.SelectLayerByLocation_management(lyr, 'INTERSECT', ctx.AoI)
+        # A cursor on a layer without a selection would read all features
+        if arcpy.Describe(lyr).FIDSet:
+            with arcpy.da.SearchCursor(lyr, ['CubeRow']) as cursor:
+                rows += [row[0] for row in cursor]
+        arcpy.Delete_management(lyr)
+    return rows
+
+def WriteYearMap(ctx):
+    # Output year governing every simulation year (the last Year of Interest on or before it)
+    years = [int(y) for y in ctx.YoI_AoI_Final]
+    year_csv = os.path.join(ctx.out_workspace, str(ctx.m_name) + '_YearMap.csv')
+    with OpenCsv(year_csv, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Year', 'Output_Year'])
+        for y in range(ctx.simyear, ctx.simend + 1):
+            index = bisect.bisect_right(years, y) - 1
+            writer.writerow([y, years[index] if index >= 0 else ''])
+    arcpy.AddMessage('Year map written to: {0}'.format(year_csv))
+    return year_csv
+
+def ClipCubeYears(ctx, AoI_lyr):
+    # Every polygon set of the cube is clipped once. The years are copies of the clipped polygons with the
+    # attributes of the year read from the cube
+    clippedGroups = {}
+    for y in ctx.YoI_AoI_Final:
+        group = CubeGroupAt(ctx.cube, int(y))
+        arcpy.AddMessage('Evaluating year: {0}'.format(y))
+        if group['features'] not in clippedGroups:
+            clipped = os.path.join(ctx.out_gdb, 'Cube' + os.path.basename(group['features']))
+            arcpy.Clip_analysis(group['features'], AoI_lyr, clipped)
+            rows = arcpy.da.FeatureClassToNumPyArray(clipped, ['CubeRow'])['CubeRow']
+            clippedGroups[group['features']] = (clipped, rows)
+        clipped, rows = clippedGroups[group['features']]
+
+        Output_lyr = os.path.join(ctx.out_gdb, 'Recharge_' + y)
+        arcpy.CopyFeatures_management(clipped, Output_lyr)
+        SetCubeAttributes(Output_lyr, CubeYearValues(ctx.cube, y, rows))
+    for clipped, rows in clippedGroups.values():
+        arcpy.Delete_management(clipped)
+
+def CubeYearValues(cube, y, rows):
+    # CubeRow -> CoverType, SurfCond & RechargeRate of a year
+    cover, surf, rate = AttributeCubeValues(cube, int(y), rows)
+    return dict(zip(rows.tolist(), zip(DecodeCubeCodes(cube['coverCodes'], cover),
+                                       DecodeCubeCodes(cube['surfCodes'], surf), rate.tolist())))
+
+def SetCubeAttributes(featureClass, values):
+    with arcpy.da.UpdateCursor(featureClass, ['CubeRow', 'CoverType', 'SurfCond', 'RechargeRate']) as cursor:
+        for row in cursor:
+            row[1], row[2], row[3] = values[row[0]]
+            cursor.updateRow(row)
+
+def ClipYears(ctx, AoI_lyr):
+    if ctx.cube is not None:
+        ClipCubeYears(ctx, AoI_lyr)
+    elif ctx.workers > 1 and len(ctx.YoI_AoI_Final) > 1:
+        # Clip years concurrently, each worker into its own scratch gdb, then consolidate into the output gdb
+        RunClipWorkers(ctx.YoI_AoI_Final, ctx.in_workspace, ctx.AoI, ctx.out_gdb, ctx.workers)
+    else:
+        # Loop though YoI for AoI
+        for y in ctx.YoI_AoI_Final:
+            # Open Recharge Estimates for YoI
+            in_name = y + ".gdb"
+            y_name = "RechargeEstimates_" + y
+            in_gdb = os.path.join(ctx.in_workspace,in_name,y_name)
+            arcpy.AddMessage('Evaluating year: {0}'.format(y))
+            Recharge_lyr = arcpy.MakeFeatureLayer_management(in_gdb, "Recharge_lyr")
+            #Set output file name
+            oname ='Recharge_' + y
+            Output_lyr = os.path.join(ctx.out_gdb,oname)
+            # Clip Recharge Estimate polygon by model domain & Save to output folder
+            arcpy.Clip_analysis(Recharge_lyr,AoI_lyr,Output_lyr)
+
+def WriteSummaries(ctx):
+    # Computed from the clipped polygon areas and attribute arrays, so no further geoprocessing is run per year
+    summary_csv = os.path.join(ctx.out_workspace, str(ctx.m_name) + '_RechargeSummary.csv')
+    cover_csv = os.path.join(ctx.out_workspace, str(ctx.m_name) + '_CoverSummary.csv')
+    summary_fields = ['Total_Area', 'NoData_Area', 'Mean_RechargeRate', 'Volumetric_Recharge']
+
+    with OpenCsv(summary_csv, 'w') as summary_file, OpenCsv(cover_csv, 'w') as cover_file:
+        summary_writer = csv.writer(summary_file)
+        summary_writer.writerow(['Year'] + summary_fields)
+        cover_writer = csv.writer(cover_file)
+        cover_writer.writerow(['Year', 'CoverType', 'SurfCond', 'Area'])
+        for y in ctx.YoI_AoI_Final:
+            totals, breakdown = SummarizeRecharge(os.path.join(ctx.out_gdb, 'Recharge_' + y))
+            summary_writer.writerow([y] + [totals[f] for f in summary_fields])
+            for cover, surfCond, area in breakdown:
+                cover_writer.writerow([y, CsvText(cover), CsvText(surfCond), area])
+    arcpy.AddMessage('Recharge summary written to: {0}'.format(summary_csv))
+    arcpy.AddMessage('Cover type summary written to: {0}'.format(cover_csv))
+    return summary_csv, cover_csv
+
+def WriteSiteSummaries(ctx):
+    # Per-site recharge of the selected sites, read from the per-site x year table of the RET run instead of a
+    # spatial selection per site
+    if not os.path.exists(os.path.join(ctx.in_workspace, 'SiteRecharge.csv')):
+        return None
+    site_csv = os.path.join(ctx.out_workspace, str(ctx.m_name) + '_SiteRecharge.csv')
+    keys = set(ctx.SiteKeys_AoI)
+    rows = [row for row in ReadSiteRecharge(ctx.in_workspace, [key[1] for key in keys], ctx.simyear, ctx.simend)
+            if (row[1], row[2]) in keys]
+    with OpenCsv(site_csv, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(siteRechargeFields)
+        writer.writerows(rows)
+    arcpy.AddMessage('Site recharge of {0} sites written to: {1}'.format(len(set([(row[1], row[2]) for row in rows])),
+                                                                        site_csv))
+    return site_csv
+
+def Run(ctx):
+    if ctx.domain_field or IsDomainList(ctx.AoI):
+        # Several model domains in one pass over the RET outputs
+        from ret.domains import RunDomains
+        return RunDomains(ctx)
+    PrepareSelection(ctx)
+    AoI_lyr = SelectSites(ctx)
+    YearsOfInterest(ctx)
+    WriteYearMap(ctx)
+    ClipYears(ctx, AoI_lyr)
+    WriteSummaries(ctx)
+    WriteSiteSummaries(ctx)
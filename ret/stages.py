@@ -0,0 +1,106 @@
+'''----------------------------------------------------------------------------------
+ Source Name: stages.py
+ Description: Build stages of a year and their stage report. The Build_* stages of a year are listed with their
+              dependencies (the site builders intersect BRMP, and NAIP activity is derived from the sites) and run
+              one after the other in an order that respects them; nothing runs concurrently, as the builders share
+              arcpy.env, the run context and the year geodatabase. The stage times and the critical path of every
+              year (the build time if the independent stages could overlap) are written to StageReport.csv.
+----------------------------------------------------------------------------------'''
+
+import csv
+import time
+from ret.common import OpenCsv
+from ret.builders import Build_BRMP, Build_AAC1943, Build_Post_AAC1943, Build_NAIP2011, Build_CVP, Build_Ehsites, \
+    Build_Bggenexs, Build_Bggensit
+
+stageFields = ['Year', 'Stage', 'Dependencies', 'Start_Seconds', 'Seconds', 'Critical']
+
+
+def YearStages(ctx):
+    """Build stages of the year being calculated: name, dependencies, builder and log message"""
+    stages = []
+    brmp = ['BRMP'] if ctx.brmpIsValid else []
+    sitesForNAIP = ' for NAIP analysis' if ctx.naip2011IsValid else ''
+
+    def stage(name, deps, build, message):
+        stages.append({'name': name, 'deps': deps, 'build': build, 'message': message})
+
+    if ctx.brmpIsValid:
+        def BRMP(interim_dir):
+            ctx.brmp_temp = Build_BRMP(ctx, interim_dir, ctx.brmp_input, ctx.RechargeLookup)
+        stage('BRMP', [], BRMP, "BRMP Vegetation Created")
+    if ctx.aac1943IsValid:
+        def AAC1943(interim_dir):
+            ctx.aac_1943_temp = Build_AAC1943(ctx, interim_dir, ctx.aac_1943_input)
+        stage('AAC1943', [], AAC1943, "AAC 1943 Created")
+    if ctx.aac1943IsFallow:
+        def AAC1943Fallow(interim_dir):
+            ctx.aac_1943_temp = Build_Post_AAC1943(ctx, interim_dir, ctx.aac_1943_input)
+        stage('AAC1943Fallow', [], AAC1943Fallow, "AAC 1943 Fallow Created")
+
+    # NAIP will be populated with BRMP values until the first man-made structure comes into existence within a
+    # polygon, so the sites are built first whenever NAIP is valid
+    if ctx.naip2011IsValid or ctx.facilitiesIsValid:
+        def Bggenexs(interim_dir):
+            ctx.bggenexs_temp = Build_Bggenexs(ctx, interim_dir, ctx.bggenexs_input, ctx.disposition_input)
+        stage('bggenexs', brmp, Bggenexs, "Facilities Created" + sitesForNAIP)
+        def Bggensit(interim_dir):
+            ctx.bggensit_temp = Build_Bggensit(ctx, interim_dir, ctx.bggensit_input, ctx.disposition_input)
+        stage('bggensit', brmp, Bggensit, "Sites Created" + sitesForNAIP)
+    if ctx.naip2011IsValid or ctx.ehsitIsValid:
+        def Ehsites(interim_dir):
+            ctx.ehsit_temp = Build_Ehsites(ctx, interim_dir, ctx.ehsit_input, ctx.disposition_input,
+                                           ctx.disposition_lookup)
+        stage('ehsit', brmp, Ehsites, "Environmental Hazardous Waste Sites Created" + sitesForNAIP)
+    if ctx.naip2011IsValid:
+        def NAIP2011(interim_dir):
+            ctx.naip_2011_temp = Build_NAIP2011(ctx, interim_dir, ctx.naip_2011_input)
+        stage('NAIP2011', brmp + ['bggenexs', 'bggensit', 'ehsit'], NAIP2011, "NAIP 2011 Created")
+    if ctx.cvpIsValid:
+        def CVP(interim_dir):
+            ctx.cvp_temp = Build_CVP(ctx, interim_dir, ctx.cvp_input)
+        stage('CVP', [], CVP, "Cleanup Verification Packages Created")
+    return stages
+
+def CriticalPath(stages, timing):
+    # Longest chain of stage durations through the dependencies, i.e. the year's build time with unlimited workers
+    length = {}
+    previous = {}
+    for stage in stages:
+        name = stage['name']
+        before = max(stage['deps'], key=lambda n: length[n]) if stage['deps'] else None
+        length[name] = (length[before] if before else 0.0) + timing[name][1] - timing[name][0]
+        previous[name] = before
+    name = max(length, key=lambda n: length[n])
+    path = []
+    while name is not None:
+        path.insert(0, name)
+        name = previous[name]
+    return path
+
+def RunStages(ctx, stages):
+    """Runs the stages one at a time in dependency order & reports their times. Returns the critical path"""
+    pending = list(stages)
+    timing = {}
+    origin = time.time()
+    while pending:
+        stage = [s for s in pending if all([d in timing for d in s['deps']])][0]
+        pending.remove(stage)
+        start = time.time()
+        stage['build'](ctx.out_gdb)
+        timing[stage['name']] = (start - origin, time.time() - origin)
+        ctx.Log(stage['message'])
+
+    path = CriticalPath(stages, timing) if timing else []
+    if ctx.stage_csv:
+        with OpenCsv(ctx.stage_csv, 'a') as f:
+            writer = csv.writer(f)
+            for stage in stages:
+                start, end = timing[stage['name']]
+                writer.writerow([ctx.qry_year, stage['name'], ' '.join(stage['deps']), start, end - start,
+                                 'Y' if stage['name'] in path else 'N'])
+    if path:
+        ctx.Log("Critical Path: {0} ({1:.1f}s of {2:.1f}s build time)".format(
+            ' > '.join(path), sum([timing[n][1] - timing[n][0] for n in path]),
+            sum([t[1] - t[0] for t in timing.values()])))
+    return path
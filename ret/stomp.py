@@ -0,0 +1,182 @@
+'''----------------------------------------------------------------------------------
+ Source Name: stomp.py
+ Description: Maps the clipped recharge estimates of a model domain onto the STOMP grid. A sparse cell x polygon
+              area-weight matrix is computed once per distinct polygon set and each year's recharge is mapped to all
+              cells with one sparse matrix product. Outputs are a cell x year recharge table and a STOMP
+              top-surface Neumann boundary condition card.
+----------------------------------------------------------------------------------'''
+
+import os
+import re
+import csv
+import numpy as np
+from datetime import datetime
+from ret._arcpy import arcpy
+from ret.common import OpenCsv, GeometrySignature
+
+
+def BuildCellsFromCenters(centers, out_fc, cellsize, index_fields):
+    # Square cell polygons around the STOMP cell centers, carrying the cell indices
+    spatialReference = arcpy.Describe(centers).spatialReference
+    arcpy.CreateFeatureclass_management(os.path.dirname(out_fc), os.path.basename(out_fc), 'POLYGON',
+                                        spatial_reference=spatialReference)
+    for field in index_fields:
+        arcpy.AddField_management(out_fc, field, 'LONG')
+    half = cellsize / 2.0
+    with arcpy.da.SearchCursor(centers, ['SHAPE@XY'] + index_fields) as rows:
+        with arcpy.da.InsertCursor(out_fc, ['SHAPE@'] + index_fields) as cells:
+            for row in rows:
+                x, y = row[0]
+                corners = arcpy.Array([arcpy.Point(x - half, y - half), arcpy.Point(x - half, y + half),
+                                       arcpy.Point(x + half, y + half), arcpy.Point(x + half, y - half)])
+                cells.insertRow([arcpy.Polygon(corners, spatialReference)] + list(row[1:]))
+    return out_fc
+
+def CellWeightMatrix(cells, cellIndex, RechargeFeatures, scratch_gdb):
+    # Sparse cell x polygon matrix in coordinate form (cell row, polygon OID, overlap area)
+    cellName = arcpy.Describe(cells).name
+    rechargeName = arcpy.Describe(RechargeFeatures).name
+    overlap = arcpy.Intersect_analysis([cells, RechargeFeatures], os.path.join(scratch_gdb, 'CellOverlap'), 'ONLY_FID')
+    arr = arcpy.da.FeatureClassToNumPyArray(overlap, ['FID_' + cellName, 'FID_' + rechargeName, 'SHAPE@AREA'])
+    arcpy.Delete_management(overlap)
+
+    # Sort by cell so products can be reduced per cell in one pass
+    rows = cellIndex[arr['FID_' + cellName]]
+    order = np.argsort(rows, kind='mergesort')
+    rows = rows[order]
+    if len(rows):
+        starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+    else:
+        starts = np.zeros(0, dtype=np.int64)
+    return {'rows': rows[starts],
+            'starts': starts,
+            'oids': arr['FID_' + rechargeName].astype(np.int64)[order],
+            'areas': arr['SHAPE@AREA'].astype(np.float64)[order]}
+
+def MapRecharge(weights, rates, ncells, nodata=-9999):
+    """Area-weighted recharge for all cells from a polygons x years rate matrix (one sparse mat-mat product)"""
+    rates = rates[weights['oids']]
+    valid = (rates != nodata).astype(np.float64)
+    areas = weights['areas'][:, np.newaxis]
+    result = np.zeros((ncells, rates.shape[1]), dtype=np.float64) + nodata
+    if len(weights['starts']) == 0:
+        return result
+    weightedSum = np.add.reduceat(areas * rates * valid, weights['starts'], axis=0)
+    coveredArea = np.add.reduceat(areas * valid, weights['starts'], axis=0)
+    covered = coveredArea > 0
+    cellValues = np.zeros(weightedSum.shape, dtype=np.float64) + nodata
+    cellValues[covered] = weightedSum[covered] / coveredArea[covered]
+    result[weights['rows']] = cellValues
+    return result
+
+def RateMatrix(RechargeFeatures_list, nodata=-9999):
+    # Polygons x years matrix of RechargeRate, indexed by OID
+    arrays = [arcpy.da.FeatureClassToNumPyArray(fc, ['OID@', 'RechargeRate'], null_value={'RechargeRate': nodata})
+              for fc in RechargeFeatures_list]
+    rates = np.zeros((max([a['OID@'].max() for a in arrays]) + 1, len(arrays)), dtype=np.float64) + nodata
+    for column, arr in enumerate(arrays):
+        rates[arr['OID@'], column] = arr['RechargeRate']
+    return rates
+
+def WriteBoundaryCard(card_path, cellIds, k, times, recharge):
+    # STOMP top-surface Neumann aqueous flux per cell. Infiltration is downward, i.e. negative z direction
+    with open(card_path, 'w') as card:
+        card.write('~Boundary Conditions Card\n')
+        card.write('{0},\n'.format(len(cellIds)))
+        for cell, (i, j) in enumerate(cellIds):
+            card.write('Top,Neumann Aqueous,\n')
+            card.write('{0},{0},{1},{1},{2},{2},{3},\n'.format(i, j, k, len(times)))
+            for t, time in enumerate(times):
+                card.write('{0},yr,{1:.6g},mm/yr,,,,,,\n'.format(time, -recharge[cell, t]))
+
+def MapToStomp(in_gdb, grid_input, i_field='I', j_field='J', k_top=1, out_workspace=None, cellsize=None,
+               simyear=None):
+    """Maps the recharge estimates of a SiteSelection geodatabase onto a STOMP grid"""
+    start = datetime.now()
+    #Allow for overwriting of outputs
+    arcpy.env.overwriteOutput = True
+
+    #Step 1. Output folder & scratch geodatabase for the grid cells and overlaps
+    if not out_workspace:
+        out_workspace = os.path.dirname(in_gdb)
+    m_name = os.path.splitext(os.path.basename(in_gdb))[0]
+
+    # Create Output Directory if doesn't exist
+    if not os.path.exists(out_workspace):
+        os.makedirs(out_workspace)
+
+    scratch_name = m_name + "_STOMP.gdb"
+    scratch_gdb = os.path.join(out_workspace, scratch_name)
+    if not arcpy.Exists(scratch_gdb):
+        arcpy.CreateFileGDB_management(out_workspace, scratch_name)
+
+    arcpy.AddMessage('Recharge Estimates: ' + in_gdb)
+    arcpy.AddMessage('STOMP Grid: ' + grid_input)
+    arcpy.AddMessage('Output Directory: ' + out_workspace)
+
+    #Step 2. Build STOMP grid cells & flat cell index
+    if arcpy.Describe(grid_input).shapeType == 'Point':
+        if not cellsize:
+            raise ValueError('A cell size is required when the STOMP grid is given as cell centers')
+        cells = BuildCellsFromCenters(grid_input, os.path.join(scratch_gdb, 'STOMP_cells'), cellsize,
+                                      [i_field, j_field])
+    else:
+        cells = arcpy.CopyFeatures_management(grid_input, os.path.join(scratch_gdb, 'STOMP_cells')).getOutput(0)
+
+    grid = arcpy.da.FeatureClassToNumPyArray(cells, ['OID@', i_field, j_field])
+    cellIndex = np.zeros(grid['OID@'].max() + 1, dtype=np.int64)
+    cellIndex[grid['OID@']] = np.arange(len(grid))
+    cellIds = list(zip(grid[i_field], grid[j_field]))
+    arcpy.AddMessage('Number of STOMP cells: {0}'.format(len(cellIds)))
+
+    #Step 3. Group recharge years by polygon set
+    arcpy.env.workspace = in_gdb
+    # Other Recharge_* feature classes (e.g. Recharge_<window> aggregates) are not years
+    years = sorted([int(fc.replace('Recharge_', '')) for fc in arcpy.ListFeatureClasses('Recharge_*')
+                    if re.match(r'^Recharge_\d{4}$', fc)])
+    if simyear is None:
+        simyear = years[0]
+
+    yearGroups = {}
+    for y in years:
+        yearGroups.setdefault(GeometrySignature(os.path.join(in_gdb, 'Recharge_' + str(y))), []).append(y)
+    arcpy.AddMessage('Years: {0}, distinct polygon sets: {1}'.format(len(years), len(yearGroups)))
+
+    #Step 4. Compute the weight matrix once per polygon set & map all years of the set in one product
+    recharge = np.zeros((len(cellIds), len(years)), dtype=np.float64)
+    for signature in yearGroups:
+        group = yearGroups[signature]
+        features = [os.path.join(in_gdb, 'Recharge_' + str(y)) for y in group]
+        weights = CellWeightMatrix(cells, cellIndex, features[0], scratch_gdb)
+        cellRecharge = MapRecharge(weights, RateMatrix(features), len(cellIds))
+        for column, y in enumerate(group):
+            recharge[:, years.index(y)] = cellRecharge[:, column]
+        print(str(datetime.now() - start) + '- Mapped years: {0}'.format(group))
+
+    #Step 5. Write cell x year table & STOMP boundary condition card
+    table_csv = os.path.join(out_workspace, m_name + '_CellRecharge.csv')
+    with OpenCsv(table_csv, 'w') as table_file:
+        writer = csv.writer(table_file)
+        writer.writerow([i_field, j_field] + [str(y) for y in years])
+        for cell, (i, j) in enumerate(cellIds):
+            writer.writerow([i, j] + list(recharge[cell]))
+
+    # The last year on or before simyear holds from time 0, earlier years are superseded before the simulation
+    first = max([index for index, y in enumerate(years) if y <= simyear] + [0])
+    if first > 0:
+        arcpy.AddWarning('Years before the simulation start left out of the boundary conditions: {0}'.format(
+            years[:first]))
+    cardRecharge = recharge[:, first:]
+    # Cells with no recharge estimate for any year are left out of the boundary conditions
+    complete = np.all(cardRecharge != -9999, axis=1)
+    if not complete.all():
+        arcpy.AddWarning('Cells without recharge estimates for every year: {0}'.format(int((~complete).sum())))
+    card_path = os.path.join(out_workspace, m_name + '_BoundaryConditions.card')
+    WriteBoundaryCard(card_path, [cellIds[c] for c in np.flatnonzero(complete)], k_top,
+                      [max(y - simyear, 0) for y in years[first:]], cardRecharge[complete])
+
+    arcpy.AddMessage('Cell recharge table written to: {0}'.format(table_csv))
+    arcpy.AddMessage('Boundary condition card written to: {0}'.format(card_path))
+    print(str(datetime.now() - start) + "-  Done")
+    arcpy.AddMessage("Done!")
+    return table_csv, card_path
@@ -0,0 +1,223 @@
+'''----------------------------------------------------------------------------------
+ Source Name: tiling.py
+ Description: Tiled RET runs. The domain (extent of the soil features) is split into nx x ny tiles. Every tile
+              keeps the whole features of the sites intersecting its extent plus an overlap, clips the area layers
+              to that extent plus those sites (so site attributes are built from complete geometries) and runs the
+              per-year pipeline in its own process ("python -m ret tile"), so the overlays of a tile only ever hold
+              that tile. The tile results are clipped back to the tile core, merged, and polygons on the tile seams
+              are dissolved by their attributes into a seamless RechargeEstimates_<year>.
+----------------------------------------------------------------------------------'''
+
+import os
+import csv
+import copy
+import time
+import pickle
+import shutil
+import subprocess
+from ret._arcpy import arcpy
+from ret.common import FeatureCount, OpenCsv
+from ret.clipworkers import PythonExecutable
+from ret.prefilter import FilterInputs
+
+
+def TileExtents(extent, nx, ny, overlap):
+    """Tile cores and tile extents including the overlap, row by row from the upper left"""
+    xmin, ymin, xmax, ymax = extent
+    width = (xmax - xmin) / float(nx)
+    height = (ymax - ymin) / float(ny)
+    tiles = []
+    for row in range(ny):
+        for col in range(nx):
+            core = [xmin + col * width, ymax - (row + 1) * height, xmin + (col + 1) * width, ymax - row * height]
+            tiles.append({'name': 'tile_{0}_{1}'.format(row, col),
+                          'core': core,
+                          'extent': [core[0] - overlap, core[1] - overlap, core[2] + overlap, core[3] + overlap]})
+    return tiles
+
+def EnvelopeFeatures(out_fc, envelopes, spatialReference):
+    # Rectangle polygons for a list of [xmin, ymin, xmax, ymax]
+    arcpy.CreateFeatureclass_management(os.path.dirname(out_fc), os.path.basename(out_fc), 'POLYGON',
+                                        spatial_reference=spatialReference)
+    with arcpy.da.InsertCursor(out_fc, ['SHAPE@']) as rows:
+        for xmin, ymin, xmax, ymax in envelopes:
+            corners = arcpy.Array([arcpy.Point(xmin, ymin), arcpy.Point(xmin, ymax),
+                                   arcpy.Point(xmax, ymax), arcpy.Point(xmax, ymin)])
+            rows.insertRow([arcpy.Polygon(corners, spatialReference)])
+    return out_fc
+
+def SeamFeatures(out_fc, extent, nx, ny, spatialReference):
+    # Lines along the interior tile boundaries
+    xmin, ymin, xmax, ymax = extent
+    width = (xmax - xmin) / float(nx)
+    height = (ymax - ymin) / float(ny)
+    arcpy.CreateFeatureclass_management(os.path.dirname(out_fc), os.path.basename(out_fc), 'POLYLINE',
+                                        spatial_reference=spatialReference)
+    with arcpy.da.InsertCursor(out_fc, ['SHAPE@']) as rows:
+        for col in range(1, nx):
+            x = xmin + col * width
+            rows.insertRow([arcpy.Polyline(arcpy.Array([arcpy.Point(x, ymin), arcpy.Point(x, ymax)]),
+                                           spatialReference)])
+        for row in range(1, ny):
+            y = ymax - row * height
+            rows.insertRow([arcpy.Polyline(arcpy.Array([arcpy.Point(xmin, y), arcpy.Point(xmax, y)]),
+                                           spatialReference)])
+    return out_fc
+
+def TileContext(ctx, tile, tile_dir):
+    # Copy of the run context for a tile. Cube, site index, Monte Carlo, aggregate and sensitivity outputs are built
+    # from the stitched estimates, and the inputs are already snapped, so the tile only runs the overlays and recharge
+    # assignment
+    tileCtx = copy.copy(ctx)
+    tileCtx.out_workspace = tile_dir
+    tileCtx.tiles = None
+    tileCtx.snap_resolution = ''
+    tileCtx.cube_cellsize = None
+    tileCtx.cubeInfo = None
+    tileCtx.alt_lookups = []
+    tileCtx.attribute_cube = False
+    tileCtx.site_index = False
+    tileCtx.mc_realizations = 0
+    tileCtx.aggregate_windows = ''
+    tileCtx.sliver_csv = os.path.join(tile_dir, 'SliverReport.csv') if ctx.sliver_csv else None
+    tileCtx.stage_csv = None
+    tileCtx.scratch_csv = None
+    tileCtx.incremental = False
+    tileCtx.saveRunState = False
+    tileCtx.demand_years = None
+    tileCtx.memoInfo = None
+    tileCtx.tile = tile
+    return tileCtx
+
+def RunTile(ctx):
+    """Runs all years of interest for one tile (in a worker process)"""
+    from ret.pipeline import RunYear
+    tile = ctx.tile
+    arcpy.env.overwriteOutput = True
+    if ctx.sliver_csv:
+        with OpenCsv(ctx.sliver_csv, 'w') as f:
+            csv.writer(f).writerow(['Year', 'Step', 'Features_Before', 'Features_After', 'Features_Removed'])
+
+    # Whole sites on the tile extent (core plus overlap), area layers clipped to the extent plus those sites
+    tile_gdb = os.path.join(ctx.out_workspace, 'TileInputs.gdb')
+    arcpy.CreateFileGDB_management(ctx.out_workspace, 'TileInputs.gdb')
+    spatialReference = arcpy.Describe(ctx.SoilFeatures).spatialReference
+    extent_fc = EnvelopeFeatures(os.path.join(tile_gdb, 'TileExtent'), [tile['extent']], spatialReference)
+    core_fc = EnvelopeFeatures(os.path.join(tile_gdb, 'TileCore'), [tile['core']], spatialReference)
+    ctx.SetFeatureInputs(FilterInputs(ctx.FeatureInputs(), extent_fc, tile_gdb))
+    if FeatureCount(ctx.SoilFeatures) == 0:
+        ctx.Log(tile['name'] + " is outside of the soil features")
+        return
+
+    for qry_year in ctx.run_years:
+        RunYear(ctx, qry_year)
+        # Keep only the tile core of the recharge estimates (including scenarios)
+        arcpy.env.workspace = ctx.out_gdb
+        for fc in arcpy.ListFeatureClasses('RechargeEstimates_*'):
+            arcpy.Clip_analysis(os.path.join(ctx.out_gdb, fc), core_fc, os.path.join(ctx.out_gdb, 'Core_' + fc))
+
+def RunTileWorkers(tileContexts, workers):
+    """Runs every tile in its own interpreter, at most workers at a time"""
+    package_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    pending = []
+    for tileCtx in tileContexts:
+        spec = os.path.join(tileCtx.out_workspace, 'tile.pickle')
+        with open(spec, 'wb') as f:
+            pickle.dump(tileCtx, f, 2)
+        pending.append((tileCtx.tile['name'], spec))
+
+    running = []
+    failed = []
+    while pending or running:
+        while pending and len(running) < max(1, workers):
+            name, spec = pending.pop(0)
+            running.append((name, subprocess.Popen([PythonExecutable(), '-m', 'ret', 'tile', spec],
+                                                   cwd=package_dir)))
+        for name, process in list(running):
+            if process.poll() is not None:
+                running.remove((name, process))
+                if process.returncode != 0:
+                    failed.append(name)
+                arcpy.AddMessage('Tile finished: {0}'.format(name))
+        time.sleep(1)
+    if failed:
+        raise RuntimeError('Tiles failed: {0}'.format(', '.join(failed)))
+
+def StitchFeatures(ctx, tile_dirs, fc, seams, out_fc):
+    # Merge the tile cores & dissolve the polygons along the seams by their attributes
+    cores = [os.path.join(d, ctx.out_name, 'Core_' + fc) for d in tile_dirs]
+    cores = [c for c in cores if arcpy.Exists(c)]
+    merged = arcpy.Merge_management(cores, out_fc + '_merged').getOutput(0)
+    for field in arcpy.ListFields(merged, 'FID_*'):
+        arcpy.DeleteField_management(merged, field.name)
+    fields = [f.name for f in arcpy.ListFields(merged)
+              if f.type not in ('OID', 'Geometry') and f.name not in ('Shape_Length', 'Shape_Area')]
+
+    arcpy.MakeFeatureLayer_management(merged, 'merged_lyr')
+    arcpy.SelectLayerByLocation_management('merged_lyr', 'INTERSECT', seams)
+    # Geoprocessing on a layer without a selection would use all features
+    if FeatureCount('merged_lyr') in (0, FeatureCount(merged)):
+        arcpy.SelectLayerByAttribute_management('merged_lyr', 'CLEAR_SELECTION')
+        arcpy.CopyFeatures_management('merged_lyr', out_fc)
+    else:
+        seam_fc = arcpy.Dissolve_management('merged_lyr', out_fc + '_seam', fields, '#', 'SINGLE_PART').getOutput(0)
+        arcpy.SelectLayerByAttribute_management('merged_lyr', 'SWITCH_SELECTION')
+        arcpy.CopyFeatures_management('merged_lyr', out_fc)
+        arcpy.Append_management(seam_fc, out_fc, 'NO_TEST')
+        arcpy.Delete_management(seam_fc)
+    arcpy.Delete_management('merged_lyr')
+    arcpy.Delete_management(merged)
+    return out_fc
+
+def RunTiled(ctx):
+    """Runs the years of interest tile by tile in worker processes & stitches the tiles for every year"""
+    from ret.pipeline import ExportYear
+    nx, ny = ctx.tiles
+    domain = arcpy.Describe(ctx.SoilFeatures).extent
+    extent = [domain.XMin, domain.YMin, domain.XMax, domain.YMax]
+    tiles = TileExtents(extent, nx, ny, ctx.tile_overlap)
+    ctx.Log("Running {0} tiles with {1} workers".format(len(tiles), ctx.tile_workers))
+
+    tiles_dir = os.path.join(ctx.out_workspace, 'Tiles')
+    tileContexts = []
+    for tile in tiles:
+        tile_dir = os.path.join(tiles_dir, tile['name'])
+        if not os.path.exists(tile_dir):
+            os.makedirs(tile_dir)
+        tileContexts.append(TileContext(ctx, tile, tile_dir))
+    RunTileWorkers(tileContexts, ctx.tile_workers)
+    tile_dirs = [t.out_workspace for t in tileContexts]
+
+    # Sliver reports of the tiles
+    if ctx.sliver_csv:
+        with OpenCsv(ctx.sliver_csv, 'a') as f:
+            writer = csv.writer(f)
+            for tileCtx in tileContexts:
+                if os.path.exists(tileCtx.sliver_csv):
+                    with OpenCsv(tileCtx.sliver_csv, 'r') as tile_file:
+                        for row in list(csv.reader(tile_file))[1:]:
+                            writer.writerow([row[0], tileCtx.tile['name'] + ' ' + row[1]] + row[2:])
+
+    seams = SeamFeatures(os.path.join(tiles_dir, 'Seams.shp'), extent, nx, ny,
+                         arcpy.Describe(ctx.SoilFeatures).spatialReference)
+    for qry_year in ctx.run_years:
+        ctx.BeginYear(qry_year)
+        arcpy.CreateFileGDB_management(ctx.out_workspace, ctx.out_name)
+        names = set()
+        for tile_dir in tile_dirs:
+            tile_gdb = os.path.join(tile_dir, ctx.out_name)
+            if arcpy.Exists(tile_gdb):
+                arcpy.env.workspace = tile_gdb
+                names.update([fc.replace('Core_', '', 1) for fc in arcpy.ListFeatureClasses('Core_*')])
+        for fc in sorted(names):
+            StitchFeatures(ctx, tile_dirs, fc, seams, os.path.join(ctx.out_gdb, fc))
+        ctx.Log("Tiles Stitched: " + str(qry_year))
+        ExportYear(ctx, os.path.join(ctx.out_gdb, 'RechargeEstimates_' + ctx.yearString), scenarios=False)
+
+    # Remove the tile workspaces
+    for tile_dir in tile_dirs:
+        for database in os.listdir(tile_dir):
+            if database.lower().endswith('.gdb'):
+                arcpy.Delete_management(os.path.join(tile_dir, database))
+    arcpy.Delete_management(seams)
+    shutil.rmtree(tiles_dir, ignore_errors=True)
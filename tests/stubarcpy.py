@@ -0,0 +1,68 @@
+'''Stand-in for arcpy that logs the tools called. Only the tools and classes listed exist, as in arcpy, so a
+misspelled tool name fails as it would under ArcGIS'''
+
+tools = ['Buffer_analysis', 'Clip_analysis', 'CopyFeatures_management', 'CreateFeatureclass_management',
+         'CreateFileGDB_management', 'Delete_management', 'Dissolve_management', 'GetCount_management',
+         'MakeFeatureLayer_management', 'Merge_management', 'SelectLayerByLocation_management', 'Exists']
+classes = ['Array', 'Point', 'Polygon']
+
+
+class Result(object):
+    def __init__(self, output):
+        self.output = output
+
+    def getOutput(self, index):
+        return self.output
+
+class Cursor(object):
+    def __init__(self, stub, table, fields):
+        self.stub = stub
+        self.table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def insertRow(self, row):
+        self.stub.calls.append(('insertRow', self.table))
+
+class Description(object):
+    FIDSet = '1'
+    spatialReference = 'SR'
+
+class Env(object):
+    pass
+
+class StubArcpy(object):
+    def __init__(self, counts=None):
+        self.calls = []
+        self.counts = counts or {}
+        self.env = Env()
+        self.da = self
+
+    def InsertCursor(self, table, fields):
+        return Cursor(self, table, fields)
+
+    def Describe(self, value):
+        return Description()
+
+    def __getattr__(self, name):
+        if name in classes:
+            return lambda *args: (name, args)
+        if name not in tools:
+            raise AttributeError("module 'arcpy' has no attribute '{0}'".format(name))
+
+        def tool(*args, **kwargs):
+            self.calls.append((name,) + args)
+            if name == 'GetCount_management':
+                return Result(str(self.counts.get(args[0], 1)))
+            if name == 'Exists':
+                return False
+            # The output is the second parameter of most tools, the first of layers and deletes
+            return Result(args[1] if len(args) > 1 and name != 'SelectLayerByLocation_management' else args[0])
+        return tool
+
+    def Tools(self):
+        return [call[0] for call in self.calls]
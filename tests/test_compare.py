@@ -0,0 +1,35 @@
+import numpy as np
+from ret.compare import TableDigest, MatchPolygons
+
+
+def Table(x, y, area, cover=None, surf=None, rate=None):
+    return {'x': np.array(x, dtype=np.float64), 'y': np.array(y, dtype=np.float64),
+            'area': np.array(area, dtype=np.float64),
+            'CoverType': np.array(cover or ['Shrub'] * len(x), dtype=np.unicode_),
+            'SurfCond': np.array(surf or ['Mature'] * len(x), dtype=np.unicode_),
+            'RechargeRate': np.array(rate or [4.0] * len(x), dtype=np.float64)}
+
+
+def test_table_digest_rounds_area():
+    tableA = Table([1.0, 2.0], [1.0, 2.0], [10.001, 20.0])
+    tableB = Table([1.0, 2.0], [1.0, 2.0], [10.002, 20.0])
+    assert TableDigest(tableA) == TableDigest(tableB)
+    assert TableDigest(tableA, decimals=3) != TableDigest(tableB, decimals=3)
+
+def test_table_digest_attributes():
+    tableA = Table([1.0], [1.0], [10.0])
+    tableB = Table([1.0], [1.0], [10.0], surf=['Developing'])
+    assert TableDigest(tableA) != TableDigest(tableB)
+
+def test_match_polygons():
+    tableA = Table([1.0, 1.0, 5.0], [1.0, 1.0, 5.0], [10.0, 30.0, 50.0])
+    tableB = Table([1.0, 1.0, 6.0], [1.0, 1.0, 6.0], [30.0, 10.0, 50.0])
+    pairsA, pairsB = MatchPolygons(tableA, tableB, 1e-6)
+    assert pairsA.tolist() == [0, 1]
+    assert pairsB.tolist() == [1, 0]
+
+def test_match_polygons_area_tolerance():
+    tableA = Table([1.0], [1.0], [100.0])
+    tableB = Table([1.0], [1.0], [100.5])
+    assert MatchPolygons(tableA, tableB, 1e-6)[0].tolist() == []
+    assert MatchPolygons(tableA, tableB, 0.01)[0].tolist() == [0]
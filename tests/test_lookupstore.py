@@ -0,0 +1,41 @@
+import pickle
+import numpy as np
+from ret import lookupstore
+
+
+def CompiledLookup(tmpdir):
+    # DispositionLookup rows as CompileTable writes them
+    dtype = [('Disposition', np.unicode_, 8), ('Disposition_null', np.bool_),
+             ('Cover_Type', np.unicode_, 8), ('Cover_Type_null', np.bool_), ('Qy', np.float64)]
+    arr = np.zeros(4, dtype=dtype)
+    arr['Disposition'] = [u'Barrier', u'barrier', u'', u'Barrier']
+    arr['Disposition_null'] = [False, False, True, False]
+    arr['Cover_Type'] = [u'Gravel', u'Soil', u'Sand', u'']
+    arr['Cover_Type_null'] = [False, False, False, True]
+    arr['Qy'] = [1.5, 2.0, np.nan, 3.0]
+    npy = str(tmpdir.join('lookup.npy'))
+    np.save(npy, arr)
+    lookupstore.attached.clear()
+    lookupstore.indexes.clear()
+    return {'/in/Lookup': npy}
+
+def test_stored_lookup_matches_cursor_loops(tmpdir):
+    store = CompiledLookup(tmpdir)
+    assert lookupstore.StoredLookup(store, '/in/Other', ['Disposition'], 'Cover_Type') is None
+    # Exact keys: the last row wins, as a dict filled from a cursor
+    cover = lookupstore.StoredLookup(store, '/in/Lookup', ['Disposition'], 'Cover_Type')
+    assert cover['Barrier'] is None and cover['barrier'] == u'Soil' and cover[None] == u'Sand'
+    # Lower-case keys: the first row wins, null keys skipped
+    lower = lookupstore.StoredLookup(store, '/in/Lookup', ['Disposition'], {'CoverType': 'Cover_Type'}, lower=True)
+    assert dict(lower) == {u'barrier': {'CoverType': u'Gravel'}}
+
+def test_stored_lookup_columns(tmpdir):
+    store = CompiledLookup(tmpdir)
+    rates = lookupstore.StoredLookup(store, '/in/Lookup', ['Disposition', 'Cover_Type'], columns=['Qy'])
+    assert rates[(u'barrier', u'Soil', 'Qy')] == 2.0
+    assert rates[(None, u'Sand', 'Qy')] is None
+    assert (u'barrier', u'Soil', 'Ri') not in rates
+    assert len(rates) == 4
+    # Workers attach the array again instead of unpickling a copy
+    copy = pickle.loads(pickle.dumps(rates, 2))
+    assert copy.arr is rates.arr and dict(copy) == dict(rates)
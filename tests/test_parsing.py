@@ -0,0 +1,22 @@
+from ret.context import ParseScenarios
+from ret.aggregates import ParseWindows
+
+
+def test_parse_scenarios_named_and_unnamed():
+    scenarios = ParseScenarios('Cap All=Tank, Crib:Barrier, Barrier;Trench:Revegetated')
+    assert scenarios == [{'name': 'Cap_All', 'keywords': ['Tank', 'Crib'], 'dispositions': ['Barrier', 'Barrier']},
+                         {'name': 'Scenario2', 'keywords': ['Trench'], 'dispositions': ['Revegetated']}]
+
+def test_parse_scenarios_empty():
+    assert ParseScenarios('') == []
+    assert ParseScenarios(' ; ') == []
+
+def test_parse_windows_consecutive():
+    windows = ParseWindows('10', list(range(1943, 1966)))
+    assert [(w['first'], w['last']) for w in windows] == [(1943, 1952), (1953, 1962), (1963, 1965)]
+    assert windows[0]['name'] == '1943_1952'
+
+def test_parse_windows_named_open_ends():
+    windows = ParseWindows('Early Ops=-1950;Late=2000-', list(range(1943, 2042)))
+    assert windows == [{'name': 'Early_Ops', 'first': 1943, 'last': 1950},
+                       {'name': 'Late', 'first': 2000, 'last': 2041}]
@@ -0,0 +1,43 @@
+import datetime
+from ret import planner
+
+
+class FakeCursor(object):
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return iter(self.rows)
+
+    def __exit__(self, *args):
+        return False
+
+class FakeArcpy(object):
+    def __init__(self, rows):
+        self.da = self
+        self.rows = rows
+
+    def SearchCursor(self, table, fields):
+        return FakeCursor(self.rows)
+
+
+def test_date_year():
+    assert planner.DateYear(None) is None
+    assert planner.DateYear(datetime.date(1987, 6, 1)) == 1987
+    assert planner.DateYear('1998-04-01') == 1998
+    assert planner.DateYear(' 2005') == 2005
+    assert planner.DateYear('0') is None
+    assert planner.DateYear('n/a') is None
+
+def test_cvp_years_offsets(monkeypatch):
+    monkeypatch.setattr(planner, 'arcpy', FakeArcpy([('99', 'A'), ('2003', 'B'), ('1990', 'C'), (None, 'D')]))
+    years = planner.CVPYears('CVP')
+    assert sorted(years) == sorted([1999, 2003] + [1999 + o for o in planner.successionOffsets] +
+                                   [2003 + o for o in planner.successionOffsets])
+    assert years[1999] == set(['CVP'])
+    assert years[2004] == set(['CVP+5'])
+    assert years[2009] == set(['CVP+10'])
+
+def test_cvp_years_of_sites(monkeypatch):
+    monkeypatch.setattr(planner, 'arcpy', FakeArcpy([('99', 'A'), ('2003', 'B')]))
+    assert sorted(planner.CVPYears('CVP', site_ids=['B'])) == [2003] + [2003 + o for o in planner.successionOffsets]
@@ -0,0 +1,32 @@
+from ret import prefilter
+from stubarcpy import StubArcpy
+
+
+class Context(object):
+    def __init__(self, aoi_buffer=''):
+        self.aoi = '/in/AoI'
+        self.aoi_buffer = aoi_buffer
+
+
+def test_domain_window(monkeypatch):
+    stub = StubArcpy()
+    monkeypatch.setattr(prefilter, 'arcpy', stub)
+    assert prefilter.DomainWindow(Context(), '/out/Domain.gdb') == '/out/Domain.gdb/DomainWindow'
+    assert stub.Tools() == ['Dissolve_management']
+    stub = StubArcpy()
+    monkeypatch.setattr(prefilter, 'arcpy', stub)
+    prefilter.DomainWindow(Context('500 Meters'), '/out/Domain.gdb')
+    assert stub.calls[0][:4] == ('Buffer_analysis', '/in/AoI', '/out/Domain.gdb/DomainWindow', '500 Meters')
+
+def test_filter_inputs(monkeypatch):
+    stub = StubArcpy()
+    monkeypatch.setattr(prefilter, 'arcpy', stub)
+    inputs = ['/in/Soils', '/in/ehsit', '/in/BRMP', '/in/CVP']
+    assert prefilter.FilterInputs(inputs, '/out/W', '/out') == ['/out/Soils', '/out/ehsit', '/out/BRMP', '/out/CVP']
+    # Site layers whole, area layers clipped to the window plus the kept sites
+    copies = [call[2] for call in stub.calls if call[0] == 'CopyFeatures_management']
+    assert copies == ['/out/ehsit', '/out/CVP']
+    merge = [call for call in stub.calls if call[0] == 'Merge_management'][0]
+    assert merge[1] == ['/out/W', '/out/ehsit', '/out/CVP']
+    clips = [call[1:] for call in stub.calls if call[0] == 'Clip_analysis']
+    assert clips == [('/in/Soils', '/out/SiteWindow', '/out/Soils'), ('/in/BRMP', '/out/SiteWindow', '/out/BRMP')]
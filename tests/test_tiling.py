@@ -0,0 +1,52 @@
+from ret import tiling, prefilter, common
+from ret.tiling import TileExtents
+from stubarcpy import StubArcpy
+
+
+def test_tile_extents_cover_the_extent():
+    tiles = TileExtents([0.0, 0.0, 100.0, 50.0], 2, 2, 5.0)
+    assert [t['name'] for t in tiles] == ['tile_0_0', 'tile_0_1', 'tile_1_0', 'tile_1_1']
+    # Row by row from the upper left
+    assert tiles[0]['core'] == [0.0, 25.0, 50.0, 50.0]
+    assert tiles[3]['core'] == [50.0, 0.0, 100.0, 25.0]
+    assert sum([(t['core'][2] - t['core'][0]) * (t['core'][3] - t['core'][1]) for t in tiles]) == 5000.0
+
+def test_tile_extents_overlap():
+    tile = TileExtents([0.0, 0.0, 100.0, 50.0], 2, 2, 5.0)[1]
+    assert tile['extent'] == [45.0, 20.0, 105.0, 55.0]
+
+def test_single_tile():
+    assert TileExtents([0.0, 0.0, 10.0, 10.0], 1, 1, 0.0)[0]['extent'] == [0.0, 0.0, 10.0, 10.0]
+
+class TileContext(object):
+    def __init__(self, inputs):
+        self.tile = TileExtents([0.0, 0.0, 10.0, 10.0], 1, 1, 1.0)[0]
+        self.sliver_csv = None
+        self.out_workspace = '/out/tile_0_0'
+        self.SoilFeatures = inputs[0]
+        self.inputs = inputs
+        self.run_years = []
+
+    def FeatureInputs(self):
+        return list(self.inputs)
+
+    def SetFeatureInputs(self, inputs):
+        self.inputs = inputs
+        self.SoilFeatures = inputs[0]
+
+    def Log(self, message):
+        pass
+
+def test_run_tile_filters_inputs(monkeypatch):
+    stub = StubArcpy()
+    for module in [tiling, prefilter, common]:
+        monkeypatch.setattr(module, 'arcpy', stub)
+    ctx = TileContext(['/in/Soils', '/in/ehsit', '/in/NAIP2011'])
+    tiling.RunTile(ctx)
+    tile_gdb = '/out/tile_0_0/TileInputs.gdb'
+    assert ctx.inputs == [tile_gdb + '/Soils', tile_gdb + '/ehsit', tile_gdb + '/NAIP2011']
+    clips = [call[1:] for call in stub.calls if call[0] == 'Clip_analysis']
+    assert clips == [('/in/Soils', tile_gdb + '/SiteWindow', tile_gdb + '/Soils'),
+                     ('/in/NAIP2011', tile_gdb + '/SiteWindow', tile_gdb + '/NAIP2011')]
+    selections = [call[2:] for call in stub.calls if call[0] == 'SelectLayerByLocation_management']
+    assert selections == [('INTERSECT', tile_gdb + '/TileExtent')]